@@ -0,0 +1,215 @@
+"""A compact, integer-interned map backend for RoverKnowledge.
+
+Locations and directions are interned to consecutive ids. The exits of
+each location are kept as a bitmask of direction ids, and its go
+functions as parallel arrays of direction and destination ids, so no
+dictionary or set of strings is kept per location. Paths and
+frontiers are searched over ids and only translated back to names on
+the way out."""
+
+from array import array
+from collections import OrderedDict
+
+from .rover import RoverKnowledge
+
+# typecode for interned ids
+TYPECODE = 'i'
+
+
+class Names:
+    """A table of names interned to consecutive ids."""
+    __slots__ = ('ids', 'names')
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, name):
+        """Returns the id of a name, interning it if necessary."""
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def lookup(self, name):
+        """Returns the id of a name, or None if it was never
+        interned."""
+        return self.ids.get(name)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class AdjacencyKnowledge(RoverKnowledge):
+    """A RoverKnowledge keeping its map as an adjacency structure of
+    interned ids."""
+
+    def __init__(self, aliases=False):
+        # pylint: disable=super-init-not-called
+        # locations is a read-only view here
+        self.location_ids = Names()
+        self.direction_ids = Names()
+        # bitmask of exit direction ids, by location id
+        self.exits = []
+        # go direction and destination ids, by location id
+        self.directions = []
+        self.destinations = []
+        self.trees = OrderedDict()
+        self.frontier = {}
+        self.routes = None
+        self.init_identity(aliases)
+
+    def add_location(self, location):
+        """Returns the id of a location, adding it if it is new."""
+        location_id = self.location_ids.intern(location)
+        if location_id == len(self.exits):
+            self.exits.append(0)
+            self.directions.append(array(TYPECODE))
+            self.destinations.append(array(TYPECODE))
+        return location_id
+
+    def find(self, location_id, direction_id):
+        """Returns the position of a direction among the go functions of
+        a location, or None."""
+        directions = self.directions[location_id]
+        if direction_id in directions:
+            return directions.index(direction_id)
+        return None
+
+    def nodes(self):
+        return range(len(self.directions))
+
+    def edges(self, location):
+        return zip(self.directions[location], self.destinations[location])
+
+    def ask_list(self, location, prop):
+        location_id = self.location_ids.lookup(location)
+        if location_id is None:
+            return []
+        directions = self.direction_ids.names
+        if prop == 'exit':
+            exits = self.exits[location_id]
+            return {direction for i, direction in enumerate(directions)
+                    if exits >> i & 1}
+        if prop == 'go':
+            locations = self.location_ids.names
+            return [(directions[d], locations[t])
+                    for d, t in self.edges(location_id)]
+        return []
+
+    def ask_exit(self, location, direction):
+        location_id = self.location_ids.lookup(location)
+        direction_id = self.direction_ids.lookup(direction)
+        if location_id is None or direction_id is None:
+            return False
+        return bool(self.exits[location_id] >> direction_id & 1)
+
+    def ask_go(self, location, direction):
+        location_id = self.location_ids.lookup(location)
+        direction_id = self.direction_ids.lookup(direction)
+        if location_id is None or direction_id is None:
+            return None
+        i = self.find(location_id, direction_id)
+        if i is None:
+            return None
+        return self.location_ids.names[self.destinations[location_id][i]]
+
+    def add_exit(self, location, direction):
+        location_id = self.add_location(location)
+        direction_id = self.direction_ids.intern(direction)
+        self.exits[location_id] |= 1 << direction_id
+        if self.find(location_id, direction_id) is None:
+            self.frontier.setdefault(location_id, {})[direction_id] = None
+
+    def add_go(self, location, direction, destination):
+        location_id = self.add_location(location)
+        direction_id = self.direction_ids.intern(direction)
+        destination_id = self.add_location(destination)
+        destinations = self.destinations[location_id]
+        i = self.find(location_id, direction_id)
+        if i is None:
+            old = None
+            self.directions[location_id].append(direction_id)
+            destinations.append(destination_id)
+        else:
+            old = destinations[i]
+            destinations[i] = destination_id
+        exits = self.frontier.get(location_id)
+        if exits and direction_id in exits:
+            del exits[direction_id]
+            if not exits:
+                del self.frontier[location_id]
+        if destination_id != old:
+            self.update_paths(location_id, direction_id, old,
+                              destination_id)
+
+    def remove_location(self, location):
+        location_id = self.location_ids.lookup(location)
+        if location_id is None:
+            return
+        self.exits[location_id] = 0
+        self.directions[location_id] = array(TYPECODE)
+        self.destinations[location_id] = array(TYPECODE)
+        self.frontier.pop(location_id, None)
+        self.drop_trees(location_id)
+        if self.routes is not None:
+            self.routes.set_edges(location_id, ())
+
+    def path(self, location, destination):
+        location_id = self.location_ids.lookup(location)
+        destination_id = self.location_ids.lookup(destination)
+        if location_id is None or destination_id is None:
+            return [] if location == destination else None
+        path = super().path(location_id, destination_id)
+        if path is None:
+            return None
+        return [self.direction_ids.names[d] for d in path]
+
+    def explore(self, location):
+        location_id = self.location_ids.lookup(location)
+        if location_id is None:
+            return None, None
+        state, direction = super().explore(location_id)
+        if state is None:
+            return None, None
+        return (self.location_ids.names[state],
+                self.direction_ids.names[direction])
+
+    def unexplored(self, location):
+        location_id = self.location_ids.lookup(location)
+        direction = super().unexplored(location_id)
+        if direction is None:
+            return None
+        return self.direction_ids.names[direction]
+
+    def exit_list(self):
+        locations = self.location_ids.names
+        return [(locations[l], direction)
+                for l in range(len(self.exits))
+                for direction in self.ask_list(locations[l], 'exit')]
+
+    def go_graph(self):
+        locations = self.location_ids.names
+        directions = self.direction_ids.names
+        return [(locations[l], directions[d], locations[t])
+                for l in range(len(self.directions))
+                for d, t in self.edges(l)]
+
+    def __len__(self):
+        return len(self.exits)
+
+    @property
+    def locations(self):
+        """Returns the map in the nested dictionary form of
+        RoverKnowledge.locations."""
+        locations = {}
+        for location in self.location_ids.names:
+            entry = locations[location] = {}
+            exits = self.ask_list(location, 'exit')
+            if exits:
+                entry['exit'] = exits
+            go = dict(self.ask_list(location, 'go'))
+            if go:
+                entry['go'] = go
+        return locations
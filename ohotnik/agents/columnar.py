@@ -0,0 +1,258 @@
+"""A compact, columnar model of ground truths.
+
+Each predicate is stored as a Table of parallel arrays of interned
+argument ids, one per argument position, with the value of every row
+packed into a bitmap. Rows are found through per-position indexes of
+row numbers, so no tuple or Predicate is kept per literal. Rows with
+variable arguments are indexed under WILDCARD, and are candidates for
+every query."""
+
+from array import array
+from itertools import chain
+
+from .logic_parts import Predicate
+from .terms import TERMS, unify_terms
+
+# typecode for interned ids and row numbers
+TYPECODE = 'i'
+# index key of the rows with variable arguments
+WILDCARD = None
+
+
+class Table:
+    """The literals of one predicate with a fixed number of
+    arguments."""
+    __slots__ = ('columns', 'values', 'size', 'index')
+
+    def __init__(self, arity):
+        self.columns = [array(TYPECODE) for _ in range(arity)]
+        self.values = bytearray()
+        self.size = 0
+        self.index = {}
+
+    def value(self, row):
+        """Returns the value of a row."""
+        return bool(self.values[row >> 3] & (1 << (row & 7)))
+
+    def set_value(self, row, value):
+        """Sets the value of a row."""
+        if value:
+            self.values[row >> 3] |= 1 << (row & 7)
+        else:
+            self.values[row >> 3] &= ~(1 << (row & 7)) & 0xff
+
+    def match(self, row, key):
+        """Returns True if a row holds every id of key."""
+        for column, term in zip(self.columns, key):
+            if column[row] != term:
+                return False
+        return True
+
+    def find(self, key):
+        """Returns the row holding key, or None."""
+        if not self.columns:
+            return 0 if self.size else None
+        if min(key) < 0:
+            rows = self.index.get(WILDCARD, ())
+        else:
+            rows = self.index.get((0, key[0]), ())
+        for row in rows:
+            if self.match(row, key):
+                return row
+        return None
+
+    def append(self, key, value):
+        """Adds a row and returns its number."""
+        row = self.size
+        ground = min(key, default=0) >= 0
+        for position, (column, term) in enumerate(zip(self.columns, key)):
+            column.append(term)
+            if ground:
+                self.bucket((position, term)).append(row)
+        if not ground:
+            self.bucket(WILDCARD).append(row)
+        if row & 7 == 0:
+            self.values.append(0)
+        self.size += 1
+        self.set_value(row, value)
+        return row
+
+    def bucket(self, name):
+        """Returns an index bucket, adding it if necessary."""
+        bucket = self.index.get(name)
+        if bucket is None:
+            bucket = self.index[name] = array(TYPECODE)
+        return bucket
+
+    def key(self, row):
+        """Returns the interned ids of a row."""
+        return tuple(column[row] for column in self.columns)
+
+    def bind(self, row, pattern):
+        """Returns the bindings of the variables of a pattern of interned
+        terms which make it match a row, or False."""
+        bindings = {}
+        for column, term in zip(self.columns, pattern):
+            value = column[row]
+            if value < 0:
+                # a row with variable arguments
+                return unify_terms(pattern, self.key(row))
+            if type(term) is not int:
+                return False
+            if term < 0:
+                term = bindings.setdefault(term, value)
+            if term != value:
+                return False
+        return bindings
+
+    def args(self, row):
+        """Returns the arguments of a row."""
+        return tuple(TERMS.name(column[row]) for column in self.columns)
+
+
+class ColumnarModel:
+    """A model of ground truths with the interface of Model, keeping
+    its literals in Tables."""
+
+    def __init__(self, action=None):
+        self.tables = {}
+        if action is None:
+            action = tuple()
+        self.action = action
+
+    @staticmethod
+    def key(args):
+        """Returns the interned key of a tuple of constants, or None if
+        one of them was never interned."""
+        key = tuple(TERMS.lookup(arg) for arg in args)
+        if None in key:
+            return None
+        return key
+
+    def ask(self, predicate: str, args: tuple):
+        """Returns the value of a predicate if it is stored in this
+        model."""
+        table = self.tables.get((predicate, len(args)))
+        key = self.key(args)
+        if table is None or key is None:
+            return None
+        row = table.find(key)
+        if row is None:
+            return None
+        return table.value(row)
+
+    def store(self, predicate: str, args: tuple, value: bool):
+        """Stores the value of a predicate."""
+        table = self.tables.get((predicate, len(args)))
+        if table is None:
+            table = self.tables[(predicate, len(args))] = Table(len(args))
+        key = tuple(TERMS.intern(arg) for arg in args)
+        row = table.find(key)
+        if row is None:
+            table.append(key, value)
+        else:
+            table.set_value(row, value)
+
+    def rows(self, predicate: str, pattern=()):
+        """Lazily yields (table, row) pairs for the literals of a
+        predicate that could match a pattern of interned terms."""
+        for (name, arity), table in self.tables.items():
+            if name != predicate or (pattern and arity != len(pattern)):
+                continue
+            best = None
+            for position, term in enumerate(pattern):
+                if type(term) is not int or term < 0:
+                    continue
+                bucket = table.index.get((position, term), ())
+                if best is None or len(bucket) < len(best):
+                    best = bucket
+            if best is None:
+                best = range(table.size)
+            elif WILDCARD in table.index:
+                best = chain(best, table.index[WILDCARD])
+            for row in best:
+                yield table, row
+
+    def fetch(self, sentence, matches=None, initial_substitution=None):
+        """Returns all substitutions which makes a sentence valid,
+        skipping any predicates in matches and, optionally, starting
+        with an initial substitution."""
+        if matches is None:
+            matches = set()
+        if not isinstance(sentence, Predicate):
+            return None
+        substitutions = list(self.iter_fetch(sentence, matches,
+                                             initial_substitution))
+        return substitutions, matches
+
+    def iter_fetch(self, sentence, matches=None,
+                   initial_substitution=None):
+        """Lazily yields the substitutions which make a predicate valid,
+        skipping any literals in matches and adding the ones it visits
+        to it."""
+        if matches is None:
+            matches = set()
+        pattern = sentence.terms
+        if initial_substitution:
+            pattern = tuple(TERMS.intern(initial_substitution[arg])
+                            if arg in initial_substitution else term
+                            for arg, term in zip(sentence.args, pattern))
+        else:
+            initial_substitution = {}
+        names = TERMS.names
+        for table, row in self.rows(sentence.name, pattern):
+            bindings = table.bind(row, pattern)
+            if bindings is False:
+                continue
+            literal = table.args(row)
+            if literal in matches:
+                continue
+            matches.add(literal)
+            if table.value(row) == sentence.value:
+                substitution = dict(initial_substitution)
+                for var, term in bindings.items():
+                    substitution[names[~var]] = \
+                        names[term] if term >= 0 else names[~term]
+                yield substitution
+
+    def literals(self):
+        """Lazily yields the (predicate, args, value) of every literal."""
+        for (name, _), table in self.tables.items():
+            for row in range(table.size):
+                yield name, table.args(row), table.value(row)
+
+    def merge(self, other):
+        """Merge the values of another model into this one."""
+        self.action = other.action
+        for predicate, args, value in other.literals():
+            self.store(predicate, args, value)
+
+    @property
+    def predicates(self):
+        """Returns a dictionary of the literals of each predicate."""
+        predicates = {}
+        for predicate, args, value in self.literals():
+            predicates.setdefault(predicate, {})[args] = value
+        return predicates
+
+    def nbytes(self):
+        """Returns the number of bytes held by the columns, bitmaps and
+        indexes of this model."""
+        total = 0
+        for table in self.tables.values():
+            total += len(table.values)
+            for column in table.columns:
+                total += column.itemsize * len(column)
+            for bucket in table.index.values():
+                total += bucket.itemsize * len(bucket)
+        return total
+
+    def __contains__(self, predicate):
+        return any(name == predicate for name, _ in self.tables)
+
+    def __len__(self):
+        return sum(table.size for table in self.tables.values())
+
+    def __iter__(self):
+        for predicate, args, value in self.literals():
+            yield Predicate(predicate, args, value)
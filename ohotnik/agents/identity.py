@@ -0,0 +1,180 @@
+"""Telling apart locations which share a name.
+
+Every location the agent believes in is a node of a union-find. Nodes
+are created when a name is first seen, or when a name is seen with a
+description no node of that name has. A node is split when two moves
+from it disagree, and two nodes are merged when their neighbors prove
+them to be the same location. Nodes are labelled with their name, followed
+by a number for every node after the first with the same name."""
+
+import hashlib
+
+
+def signature(description):
+    """Returns a short hash of a location description, or None if there
+    is no description."""
+    if not description:
+        return None
+    return hashlib.blake2b(description.encode('utf-8'),
+                           digest_size=8).digest()
+
+
+class UnionFind:
+    """Disjoint sets of consecutive integer ids, with path halving and
+    union by size."""
+
+    def __init__(self):
+        self.parents = []
+        self.sizes = []
+
+    def add(self):
+        """Adds a set of one new id and returns the id."""
+        i = len(self.parents)
+        self.parents.append(i)
+        self.sizes.append(1)
+        return i
+
+    def find(self, i):
+        """Returns the root id of the set holding an id."""
+        parents = self.parents
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    def union(self, i, j):
+        """Merges the sets holding two ids and returns the new root."""
+        i, j = self.find(i), self.find(j)
+        if i == j:
+            return i
+        if self.sizes[i] < self.sizes[j]:
+            i, j = j, i
+        self.parents[j] = i
+        self.sizes[i] += self.sizes[j]
+        return i
+
+    def __len__(self):
+        return len(self.parents)
+
+
+class LocationIdentity:
+    """Maps the names and descriptions of observed locations to the
+    labels of map nodes."""
+
+    def __init__(self):
+        self.sets = UnionFind()
+        # name, signature and label, by node id
+        self.names = []
+        self.signatures = []
+        self.labels = []
+        # node ids by name and by label
+        self.by_name = {}
+        self.by_label = {}
+
+    def add(self, name, sign=None):
+        """Adds a node for a name and returns its label."""
+        i = self.sets.add()
+        nodes = self.by_name.setdefault(name, [])
+        label = name if not nodes else f'{name} #{len(nodes) + 1}'
+        nodes.append(i)
+        self.names.append(name)
+        self.signatures.append(sign)
+        self.labels.append(label)
+        self.by_label[label] = i
+        return label
+
+    def node(self, label):
+        """Returns the root node id of a label, or None."""
+        i = self.by_label.get(label)
+        if i is None:
+            return None
+        return self.sets.find(i)
+
+    def name(self, label):
+        """Returns the name of the location a label refers to."""
+        return self.names[self.node(label)]
+
+    def label(self, i):
+        """Returns the label of the node holding an id."""
+        return self.labels[self.sets.find(i)]
+
+    def roots(self, name):
+        """Returns the root ids of the nodes of a name, oldest first."""
+        roots = []
+        for i in self.by_name.get(name, ()):
+            root = self.sets.find(i)
+            if root not in roots:
+                roots.append(root)
+        return roots
+
+    def compatible(self, i, sign):
+        """Returns True if a node may have a signature."""
+        known = self.signatures[i]
+        return known is None or sign is None or known == sign
+
+    def locate(self, name, sign=None):
+        """Returns the label of the oldest node of a name that may have a
+        signature, adding a node if there is none."""
+        for root in self.roots(name):
+            if self.compatible(root, sign):
+                if self.signatures[root] is None:
+                    self.signatures[root] = sign
+                return self.labels[root]
+        return self.add(name, sign)
+
+    def candidates(self, name, sign=None):
+        """Returns the labels of the nodes of a name that may have a
+        signature, oldest first."""
+        return [self.labels[root] for root in self.roots(name)
+                if self.compatible(root, sign)]
+
+    def same(self, label, other):
+        """Returns True if two labels may be one location, having the
+        same name and compatible signatures."""
+        i, j = self.node(label), self.node(other)
+        return self.names[i] == self.names[j] and \
+            self.compatible(i, self.signatures[j])
+
+    def note(self, label, sign):
+        """Records the signature of a node if it has none."""
+        i = self.node(label)
+        if self.signatures[i] is None:
+            self.signatures[i] = sign
+
+    def split(self, label):
+        """Adds a new node with the name and signature of a node, and
+        returns its label."""
+        node = self.node(label)
+        return self.add(self.names[node], self.signatures[node])
+
+    def merge(self, label, other):
+        """Merges the node of other into the node of label, which keeps
+        its label."""
+        keep, drop = self.node(label), self.node(other)
+        root = self.sets.union(keep, drop)
+        self.labels[root] = self.labels[keep]
+        if self.signatures[keep] is not None:
+            self.signatures[root] = self.signatures[keep]
+        else:
+            self.signatures[root] = self.signatures[drop]
+
+    def nodes(self):
+        """Returns the name, label, signature and root id of every node,
+        by node id."""
+        return [(self.names[i], self.labels[i], self.signatures[i],
+                 self.sets.find(i)) for i in range(len(self.sets))]
+
+    def restore(self, nodes):
+        """Gives an empty identity the nodes returned by the nodes method
+        of another."""
+        for name, label, sign, _ in nodes:
+            self.add(name, sign)
+            self.labels[-1] = label
+        sets = self.sets
+        for i, (_, _, _, root) in enumerate(nodes):
+            if root != i:
+                sets.parents[i] = root
+                sets.sizes[root] += 1
+
+    def __len__(self):
+        return len(self.sets)
@@ -2,11 +2,23 @@
 learned from a game world."""
 
 
+from array import array
+from bisect import bisect_right
 from collections import namedtuple, defaultdict
+from itertools import chain
 
-from . import Predicate, AndClause, LogicPart
+from . import Predicate, AndClause, LogicPart, FunctionNode
+from .planner import Planner
+from .rete import ReteNetwork
+from .substitution import EMPTY
+from .terms import TERMS, unify_terms
 
+ENGINES = ('eval', 'rete')
 Function = namedtuple('Function', ['predicate', 'argument'])
+ChainRound = namedtuple('ChainRound', ['new_facts', 'joins'])
+# index key of the literals with variable arguments, which may match any
+# constant
+WILDCARD = None
 
 
 def isvar(identifier):
@@ -60,17 +72,81 @@ def occur_check(var, x):
     return False
 
 
+def lookback(sentence):
+    """Returns the number of steps before the present a sentence looks
+    at."""
+    time = getattr(sentence, 'time', None)
+    steps = -time if time is not None and time < 0 else 0
+    for arg in getattr(sentence, 'args', ()):
+        if isinstance(arg, LogicPart):
+            steps = max(steps, lookback(arg))
+    return steps
+
+
+def candidates(literals, index, keys):
+    """Returns the keys of literals which could match a query, using the
+    smallest bucket of an argument index among the bound arguments. keys
+    holds the constant bound at each argument position, or None.
+    Literals in the WILDCARD bucket are always candidates."""
+    if not literals:
+        return ()
+    best = None
+    for position, key in enumerate(keys):
+        if key is None:
+            continue
+        bucket = index.get((position, key), ())
+        if best is None or len(bucket) < len(best):
+            best = bucket
+    if best is None:
+        return literals
+    wild = index.get(WILDCARD)
+    if wild:
+        return chain(best, wild)
+    return best
+
+
 class LogicBase:
     """A knowledge base using first order logical entailment."""
 
-    def __init__(self, max_models=5):
-        """Initialize the logic base."""
-        self.models = [Model()]
+    def __init__(self, horizon=None, engine='eval', model=None):
+        """Initialize the logic base. The history of each literal is
+        kept exact for the last horizon steps. By default the horizon
+        reaches as far back as the implications and rules added look, so
+        a knowledge base never looking into the past keeps only present
+        values. Agents asking about older steps themselves give a
+        horizon, or pass their sentences to look_back. The engine is
+        either
+        'eval', which evaluates implication premises against the
+        knowledge base, or 'rete', which compiles them into a matching
+        network. model is the class used for sets of literals, Model by
+        default or ColumnarModel."""
+        if engine not in ENGINES:
+            raise ValueError(f'Unknown engine {engine}')
+        self.horizon = horizon
+        self.facts = FactStore(1 if horizon is None else horizon, model)
+        self.planner = Planner(self.facts)
         self.implications = []
+        # implications whose premises are evaluated rather than matched
+        # by the network
+        self.evaluated = []
+        self.network = ReteNetwork() if engine == 'rete' else None
+        # predicates with literals holding variables, which the network
+        # cannot match
+        self.unground = set()
         self.rules = []
         self.functions = {}
+        # values of functions by function, arguments and relative time,
+        # and the functions backed by each predicate
+        self.function_cache = {}
+        self.backing = defaultdict(list)
+        self.function_hits = 0
+        self.function_misses = 0
         self.constants = set()
-        self.max_models = max_models
+        # literals stored since the last round of forward chaining, and
+        # whether the knowledge base was at a fixpoint before them
+        self.delta = self.facts.model()
+        self.chained = False
+        self.chain_stats = []
 
     def tell(self, observations):
         """Report observations to the knowledge base."""
@@ -87,22 +163,29 @@ class LogicBase:
         return None
 
     def explore(self):
+        """Returns the action of the first rule whose premise holds,
+        substituted with its smallest substitution, or None."""
         for rule in self.rules:
-            subs = self.fetch(rule.premise)
-            print(subs)
-            if not subs:
+            best_sub = min(self.iter_fetch(rule.premise), key=len,
+                           default=None)
+            if best_sub is None:
                 continue
-            best_sub = sorted(subs, lambda x: len(x))[0]
-            return map(lambda x: best_sub[x] if x in best_sub else x,
-                       rule.action)
+            return tuple(best_sub.get(x, x) for x in rule.action)
         return None
 
     def advance(self, action):
         """Advances the time state of the knowledge base and updates the
         action predicate."""
-        self.models.append(Model(action=action))
-        while len(self.models) > self.max_models:
-            self.models[0].merge(self.models.pop(1))
+        if self.network is not None:
+            # the present becomes the past
+            for name, args, value in self.facts.latest.literals():
+                old = self.value(name, args, time=-1)
+                self.network.update(-1, name, args, old, value)
+        self.facts.advance(action)
+        # relative times now refer to different steps
+        self.function_cache = {}
+        # premises looking into the past now see a different step
+        self.chained = False
 
     def entails(self, sentence):
         """Returns True if a sentence is entailed by the knowledge base,
@@ -116,35 +199,68 @@ class LogicBase:
         self.constants.union(set(literal.args))
         for arg in literal.args:
             self.constants.add(arg)
-        time -= 1
-        self.models[time].store(literal.name, literal.args,
-                                literal.value)
+        if self.network is not None and time == 0:
+            old = self.value(literal.name, literal.args)
+        self.facts.store(literal.name, literal.args, literal.value, time)
+        if literal.name not in self.unground and \
+                any(isvar(arg) for arg in literal.args):
+            self.unground.add(literal.name)
+            self.chained = False
+            if self.network is not None:
+                self.compile_network()
+        for function, argument in self.backing.get(literal.name, ()):
+            cache = self.function_cache.get(function)
+            if cache:
+                cache.pop(literal.args[:argument] +
+                          literal.args[argument + 1:], None)
+        if time == 0:
+            self.delta.store(literal.name, literal.args, literal.value)
+            if self.network is not None:
+                self.network.update(0, literal.name, literal.args, old,
+                                    literal.value)
+        else:
+            self.chained = False
+            if self.network is not None:
+                self.compile_network()
+
+    def value(self, predicate, args, time=None):
+        """Returns the stored value of a literal, or None if it is
+        unknown."""
+        return self.facts.ask(predicate, args, time)
+
+    def view(self, predicate, time=None):
+        """Returns a dictionary of the stored values of every literal of
+        a predicate."""
+        return self.facts.view(predicate, time)
 
     def ask_literal(self, predicate, args, value, time=None):
         """Compares a literal to the knowledge base.."""
-        result = None
-        if time is not None and time < 0:
-            models = self.models[:time]
-        else:
-            models = self.models
-        for model in reversed(models):
-            result = model.ask(predicate, args)
-            if result is not None:
-                return result is value
-        return None
+        result = self.value(predicate, args, time)
+        if result is None:
+            return None
+        return result is value
 
     def ask_function(self, function, args, time=None):
         """Returns the name of the constant referred to by a function,
-        if one exists."""
-        if function in self.functions:
-            predicate, argument = self.functions[function]
-            result = self.fetch(
-                Predicate(predicate,
-                          args[:argument] + ('X',) + args[argument:],
-                          time=time))
-            if result:
-                return result[0]['X']
-        return None
+        if one exists. Values are cached until a literal of the backing
+        predicate with the same arguments is stored, or the knowledge
+        base advances."""
+        if function not in self.functions:
+            return None
+        cache = self.function_cache.setdefault(function, {})
+        values = cache.setdefault(args, {})
+        if time in values:
+            self.function_hits += 1
+            return values[time]
+        self.function_misses += 1
+        predicate, argument = self.functions[function]
+        result = self.first(
+            Predicate(predicate,
+                      args[:argument] + ('X',) + args[argument:],
+                      time=time))
+        value = None if result is None else result['X']
+        values[time] = value
+        return value
 
     def fetch_possible(self, sentence, substitution=None):
         """Returns a list of substitutions for variables that does not
@@ -175,56 +291,262 @@ class LogicBase:
     def fetch(self, sentence, substitution=None):
         """Returns a list of substitutions for variables that makes
         sentence entailed by the knowledge base."""
-        substitutions = []
-        if isinstance(sentence, Predicate):
-            if sentence.time is not None and sentence.time < 0:
-                models = self.models[:sentence.time]
-            else:
-                models = self.models
-
-            matches = set()
-            for model in reversed(models):
-                result = model.fetch(sentence, matches,
-                                     initial_substitution=substitution)
-                subs, ms = result
-                substitutions.extend(subs)
-                matches.update(ms)
+        substitutions = list(self.iter_fetch(sentence, substitution))
         if len(substitutions) == 0:
             return None
         return substitutions
 
+    def iter_fetch(self, sentence, substitution=None):
+        """Lazily yields the substitutions for variables that make a
+        predicate or conjunction entailed by the knowledge base.
+        Conjunctions are joined depth first in planned order, so the
+        first substitution is found without joining the rest."""
+        if isinstance(sentence, Predicate):
+            return self.facts.iter_fetch(sentence, substitution)
+        if isinstance(sentence, AndClause):
+            return self.iter_join(sentence, substitution)
+        return iter(())
+
+    def iter_join(self, sentence, substitution=None):
+        """Lazily yields the substitutions which satisfy every clause of
+        a conjunction, keeping one generator per joined clause."""
+        clauses, time = sentence.clauses, sentence.time
+        order = self.plan(clauses)
+        start = EMPTY.extend_all(dict(substitution or {}))
+        if not order:
+            yield start
+            return
+        subs = [start]
+        stack = [self.iter_clause(clauses[order[0]], time, start)]
+        while stack:
+            result = next(stack[-1], None)
+            if result is None:
+                stack.pop()
+                subs.pop()
+                continue
+            sub = subs[-1].extend_all(result)
+            if len(stack) == len(order):
+                yield sub
+            else:
+                subs.append(sub)
+                stack.append(self.iter_clause(clauses[order[len(stack)]],
+                                              time, sub))
+
+    def iter_clause(self, clause, time, sub):
+        """Lazily yields the substitutions which satisfy one clause of a
+        conjunction, given the substitution of the clauses before it."""
+        if isinstance(clause, Predicate):
+            literal = clause.substitute(self, time, sub)
+            if literal is None:
+                return iter(())
+            return self.facts.iter_fetch(literal)
+        return iter(clause.eval(self, time, sub) or ())
+
+    def first(self, sentence, substitution=None):
+        """Returns the first substitution that makes a sentence entailed
+        by the knowledge base, or None."""
+        return next(self.iter_fetch(sentence, substitution), None)
+
+    def exists(self, sentence, substitution=None):
+        """Returns True if any substitution makes a sentence entailed by
+        the knowledge base."""
+        return self.first(sentence, substitution) is not None
+
+    def plan(self, clauses, first=None):
+        """Returns the order in which to join a sequence of clauses,
+        optionally starting with the clause at first."""
+        return self.planner.plan(clauses, first=first).order
+
+    def explain(self, sentence, time=None):
+        """Evaluates a conjunction in planned order, printing each
+        clause with its estimated and actual number of rows. Returns the
+        substitutions found."""
+        if sentence.time is not None:
+            time = sentence.time
+        plan = self.planner.plan(sentence.clauses)
+        print(f'{"clause":<40} {"estimated":>10} {"actual":>8}')
+        substitutions = [EMPTY]
+        rows = 1.0
+        for i, estimate in zip(plan.order, plan.estimates):
+            clause = sentence.clauses[i]
+            new_subs = []
+            for sub in substitutions:
+                result = clause.eval(self, time, sub)
+                if result:
+                    for r in result:
+                        new_subs.append(sub.extend_all(r))
+            substitutions = new_subs
+            if estimate is None:
+                rows = float('nan')
+            else:
+                rows *= estimate
+            print(f'{str(clause):<40} {rows:10.1f} '
+                  f'{len(substitutions):8d}')
+            if not substitutions:
+                break
+        return substitutions
+
     def add_function(self, name, predicate, argument):
         """Adds a logical function to the knowledge base."""
         self.functions[name] = (Function(predicate, argument))
+        self.backing[predicate].append((name, argument))
+        self.function_cache.pop(name, None)
+
+    def stats(self):
+        """Returns a dictionary of counters describing the knowledge
+        base."""
+        return {
+            'facts': len(self.facts),
+            'step': self.facts.step,
+            'function_hits': self.function_hits,
+            'function_misses': self.function_misses,
+            'function_cache_size': sum(
+                len(values) for cache in self.function_cache.values()
+                for values in cache.values()),
+            'chain_rounds': len(self.chain_stats),
+            'chain_joins': sum(r.joins for r in self.chain_stats),
+        }
 
     def add_rule(self, rule):
         """Add a rule to the knowledge base."""
         self.rules.append(rule)
+        self.look_back(rule)
 
     def add_implication(self, implication):
         """Adds an implication to the knowledge base."""
         self.implications.append(implication)
+        self.look_back(implication)
+        if self.network is None or \
+                not self.network.compile(implication, self):
+            self.evaluated.append(implication)
+            self.chained = False
+
+    def look_back(self, sentence):
+        """Keeps the history of literals as far back as a sentence looks,
+        unless the horizon was given."""
+        if self.horizon is None:
+            self.facts.horizon = max(self.facts.horizon,
+                                     lookback(sentence) + 1)
+
+    def compile_network(self):
+        """Rebuilds the matching network from the knowledge base."""
+        self.network = ReteNetwork()
+        self.evaluated = []
+        for implication in self.implications:
+            if not self.network.compile(implication, self):
+                self.evaluated.append(implication)
 
     def forward_chain(self, goal=None):
         """If a rule is entailed by the knowledge base, adds any
-        additional knowledge to the knowledge base and repeats."""
+        additional knowledge to the knowledge base and repeats until no
+        new knowledge is found.
+
+        Chaining is semi-naive: after the first round, premises are only
+        joined against literals stored in the previous round. The first
+        round is also restricted to literals stored since the last call,
+        unless the knowledge base has advanced or gained implications
+        since then. The new facts and joins tried in each round are
+        recorded in chain_stats.
+
+        With the 'rete' engine, compiled implications fire once for each
+        complete match queued by the network instead."""
         # pylint: disable=unused-argument
         # goal argument for planned feature
-        change = False
-        for imp in self.implications:
-            subs = imp.premise.eval(self)
-            if not subs:
+        delta = self.delta if self.chained else None
+        self.delta = self.facts.model()
+        self.chain_stats = []
+        while True:
+            joins = 0
+            if self.network is not None:
+                while self.network.agenda:
+                    self.conclude(*self.network.pop())
+                joins += self.network.joins
+                self.network.joins = 0
+            for imp in self.evaluated:
+                subs, count = self.premise_matches(imp.premise, delta)
+                joins += count
+                for sub in subs:
+                    self.conclude(imp, sub)
+            self.chain_stats.append(ChainRound(len(self.delta), joins))
+            if not len(self.delta):
+                break
+            delta, self.delta = self.delta, self.facts.model()
+        self.chained = True
+
+    def conclude(self, implication, sub):
+        """Stores the conclusion of an implication under a substitution
+        which satisfies its premise."""
+        for literal in implication.conclusion(self, sub):
+            if literal and not self.ask_literal(literal.name, literal.args,
+                                                literal.value):
+                self.store(literal)
+
+    def premise_matches(self, premise, delta=None):
+        """Returns the substitutions which satisfy a premise and the
+        number of joins tried to find them. If a delta model is given,
+        only substitutions using at least one of its literals are
+        returned."""
+        if isinstance(premise, AndClause):
+            clauses, time = premise.clauses, premise.time
+        elif isinstance(premise, Predicate):
+            clauses, time = [premise], None
+        else:
+            return premise.eval(self) or [], 1
+        if delta is None or any(name in delta for clause in clauses
+                                for name in self.backing_names(clause)):
+            # a function value may have changed under any clause
+            return self.join(clauses, time)
+        substitutions = []
+        joins = 0
+        for position, clause in enumerate(clauses):
+            clause_time = time if clause.time is None else clause.time
+            if clause_time is not None and clause_time < 0:
+                # literals in the delta are only visible to the present
                 continue
-            for sub in subs:
-                conclusion = imp.conclusion(self, sub)
-                for literal in conclusion:
-                    if literal and not self.ask_literal(literal.name,
-                                                        literal.args,
-                                                        literal.value):
-                        self.store(literal)
-                        change = True
-        if change:
-            self.forward_chain()
+            if clause.name not in delta:
+                continue
+            subs, count = self.join(clauses, time, delta, position)
+            substitutions.extend(subs)
+            joins += count
+        return substitutions, joins
+
+    def backing_names(self, clause):
+        """Returns the names of the predicates backing the functions in
+        the arguments of a clause."""
+        names = set()
+        args = list(clause.args)
+        while args:
+            arg = args.pop()
+            if isinstance(arg, FunctionNode):
+                if arg.name in self.functions:
+                    names.add(self.functions[arg.name].predicate)
+                args.extend(arg.args)
+        return names
+
+    def join(self, clauses, time=None, delta=None, position=None):
+        """Returns the substitutions which satisfy every clause and the
+        number of joins tried to find them. The clause at position, if
+        any, is fetched from the delta model and joined first."""
+        order = self.plan(clauses, first=position)
+        substitutions = [EMPTY]
+        joins = 0
+        for i in order:
+            clause = clauses[i]
+            new_subs = []
+            for sub in substitutions:
+                joins += 1
+                if i == position:
+                    literal = clause.substitute(self, time, sub)
+                    result = delta.fetch(literal)[0] if literal else None
+                else:
+                    result = clause.eval(self, time, sub)
+                if result:
+                    for r in result:
+                        new_subs.append(sub.extend_all(r))
+            if not new_subs:
+                return [], joins
+            substitutions = new_subs
+        return substitutions, joins
 
     def occams_razor(self):
         """Based on observed changes to the state and the current
@@ -233,8 +555,8 @@ class LogicBase:
         not negate existing predicates. THIS YIELDS AN ASSUMPTION AND
         INFERRENCES MADE ARE NOT SOUND."""
         changed = []
-        for predicate in self.models[-1]:
-            if not predicate.eval(self, time=-1):
+        for predicate in self.facts.latest:
+            if not self.exists(predicate.substitute(self, time=-1)):
                 changed.append(predicate)
         for predicate in changed:
             simplest_count = 2**7
@@ -283,26 +605,37 @@ class LogicBase:
     @property
     def action(self):
         """Returns the most recent action."""
-        return self.models[-1].action
+        return self.facts.action
 
     @property
     def predicates(self):
         """Returns all predicates in the knowledge base."""
-        temp_model = Model()
-        for model in self.models:
-            temp_model.merge(model)
-        return temp_model.predicates
+        return self.facts.snapshot().predicates
+
+    def changes(self):
+        """Returns the present values of the literals stored since the
+        last call, or of every literal on the first call, as
+        {predicate: {args: value}}."""
+        return self.facts.changes()
 
 
 class Model:
-    """A model of ground truths."""
+    """A model of ground truths.
+
+    Alongside the literals themselves, each model keeps an index of
+    literal arguments by predicate and argument position, so that
+    queries with bound arguments only visit candidate literals. Literals
+    with variable arguments are indexed under WILDCARD instead."""
     def __init__(self, action=None, initial=None):
         self.predicates = defaultdict(dict)
+        self.index = defaultdict(dict)
         if action is None:
             action = tuple()
         self.action = action
         if initial is not None:
-            self.predicates.update(initial)
+            for predicate, literals in initial.items():
+                for args, value in literals.items():
+                    self.store(predicate, args, value)
 
     def ask(self, predicate: str, args: tuple):
         """Returns the value of a predicate if it is stored in this
@@ -314,38 +647,329 @@ class Model:
 
     def store(self, predicate: str, args: tuple, value: bool):
         """Stores the value of a predicate."""
-        self.predicates[predicate][args] = value
+        literals = self.predicates[predicate]
+        if args not in literals:
+            index = self.index[predicate]
+            if any(isvar(arg) for arg in args):
+                index.setdefault(WILDCARD, {})[args] = None
+            else:
+                for position, arg in enumerate(args):
+                    index.setdefault((position, arg), {})[args] = None
+        literals[args] = value
+
+    def candidates(self, predicate: str, args: tuple,
+                   substitution=None):
+        """Returns the stored arguments of a predicate which could
+        match args. Variables bound in substitution count as bound
+        arguments."""
+        keys = []
+        for arg in args:
+            if substitution and arg in substitution:
+                arg = substitution[arg]
+            if isvar(arg) or isinstance(arg, LogicPart):
+                arg = None
+            keys.append(arg)
+        return candidates(self.predicates.get(predicate, {}),
+                          self.index.get(predicate, {}), keys)
 
     def fetch(self, sentence, matches=None, initial_substitution=None):
         """Returns all substitutions which makes a sentence valid,
         skipping any predicates in matches and, optionally, starting
         with an initial substitution."""
-        substitutions = []
         if matches is None:
             matches = set()
-        if isinstance(sentence, Predicate):
-            for literal, v in self.predicates[sentence.name].items():
-                if literal in matches:
-                    continue
-                substitution = unify(sentence,
-                                     Predicate(sentence.name,
-                                               literal),
-                                     initial_substitution)
-                if substitution is not False:
-                    matches.add(literal)
-                    if v == sentence.value:
-                        substitutions.append(substitution)
-            return substitutions, matches
-        return None
+        if not isinstance(sentence, Predicate):
+            return None
+        substitutions = list(self.iter_fetch(sentence, matches,
+                                             initial_substitution))
+        return substitutions, matches
+
+    def iter_fetch(self, sentence, matches=None,
+                   initial_substitution=None):
+        """Lazily yields the substitutions which make a predicate valid,
+        skipping any literals in matches and adding the ones it visits
+        to it."""
+        if matches is None:
+            matches = set()
+        literals = self.predicates.get(sentence.name, {})
+        for literal in self.candidates(sentence.name, sentence.args,
+                                       initial_substitution):
+            if literal in matches:
+                continue
+            substitution = unify(sentence,
+                                 Predicate(sentence.name, literal),
+                                 initial_substitution)
+            if substitution is not False:
+                matches.add(literal)
+                if literals[literal] == sentence.value:
+                    yield substitution
 
     def merge(self, other):
         """Merge the values of another model into this one."""
         self.action = other.action
-        for predicate in other.predicates:
-            self.predicates[predicate].update(
-                other.predicates[predicate])
+        for predicate, args, value in other.literals():
+            self.store(predicate, args, value)
+
+    def literals(self):
+        """Lazily yields the (predicate, args, value) of every literal."""
+        for predicate, values in self.predicates.items():
+            for args, value in values.items():
+                yield predicate, args, value
+
+    def __contains__(self, predicate):
+        return bool(self.predicates.get(predicate))
+
+    def __len__(self):
+        return sum(len(literals) for literals in self.predicates.values())
 
     def __iter__(self):
         for predicate, values in self.predicates.items():
             for args, value in values.items():
                 yield Predicate(predicate, args, value)
+
+
+class FactStore:
+    """A versioned store of every literal in the knowledge base.
+
+    Each literal has a row. The step from which its present value holds,
+    and that value, are kept in columns indexed by row, and only
+    literals whose value changed within the horizon keep a list of
+    earlier values. Relative times are counted in steps back from the
+    present, so a time of -1 sees the knowledge base as it was before
+    the last advance. History older than the horizon is compacted
+    whenever a literal is stored, so a horizon of 1 keeps only present
+    values. Storing the value a literal already has adds no history, so
+    a value stored in the past holds until the literal next changes.
+
+    Literals are keyed by the interned ids of their arguments, and
+    queries are matched against them with unify_terms. As in Model,
+    literals with variable arguments are indexed under WILDCARD."""
+
+    def __init__(self, horizon=1, model=None):
+        self.horizon = horizon
+        self.model = Model if model is None else model
+        self.step = 0
+        # row of every literal, by predicate and key
+        self.rows = defaultdict(dict)
+        # the step from which the present value of a literal holds, and
+        # that value, by row
+        self.steps = array('l')
+        self.values = array('b')
+        # (step, value) pairs of the earlier values of a literal within
+        # the horizon, oldest first, by row
+        self.earlier = {}
+        self.index = defaultdict(dict)
+        # number of literals, and of distinct terms at each argument
+        # position of each predicate
+        self.count = 0
+        self.distinct = defaultdict(dict)
+        # literals stored during the current step
+        self.latest = self.model()
+        # keys of the literals stored since changes was last called, by
+        # predicate, once it has been called
+        self.changed = None
+
+    @staticmethod
+    def key(args):
+        """Returns the interned key of a tuple of constants, or None if
+        one of them was never interned."""
+        key = tuple(TERMS.lookup(arg) for arg in args)
+        if None in key:
+            return None
+        return key
+
+    @staticmethod
+    def literal(key):
+        """Returns the arguments of a literal from its interned key."""
+        return tuple(TERMS.name(term) for term in key)
+
+    def ask(self, predicate: str, args: tuple, time=None):
+        """Returns the value of a literal at a relative time, or None if
+        it is unknown."""
+        row = self.rows.get(predicate, {}).get(self.key(args))
+        if row is None:
+            return None
+        return self.value(row, time)
+
+    def value(self, row, time=None):
+        """Returns the value of the literal of a row at a relative time,
+        or None if it was not known yet."""
+        if time is None or time >= 0:
+            return self.values[row] == 1
+        step = self.step + time
+        if self.steps[row] <= step:
+            return self.values[row] == 1
+        for earlier, value in reversed(self.earlier.get(row, ())):
+            if earlier <= step:
+                return value
+        return None
+
+    def history(self, predicate: str, args: tuple):
+        """Returns the (step, value) pairs kept of a literal, oldest
+        first."""
+        row = self.rows.get(predicate, {}).get(self.key(args))
+        if row is None:
+            return []
+        return self.earlier.get(row, []) + \
+            [(self.steps[row], self.values[row] == 1)]
+
+    def store(self, predicate: str, args: tuple, value: bool, time=0):
+        """Stores the value of a literal from a relative time
+        onwards."""
+        key = tuple(TERMS.intern(arg) for arg in args)
+        rows = self.rows[predicate]
+        row = rows.get(key)
+        step = self.step + min(time, 0)
+        if row is None:
+            row = rows[key] = len(self.steps)
+            self.steps.append(step)
+            self.values.append(value)
+            self.count += 1
+            index = self.index[predicate]
+            distinct = self.distinct[predicate]
+            if min(key, default=0) < 0:
+                index.setdefault(WILDCARD, {})[key] = None
+            else:
+                for position, term in enumerate(key):
+                    if (position, term) not in index:
+                        index[(position, term)] = {}
+                        distinct[position] = distinct.get(position, 0) + 1
+                    index[(position, term)][key] = None
+        else:
+            self.record(row, step, value)
+        if self.changed is not None:
+            self.changed[predicate].add(key)
+        if time >= 0:
+            self.latest.store(predicate, args, value)
+
+    def record(self, row, step, value):
+        """Stores the value of the literal of a row from a step onwards,
+        and compacts its history beyond the horizon."""
+        latest = self.steps[row]
+        present = self.values[row] == 1
+        if step > latest and value != present:
+            self.earlier.setdefault(row, []).append((latest, present))
+            self.steps[row] = step
+            self.values[row] = value
+        elif step == latest:
+            self.values[row] = value
+        elif step < latest:
+            entries = self.earlier.get(row, []) + [(latest, present)]
+            i = bisect_right([earlier for earlier, _ in entries], step)
+            if i and entries[i - 1][0] == step:
+                entries[i - 1] = (step, value)
+            else:
+                entries.insert(i, (step, value))
+            self.steps[row], self.values[row] = entries.pop()
+            self.earlier[row] = entries
+        entries = self.earlier.get(row)
+        if entries:
+            # values at or before the cutoff collapse into the latest
+            cutoff = self.step - self.horizon + 1
+            if self.steps[row] <= cutoff:
+                del self.earlier[row]
+                return
+            i = bisect_right([earlier for earlier, _ in entries], cutoff)
+            if i > 1:
+                del entries[:i - 1]
+
+    def fetch(self, sentence, initial_substitution=None):
+        """Returns all substitutions which make a predicate valid at its
+        relative time, optionally starting with an initial
+        substitution."""
+        return list(self.iter_fetch(sentence, initial_substitution))
+
+    def iter_fetch(self, sentence, initial_substitution=None):
+        """Lazily yields the substitutions which make a predicate valid
+        at its relative time, optionally starting with an initial
+        substitution."""
+        rows = self.rows.get(sentence.name)
+        if not rows:
+            return
+        pattern = sentence.terms
+        if initial_substitution:
+            pattern = tuple(TERMS.intern(initial_substitution[arg])
+                            if arg in initial_substitution else term
+                            for arg, term in zip(sentence.args, pattern))
+        else:
+            initial_substitution = {}
+        keys = [term if type(term) is int and term >= 0 else None
+                for term in pattern]
+        time = sentence.time
+        names = TERMS.names
+        values = self.values
+        for key in candidates(rows, self.index[sentence.name], keys):
+            if time is None or time >= 0:
+                value = values[rows[key]] == 1
+            else:
+                value = self.value(rows[key], time)
+            if value != sentence.value:
+                continue
+            bindings = unify_terms(pattern, key)
+            if bindings is not False:
+                substitution = dict(initial_substitution)
+                for var, term in bindings.items():
+                    # stored literals may bind variables to variables
+                    substitution[names[~var]] = \
+                        names[term] if term >= 0 else names[~term]
+                yield substitution
+
+    def cardinality(self, predicate: str, position=None, term=None):
+        """Returns the number of literals of a predicate, or the number
+        of them holding a term at an argument position."""
+        if position is None:
+            return len(self.rows.get(predicate, ()))
+        term = TERMS.lookup(term)
+        return len(self.index.get(predicate, {}).get((position, term), ()))
+
+    def selectivity(self, predicate: str, position: int):
+        """Returns the expected fraction of the literals of a predicate
+        holding any one term at an argument position."""
+        return 1 / max(1, self.distinct.get(predicate, {}).get(position, 1))
+
+    def view(self, predicate: str, time=None):
+        """Returns a dictionary of the values of every literal of a
+        predicate known at a relative time."""
+        literals = {}
+        for key, row in self.rows.get(predicate, {}).items():
+            value = self.value(row, time)
+            if value is not None:
+                literals[self.literal(key)] = value
+        return literals
+
+    def changes(self):
+        """Returns the present values of the literals stored since the
+        last call, or of every literal on the first call, as
+        {predicate: {args: value}}. Stored literals are only tracked once
+        this has been called."""
+        if self.changed is None:
+            changed = {predicate: rows.keys()
+                       for predicate, rows in self.rows.items()}
+        else:
+            changed = self.changed
+        self.changed = defaultdict(set)
+        return {predicate: {self.literal(key):
+                            self.value(self.rows[predicate][key])
+                            for key in keys}
+                for predicate, keys in changed.items()}
+
+    def snapshot(self):
+        """Returns a Model of the present value of every literal."""
+        model = self.model(action=self.action)
+        for predicate, rows in self.rows.items():
+            for key, row in rows.items():
+                model.store(predicate, self.literal(key), self.value(row))
+        return model
+
+    def advance(self, action):
+        """Starts a new step, taken by an action."""
+        self.step += 1
+        self.latest = self.model(action=action)
+
+    @property
+    def action(self):
+        """Returns the most recent action."""
+        return self.latest.action
+
+    def __len__(self):
+        return self.count
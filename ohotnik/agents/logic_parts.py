@@ -1,5 +1,8 @@
 """Grammatical elements of a logical sentence."""
 
+from .substitution import EMPTY
+from .terms import TERMS
+
 
 class LogicPart:
 
@@ -31,17 +34,19 @@ class AndClause(LogicPart):
         self.time = time
 
     def eval(self, kb, time=None):
+        """Evaluates the clauses in the order planned by the knowledge
+        base, returning every substitution which satisfies them all."""
         if self.time is not None:
             time = self.time
-        substitutions = [{}]
-        for clause in self.clauses:
+        substitutions = [EMPTY]
+        for i in kb.plan(self.clauses):
+            clause = self.clauses[i]
             new_subs = []
             for sub in substitutions:
                 result = clause.eval(kb, time, sub)
                 if result:
                     for r in result:
-                        r.update(sub)
-                        new_subs.append(r)
+                        new_subs.append(sub.extend_all(r))
             if not new_subs:
                 return False
             substitutions = new_subs
@@ -128,6 +133,7 @@ class Predicate(LogicPart):
         self.value = value
         self.time = time
         self.carry = carry
+        self.terms = intern_args(self.args)
 
     def substitute(self, kb, time=None, sub=None, value=True):
         if self.time is not None:
@@ -140,9 +146,7 @@ class Predicate(LogicPart):
                 arg = arg.eval(kb, time, sub)
                 if arg is None:
                     return None
-            if arg in sub:
-                arg = sub[arg]
-            args.append(arg)
+            args.append(sub.get(arg, arg))
         return type(self)(self.name, args, self.value and value, time)
 
     def eval(self, kb, time=None, sub=None):
@@ -150,17 +154,6 @@ class Predicate(LogicPart):
         base."""
         if self.time is not None:
             time = self.time
-        if sub is None:
-            sub = {}
-        args = []
-        for arg in self.args:
-            if isinstance(arg, FunctionNode):
-                arg = arg.eval(kb, time, sub)
-                if arg is None:
-                    return None
-            if arg in sub:
-                arg = sub[arg]
-            args.append(arg)
         return kb.fetch(self.substitute(kb, time, sub))
 
 
@@ -171,6 +164,7 @@ class FunctionNode(LogicPart):
         self.operator = name
         self.args = tuple(args)
         self.time = time
+        self.term = (TERMS.intern(name),) + intern_args(self.args)
 
     def eval(self, kb, time=None, sub=None):
         if self.time is not None:
@@ -183,12 +177,16 @@ class FunctionNode(LogicPart):
                 arg = arg.eval(kb, time, sub)
                 if arg is None:
                     return None
-            if arg in sub:
-                arg = sub[arg]
-            args.append(arg)
+            args.append(sub.get(arg, arg))
         return kb.ask_function(self.name, tuple(args), time)
 
 
+def intern_args(args):
+    """Returns the interned terms of a tuple of arguments."""
+    return tuple(arg.term if isinstance(arg, FunctionNode)
+                 else TERMS.intern(arg) for arg in args)
+
+
 class UniquenessConstraint(LogicPart):
     """Constraints the predicate so that, if one predicate is True, for
     all other constants in the specified argument, that predicate is
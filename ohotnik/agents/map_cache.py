@@ -0,0 +1,182 @@
+"""A persistent cache of the maps learned by RoverKnowledge.
+
+Maps are saved to one compact binary file per game, named after a hash
+of the game file, so that later playthroughs of the same game can start
+from what earlier ones explored. A map file holds a header, a table of
+names, and then the exits and go functions as records of native int32
+name ids, which are read straight out of a memory map.
+
+Maps learned while telling apart locations which share a name also hold
+the nodes of the LocationIdentity, so that the labels of the exits and
+go functions keep their names, descriptions and merges when loaded.
+
+    header   magic, version, byte order, name count, node count,
+             exit count, go count
+    names    (uint16 length, utf-8 bytes) per name, padded to 4 bytes
+    nodes    (name, label, root, has signature) per node
+    signs    8-byte signature per node, zeros if it has none
+    exits    (location, direction) per exit
+    gos      (location, direction, destination) per go function"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b'OHMP'
+VERSION = 2
+HEADER = struct.Struct('<4sBBHIIII')
+LENGTH = struct.Struct('<H')
+BYTE_ORDERS = {'little': 0, 'big': 1}
+# typecode for name ids
+TYPECODE = 'i'
+SIGNATURE_SIZE = 8
+
+
+def game_key(game):
+    """Returns the hexadecimal SHA-256 hash of the contents of a game
+    file."""
+    digest = hashlib.sha256()
+    with open(game, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_map(kb, path):
+    """Writes the exits and go functions known to a RoverKnowledge to a
+    map file, with the labels of its locations if it has any."""
+    ids = {}
+
+    def intern(name):
+        return ids.setdefault(name, len(ids))
+    nodes = array(TYPECODE)
+    signs = bytearray()
+    if kb.identity is not None:
+        for name, label, sign, root in kb.identity.nodes():
+            nodes.extend((intern(name), intern(label), root,
+                          sign is not None))
+            signs += sign or bytes(SIGNATURE_SIZE)
+    exits = array(TYPECODE)
+    for location, direction in kb.exit_list():
+        exits.extend((intern(location), intern(direction)))
+    gos = array(TYPECODE)
+    for location, direction, destination in kb.go_graph():
+        gos.extend((intern(location), intern(direction),
+                    intern(destination)))
+    names = bytearray()
+    for name in ids:
+        encoded = name.encode('utf-8')
+        names += LENGTH.pack(len(encoded)) + encoded
+    names += bytes(-len(names) % exits.itemsize)
+    # each writer has its own temporary file, as several processes may
+    # save the map of one game at once
+    with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path) or '.',
+            prefix=os.path.basename(path) + '.', suffix='.tmp',
+            delete=False) as fh:
+        try:
+            fh.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDERS[sys.byteorder],
+                                 0, len(ids), len(nodes) // 4,
+                                 len(exits) // 2, len(gos) // 3))
+            fh.write(names)
+            nodes.tofile(fh)
+            fh.write(signs)
+            exits.tofile(fh)
+            gos.tofile(fh)
+        except BaseException:
+            fh.close()
+            os.remove(fh.name)
+            raise
+    # readers never see a partly written file
+    os.replace(fh.name, path)
+
+
+def load_map(path, kb):
+    """Gives a RoverKnowledge the exits and go functions of a map file.
+    Returns False if the file is not a map file of this version, or if it
+    holds labels the RoverKnowledge cannot take: it does not tell apart
+    locations sharing a name, or already has labels of its own."""
+    if os.path.getsize(path) < HEADER.size:
+        return False
+    with open(path, 'rb') as fh, \
+            mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, version, byte_order, _, name_count, node_count, \
+            exit_count, go_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            return False
+        if node_count and (kb.identity is None or len(kb.identity)):
+            return False
+        names = []
+        offset = HEADER.size
+        for _ in range(name_count):
+            (length,) = LENGTH.unpack_from(data, offset)
+            offset += LENGTH.size
+            names.append(str(data[offset:offset + length], 'utf-8'))
+            offset += length
+        itemsize = array(TYPECODE).itemsize
+        offset += -offset % itemsize
+        nodes = array(TYPECODE)
+        nodes.frombytes(data[offset:offset + 4 * itemsize * node_count])
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            nodes.byteswap()
+        offset += 4 * itemsize * node_count
+        if node_count:
+            kb.identity.restore([
+                (names[nodes[i]], names[nodes[i + 1]],
+                 data[offset + SIGNATURE_SIZE * (i // 4):
+                      offset + SIGNATURE_SIZE * (i // 4 + 1)]
+                 if nodes[i + 3] else None, nodes[i + 2])
+                for i in range(0, len(nodes), 4)])
+        offset += SIGNATURE_SIZE * node_count
+        end = offset + itemsize * (2 * exit_count + 3 * go_count)
+        if byte_order == BYTE_ORDERS[sys.byteorder]:
+            view = memoryview(data)[offset:end].cast(TYPECODE)
+        else:
+            view = array(TYPECODE)
+            view.frombytes(data[offset:end])
+            view.byteswap()
+        # exits and go functions are added as they are, since telling
+        # them would resolve their labels as names seen by the agent
+        try:
+            for i in range(0, 2 * exit_count, 2):
+                kb.add_exit(names[view[i]], names[view[i + 1]])
+            for i in range(2 * exit_count, len(view), 3):
+                kb.add_go(names[view[i]], names[view[i + 1]],
+                          names[view[i + 2]])
+        finally:
+            if isinstance(view, memoryview):
+                view.release()
+    return True
+
+
+class MapCache:
+    """A directory of map files, one per game. A frozen cache is only
+    read, so that what is loaded from it does not change."""
+
+    def __init__(self, directory, frozen=False):
+        self.directory = directory
+        self.frozen = frozen
+
+    def path(self, game):
+        """Returns the path of the map file of a game."""
+        return os.path.join(self.directory, f'{game_key(game)}.map')
+
+    def load(self, game, kb):
+        """Gives a RoverKnowledge the cached map of a game. Returns True
+        if a map was found and loaded."""
+        path = self.path(game)
+        if not os.path.exists(path):
+            return False
+        return load_map(path, kb)
+
+    def save(self, game, kb):
+        """Saves the map known to a RoverKnowledge for a game, unless the
+        cache is frozen."""
+        if self.frozen:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        save_map(kb, self.path(game))
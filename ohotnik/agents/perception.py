@@ -0,0 +1,144 @@
+"""Perception shared by the rover agents.
+
+Game feedback is turned into typed observation records, which each agent
+then translates for its own knowledge base:
+
+    At(location, description)         the agent is at a location
+    Go(location, direction, destination)
+                                      a move led from location to
+                                      destination, which is None if the
+                                      move failed
+    Exit(location, direction)         an exit leads from a location
+
+Parsed rooms are kept in a least recently used cache keyed by a hash
+of their feedback, since agents see the same room descriptions again
+whenever they re-enter a room."""
+
+import hashlib
+from collections import OrderedDict, namedtuple
+
+from .text import parse_location
+
+REJECTIONS = ["I don't know the word"]
+DEBUG = True
+# number of parsed room descriptions kept
+ROOM_CACHE_SIZE = 1024
+
+At = namedtuple('At', ['location', 'description'])
+Go = namedtuple('Go', ['location', 'direction', 'destination'])
+Exit = namedtuple('Exit', ['location', 'direction'])
+At.kind, Go.kind, Exit.kind = 'at', 'go', 'exit'
+
+
+def perceive_room(feedback):
+    """Returns the At record and the Exit records of a room
+    description."""
+    location, description, exits = parse_location(feedback)
+    return (At(location, description),
+            tuple(Exit(location, direction) for direction in exits))
+
+
+def feedback_key(feedback):
+    """Returns a short hash of a feedback string."""
+    return hashlib.blake2b(feedback.encode('utf-8'),
+                           digest_size=16).digest()
+
+
+class RoomCache:
+    """A least recently used cache of parsed room descriptions, keyed by
+    a hash of their feedback so that long descriptions are not kept.
+    A size of 0 disables caching."""
+
+    def __init__(self, size=ROOM_CACHE_SIZE):
+        self.size = size
+        self.rooms = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, feedback):
+        """Returns the records of a room description, parsing it if it
+        is not cached."""
+        key = feedback_key(feedback)
+        room = self.rooms.get(key)
+        if room is not None:
+            self.hits += 1
+            self.rooms.move_to_end(key)
+            return room
+        self.misses += 1
+        room = perceive_room(feedback)
+        if self.size > 0:
+            self.rooms[key] = room
+            if len(self.rooms) > self.size:
+                self.rooms.popitem(last=False)
+        return room
+
+    def hit_rate(self):
+        """Returns the fraction of lookups found in the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """Returns the hits, misses, hit rate and number of cached
+        rooms."""
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit rate': self.hit_rate(), 'rooms': len(self.rooms)}
+
+    def clear(self):
+        """Empties the cache and resets its statistics."""
+        self.rooms.clear()
+        self.hits = self.misses = 0
+
+    def __len__(self):
+        return len(self.rooms)
+
+
+class Perception:
+    """Turns the feedback to commands into observation records."""
+
+    def __init__(self, cache_size=ROOM_CACHE_SIZE):
+        # what the last feedback was recognized as, for debugging
+        self.last_parse = None
+        self.rooms = RoomCache(cache_size)
+
+    def perceive(self, feedback, command, location):
+        """Returns the observation records of the feedback to a command
+        given at a location."""
+        # Input can take a few forms
+        # 1. Parser feedback when a command is not understood
+        #
+        # 2. Game feedback when a command is understood but does not
+        # change the world state (includes feedback from examining and
+        # also feedback from commands that have no outcome)
+        #
+        # 3. Game feedback when a command changes the world state
+        if self.is_rejection(feedback):
+            return []
+        if command.startswith('go'):
+            direction = command.replace('go ', '')
+            if not self.is_move(feedback):
+                return [Go(location, direction, None)]
+            at, exits = self.rooms.get(feedback)
+            return [at, Go(location, direction, at.location), *exits]
+        # Assume input is in response to the 'look' command
+        if command == 'look' and '\n' in feedback:
+            at, exits = self.rooms.get(feedback)
+            return [at, *exits]
+        return []
+
+    def is_rejection(self, feedback):
+        """Returns True if the game did not understand the command."""
+        for r in REJECTIONS:
+            if feedback.startswith(r):
+                if DEBUG:
+                    self.last_parse = 'rejection'
+                return True
+        return False
+
+    def is_move(self, feedback):
+        """Returns True if the feedback describes a new location."""
+        end = feedback.find('\n')
+        if end < 0 or feedback[:end].endswith('.'):
+            return False
+        if DEBUG:
+            self.last_parse = 'move'
+        return True
@@ -0,0 +1,100 @@
+"""A join-order planner for conjunctions of predicates."""
+
+from collections import namedtuple
+
+from .logic_parts import Predicate, FunctionNode
+from .terms import isvar
+
+Plan = namedtuple('Plan', ['clauses', 'order', 'estimates', 'size'])
+
+
+def variables(arg):
+    """Returns the variables appearing in an argument."""
+    if isinstance(arg, FunctionNode):
+        result = set()
+        for a in arg.args:
+            result |= variables(a)
+        return result
+    if isvar(arg):
+        return {arg}
+    return set()
+
+
+class Planner:
+    """Orders the conjuncts of a conjunction so that the most selective
+    ones are joined first, using the cardinality statistics of a fact
+    store.
+
+    Plans are cached per conjunction of two clauses or more and set of
+    initially bound variables. A cached plan is remade once the store has
+    doubled or halved in size since it was made."""
+
+    def __init__(self, facts):
+        self.facts = facts
+        self.plans = {}
+
+    def plan(self, clauses, bound=frozenset(), first=None):
+        """Returns the plan for joining a sequence of clauses, given the
+        variables already bound. If first is given, that clause is
+        joined first."""
+        size = max(1, len(self.facts))
+        if len(clauses) < 2:
+            # nothing to order, and such lists are often built per call,
+            # so caching them would only grow the cache
+            return self.make_plan(clauses, bound, first, size)
+        key = (id(clauses), bound, first)
+        plan = self.plans.get(key)
+        if plan is None or plan.clauses is not clauses or \
+                not plan.size / 2 <= size <= plan.size * 2:
+            plan = self.make_plan(clauses, bound, first, size)
+            self.plans[key] = plan
+        return plan
+
+    def make_plan(self, clauses, bound, first, size):
+        """Greedily orders clauses by their estimated number of rows per
+        binding of the variables bound before them."""
+        if not all(isinstance(clause, Predicate) for clause in clauses):
+            return Plan(clauses, list(range(len(clauses))),
+                        [None] * len(clauses), size)
+        bound = set(bound)
+        remaining = list(range(len(clauses)))
+        order = []
+        estimates = []
+        while remaining:
+            if first is not None and not order:
+                best = first
+                cost = self.cost(clauses[first], bound)
+            else:
+                cost, best = min((self.cost(clauses[i], bound), i)
+                                 for i in remaining)
+            remaining.remove(best)
+            order.append(best)
+            estimates.append(cost[0])
+            for arg in clauses[best].args:
+                bound |= variables(arg)
+        return Plan(clauses, order, estimates, size)
+
+    def cost(self, clause, bound):
+        """Returns the estimated rows of a clause per binding of the
+        bound variables, and the negated number of bound arguments, so
+        that ties go to the clause with more bound arguments."""
+        name = clause.name
+        estimate = float(self.facts.cardinality(name))
+        count = 0
+        for position, arg in enumerate(clause.args):
+            if isinstance(arg, FunctionNode):
+                if not variables(arg) <= bound:
+                    # function terms can only be resolved once their
+                    # arguments are bound
+                    return (float('inf'), 0)
+                estimate *= self.facts.selectivity(name, position)
+            elif isvar(arg):
+                if arg not in bound:
+                    continue
+                estimate *= self.facts.selectivity(name, position)
+            else:
+                total = max(1, self.facts.cardinality(name))
+                estimate *= self.facts.cardinality(name, position,
+                                                   arg) / total
+            count += 1
+        return (estimate, -count)
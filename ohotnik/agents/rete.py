@@ -0,0 +1,265 @@
+"""A Rete matching network for the premises of implications.
+
+Literals enter the network through alpha memories, one per predicate
+pattern, and are joined conjunct by conjunct in a chain of join nodes.
+Complete matches are queued on an agenda, so the cost of forward
+chaining scales with the literals that changed rather than with the size
+of the knowledge base."""
+
+from collections import OrderedDict
+
+from .logic_parts import Predicate, AndClause, LogicPart, FunctionNode
+from .substitution import EMPTY
+
+# the views of the knowledge base that the network can follow: the
+# present state and the state before the last action
+VIEWS = (0, -1)
+
+
+def isvar(identifier):
+    """Returns True if an identifier is a variable."""
+    return isinstance(identifier, str) and identifier.isupper()
+
+
+class Token:
+    """A partial match: the literal matched by one conjunct, linked to
+    the partial match of the conjuncts before it."""
+    __slots__ = ('parent', 'fact', 'sub', 'children')
+
+    def __init__(self, parent, fact, sub):
+        self.parent = parent
+        self.fact = fact
+        self.sub = sub
+        self.children = {}
+
+
+class AlphaMemory:
+    """The literals of a predicate that match a pattern of constants and
+    repeated variables."""
+
+    def __init__(self, name, args, value):
+        self.name = name
+        self.value = value
+        self.arity = len(args)
+        self.constants = []
+        self.repeats = []
+        first = {}
+        for position, arg in enumerate(args):
+            if not isvar(arg):
+                self.constants.append((position, arg))
+            elif arg in first:
+                self.repeats.append((position, first[arg]))
+            else:
+                first[arg] = position
+        self.items = {}
+        self.joins = []
+
+    def test(self, args):
+        """Returns True if a literal matches this memory's pattern."""
+        if len(args) != self.arity:
+            return False
+        for position, constant in self.constants:
+            if args[position] != constant:
+                return False
+        for position, other in self.repeats:
+            if args[position] != args[other]:
+                return False
+        return True
+
+    def add(self, args):
+        """Adds a literal and activates the joins below it."""
+        if args in self.items or not self.test(args):
+            return
+        self.items[args] = None
+        for join in self.joins:
+            join.right_add(args)
+
+    def remove(self, args):
+        """Removes a literal and any partial matches using it."""
+        if args not in self.items:
+            return
+        del self.items[args]
+        for join in self.joins:
+            join.right_remove(args)
+
+
+class JoinNode:
+    """Joins the partial matches of earlier conjuncts with the literals
+    of one alpha memory on their shared variables."""
+
+    def __init__(self, network, alpha, args, bound, child=None):
+        self.network = network
+        self.alpha = alpha
+        self.child = child
+        self.key_vars = []
+        self.key_positions = []
+        self.bindings = []
+        for position, arg in enumerate(args):
+            if not isvar(arg):
+                continue
+            if arg in bound:
+                if arg not in self.key_vars:
+                    self.key_vars.append(arg)
+                    self.key_positions.append(position)
+            elif arg not in (var for _, var in self.bindings):
+                self.bindings.append((position, arg))
+        self.left = {}
+        self.right = {}
+        self.by_fact = {}
+        alpha.joins.append(self)
+        for fact in alpha.items:
+            self.right_add(fact)
+
+    def left_add(self, token):
+        """Activates the node with a new partial match."""
+        key = tuple(token.sub[var] for var in self.key_vars)
+        self.left.setdefault(key, {})[token] = None
+        for fact in self.right.get(key, ()):
+            self.emit(token, fact)
+
+    def left_remove(self, token):
+        """Retracts a partial match and everything built from it."""
+        key = tuple(token.sub[var] for var in self.key_vars)
+        tokens = self.left.get(key)
+        if tokens is not None:
+            tokens.pop(token, None)
+        for child in token.children:
+            self.by_fact[child.fact].pop(child, None)
+            self.child.left_remove(child)
+        token.children = {}
+
+    def right_add(self, fact):
+        """Activates the node with a new literal."""
+        key = tuple(fact[position] for position in self.key_positions)
+        self.right.setdefault(key, {})[fact] = None
+        for token in list(self.left.get(key, ())):
+            self.emit(token, fact)
+
+    def right_remove(self, fact):
+        """Retracts a literal and every match built from it."""
+        key = tuple(fact[position] for position in self.key_positions)
+        facts = self.right.get(key)
+        if facts is not None:
+            facts.pop(fact, None)
+        for token in self.by_fact.pop(fact, ()):
+            del token.parent.children[token]
+            self.child.left_remove(token)
+
+    def emit(self, token, fact):
+        """Extends a partial match with a literal and passes it on."""
+        self.network.joins += 1
+        sub = token.sub.extend_all(
+            {var: fact[position] for position, var in self.bindings})
+        new = Token(token, fact, sub)
+        token.children[new] = None
+        self.by_fact.setdefault(fact, {})[new] = None
+        self.child.left_add(new)
+
+
+class ProductionNode:
+    """Queues complete matches of a premise on the network agenda."""
+
+    def __init__(self, network, implication):
+        self.network = network
+        self.implication = implication
+
+    def left_add(self, token):
+        """Queues a complete match."""
+        self.network.agenda[token] = self.implication
+
+    def left_remove(self, token):
+        """Withdraws a complete match that has not yet fired."""
+        self.network.agenda.pop(token, None)
+
+
+class ReteNetwork:
+    """A network of alpha memories and join nodes compiled from the
+    premises of implications."""
+
+    def __init__(self):
+        self.alpha = {}
+        self.memories = {}
+        self.agenda = OrderedDict()
+        self.implications = []
+        self.joins = 0
+
+    @staticmethod
+    def conjuncts(premise):
+        """Returns the (view, predicate) pairs of a premise, or None if
+        the premise cannot be compiled."""
+        if isinstance(premise, AndClause):
+            clauses, time = premise.clauses, premise.time
+        elif isinstance(premise, Predicate):
+            clauses, time = [premise], None
+        else:
+            return None
+        conjuncts = []
+        for clause in clauses:
+            if not isinstance(clause, Predicate):
+                return None
+            if any(isinstance(arg, LogicPart) for arg in clause.args):
+                return None
+            view = time if clause.time is None else clause.time
+            view = min(view or 0, 0)
+            if view not in VIEWS:
+                return None
+            conjuncts.append((view, clause))
+        return conjuncts
+
+    def compile(self, implication, kb):
+        """Adds an implication to the network, queuing any matches
+        already in the knowledge base. Returns False if its premise
+        cannot be compiled, uses a predicate with literals holding
+        variables, or reads a function, whose value the network cannot
+        follow."""
+        conjuncts = self.conjuncts(implication.premise)
+        if not conjuncts or any(clause.name in kb.unground or
+                                any(isinstance(arg, FunctionNode)
+                                    for arg in clause.args)
+                                for _, clause in conjuncts):
+            return False
+        node = ProductionNode(self, implication)
+        joins = []
+        bound = set()
+        for view, clause in conjuncts:
+            alpha = self.alpha_memory(view, clause, kb)
+            joins.append(JoinNode(self, alpha, clause.args, set(bound)))
+            bound.update(arg for arg in clause.args if isvar(arg))
+        for join, child in zip(joins, joins[1:] + [node]):
+            join.child = child
+        self.implications.append(implication)
+        joins[0].left_add(Token(None, None, EMPTY))
+        return True
+
+    def alpha_memory(self, view, clause, kb):
+        """Returns the alpha memory for a pattern, creating and filling
+        it from the knowledge base if necessary."""
+        pattern = tuple(None if isvar(arg) else arg for arg in clause.args)
+        repeats = tuple(clause.args.index(arg) if isvar(arg) else -1
+                        for arg in clause.args)
+        key = (view, clause.name, clause.value, pattern, repeats)
+        if key not in self.memories:
+            alpha = AlphaMemory(clause.name, clause.args, clause.value)
+            self.memories[key] = alpha
+            self.alpha.setdefault((view, clause.name), []).append(alpha)
+            for args, value in kb.view(clause.name, view).items():
+                if value == alpha.value:
+                    alpha.add(args)
+        return self.memories[key]
+
+    def update(self, view, name, args, old, new):
+        """Propagates a change in the value of a literal as seen from a
+        view of the knowledge base."""
+        if old == new:
+            return
+        for alpha in self.alpha.get((view, name), ()):
+            if alpha.value == old:
+                alpha.remove(args)
+            elif alpha.value == new:
+                alpha.add(args)
+
+    def pop(self):
+        """Returns the next complete match on the agenda as an
+        (implication, substitution) pair."""
+        token, implication = self.agenda.popitem(last=False)
+        return implication, token.sub
@@ -0,0 +1,259 @@
+"""All-pairs next-hop tables for fully mapped worlds.
+
+A route table holds the distance between every pair of locations and
+the next location on a shortest path between them, so that the next
+move towards any goal is a single lookup. Tables are built by a
+breadth-first search from every location and updated in place when an
+edge is added. When the edges of a location change otherwise, only the
+locations which could reach it are searched again. NumPy is used when
+it is available, and plain dictionaries otherwise."""
+
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class RouteTable:
+    """An all-pairs next-hop table kept in dictionaries.
+
+    Tables are built from (location, direction, destination) triples
+    and only hold the locations appearing in them."""
+
+    def __init__(self, edges=()):
+        self.ids = {}
+        self.locations = []
+        # {next location id: direction}, by location id
+        self.adjacency = []
+        self.distances = None
+        self.hops = None
+        edges = [(self.node(location), direction, self.node(destination))
+                 for location, direction, destination in edges]
+        for i, direction, k in edges:
+            self.adjacency[i].setdefault(k, direction)
+        self.build()
+
+    def node(self, location):
+        """Returns the id of a location, adding it if it is new."""
+        i = self.ids.get(location)
+        if i is None:
+            i = self.ids[location] = len(self.locations)
+            self.locations.append(location)
+            self.adjacency.append({})
+            self.grow()
+        return i
+
+    def grow(self):
+        """Makes room for a new location in the tables."""
+        if self.distances is not None:
+            i = len(self.locations) - 1
+            self.distances.append({i: 0})
+            self.hops.append({})
+
+    def build(self):
+        """Searches breadth first from every location."""
+        self.distances = []
+        self.hops = []
+        for source in range(len(self.locations)):
+            distances, hops = self.search(source)
+            self.distances.append(distances)
+            self.hops.append(hops)
+
+    def search(self, source):
+        """Returns the distances and next locations from a location id,
+        as dictionaries by location id."""
+        distances = {source: 0}
+        hops = {}
+        queue = deque([source])
+        while queue:
+            i = queue.popleft()
+            for k in self.adjacency[i]:
+                if k not in distances:
+                    distances[k] = distances[i] + 1
+                    hops[k] = k if i == source else hops[i]
+                    queue.append(k)
+        return distances, hops
+
+    def sources(self, i):
+        """Returns the ids of the locations which can reach location id
+        i."""
+        return [source for source, distances in enumerate(self.distances)
+                if i in distances]
+
+    def research(self, source):
+        """Searches again from a location id."""
+        self.distances[source], self.hops[source] = self.search(source)
+
+    def set_edges(self, location, edges):
+        """Replaces the (direction, destination) edges leaving a
+        location. Only the paths of the locations which can reach it
+        may change, so only those are searched again."""
+        u = self.node(location)
+        adjacency = {}
+        for direction, destination in edges:
+            adjacency.setdefault(self.node(destination), direction)
+        if adjacency == self.adjacency[u]:
+            return
+        self.adjacency[u] = adjacency
+        for source in self.sources(u):
+            self.research(source)
+
+    def add_edge(self, location, direction, destination):
+        """Adds an edge to the table, shortening every path that can
+        pass through it."""
+        u, v = self.node(location), self.node(destination)
+        new = v not in self.adjacency[u]
+        self.adjacency[u].setdefault(v, direction)
+        if new:
+            self.relax(u, v)
+
+    def relax(self, u, v):
+        """Shortens the paths that can pass through a new edge from u
+        to v."""
+        after = self.distances[v]
+        for i, distances in enumerate(self.distances):
+            before = distances.get(u)
+            if before is None:
+                continue
+            first = v if i == u else self.hops[i][u]
+            for j, distance in after.items():
+                distance += before + 1
+                if distance < distances.get(j, distance + 1):
+                    distances[j] = distance
+                    self.hops[i][j] = first
+
+    def distance(self, i, j):
+        """Returns the number of moves from location id i to location id
+        j, or None if j cannot be reached."""
+        return self.distances[i].get(j)
+
+    def next_node(self, i, j):
+        """Returns the id of the next location on a shortest path from
+        location id i to location id j, or None."""
+        return self.hops[i].get(j)
+
+    def next_hop(self, location, destination):
+        """Returns the direction of the first move from a location
+        towards a destination, or None."""
+        i, j = self.ids.get(location), self.ids.get(destination)
+        if i is None or j is None or i == j:
+            return None
+        k = self.next_node(i, j)
+        if k is None:
+            return None
+        return self.adjacency[i][k]
+
+    def path(self, location, destination):
+        """Returns the directions of a shortest path from a location to
+        a destination, or None if there is none."""
+        if location == destination:
+            return []
+        i, j = self.ids.get(location), self.ids.get(destination)
+        if i is None or j is None or self.distance(i, j) is None:
+            return None
+        path = []
+        while i != j:
+            k = self.next_node(i, j)
+            path.append(self.adjacency[i][k])
+            i = k
+        return path
+
+    def __len__(self):
+        return len(self.locations)
+
+
+class ArrayRouteTable(RouteTable):
+    """An all-pairs next-hop table kept in NumPy arrays. Distances and
+    next locations are square matrices, searched breadth first from
+    every location at once, one level per step."""
+
+    # distance of unreachable locations
+    UNREACHABLE = 2 ** 30
+
+    def grow(self):
+        if self.distances is not None:
+            i = len(self.locations) - 1
+            self.distances = np.pad(self.distances, (0, 1),
+                                    constant_values=self.UNREACHABLE)
+            self.distances[i, i] = 0
+            self.hops = np.pad(self.hops, (0, 1), constant_values=-1)
+
+    def build(self):
+        n = len(self.locations)
+        self.distances = np.full((n, n), self.UNREACHABLE,
+                                 dtype=np.int32)
+        self.hops = np.full((n, n), -1, dtype=np.int32)
+        # edges in compressed sparse rows
+        degrees = np.array([len(ks) for ks in self.adjacency],
+                           dtype=np.int64)
+        starts = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(degrees, out=starts[1:])
+        targets = np.array([k for ks in self.adjacency for k in ks],
+                           dtype=np.int64)
+        # the frontier is a list of (source, location, first hop) entries
+        rows = np.arange(n, dtype=np.int64)
+        nodes = rows.copy()
+        first = np.full(n, -1, dtype=np.int64)
+        self.distances[rows, nodes] = 0
+        level = 0
+        while len(rows):
+            level += 1
+            counts = degrees[nodes]
+            total = int(counts.sum())
+            if not total:
+                break
+            ends = np.cumsum(counts)
+            offsets = np.arange(total) - np.repeat(ends - counts, counts)
+            reached = targets[np.repeat(starts[nodes], counts) + offsets]
+            rows = np.repeat(rows, counts)
+            first = np.repeat(first, counts)
+            first = np.where(first < 0, reached, first)
+            new = self.distances[rows, reached] == self.UNREACHABLE
+            rows, reached, first = rows[new], reached[new], first[new]
+            _, unique = np.unique(rows * n + reached, return_index=True)
+            rows, nodes, first = rows[unique], reached[unique], first[unique]
+            self.distances[rows, nodes] = level
+            self.hops[rows, nodes] = first
+
+    def sources(self, i):
+        return np.nonzero(self.distances[:, i] < self.UNREACHABLE)[0]
+
+    def research(self, source):
+        distances, hops = self.search(source)
+        self.distances[source] = self.UNREACHABLE
+        self.hops[source] = -1
+        self.distances[source, list(distances)] = list(distances.values())
+        self.hops[source, list(hops)] = list(hops.values())
+
+    def relax(self, u, v):
+        before = self.distances[:, u]
+        sources = np.nonzero(before < self.UNREACHABLE)[0]
+        distances = before[sources, None] + 1 + self.distances[v]
+        shorter = distances < self.distances[sources]
+        first = np.where(sources == u, v, self.hops[sources, u])
+        self.distances[sources] = np.where(shorter, distances,
+                                           self.distances[sources])
+        self.hops[sources] = np.where(shorter, first[:, None],
+                                      self.hops[sources])
+
+    def distance(self, i, j):
+        distance = int(self.distances[i, j])
+        if distance == self.UNREACHABLE:
+            return None
+        return distance
+
+    def next_node(self, i, j):
+        k = int(self.hops[i, j])
+        if k < 0:
+            return None
+        return k
+
+
+def route_table(edges):
+    """Returns a route table of edges, using NumPy if it is
+    available."""
+    if np is None:
+        return RouteTable(edges)
+    return ArrayRouteTable(edges)
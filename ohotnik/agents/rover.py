@@ -13,72 +13,52 @@ TextWorld for flexibility"""
 # Check every word to see if it seems to be a direction
 # Add that to knowledge-base
 
-DIRECTIONS = ['north', 'south', 'east', 'west', 'up', 'down',
-              'northwest', 'northeast', 'southwest', 'southeast']
-REJECTIONS = ["I don't know the word"]
 MODES = [EXPLORATION, EXPLOITATION] = [1, 2]
-DEBUG = True
-
-from random import shuffle
-
-
-def tokenize(s):
-    """Yields lower-cased tokens from a string, split by white space and
-    punctuation."""
-    buffer = []
-    for c in s:
-        if c.isalnum():
-            buffer.append(c.lower())
-        elif buffer:
-            yield ''.join(buffer)
-            buffer = []
-    if buffer:
-        yield ''.join(buffer)
-
-
-def split_location(s):
-    """Returns a cleaned (location, description) pair."""
-    # TO-DO: This is a clumsy-ass way of doing this
-    # import pdb
-    # pdb.set_trace()
-    lines = (line for line in s.split('\n'))
-    line = ''
-    while line == '':
-        try:
-            line = next(lines)
-            # print('>', line)
-        except StopIteration:
-            return '', ''
-    location = clean(line)
-    description = '\n'.join([line for line in lines if line != ''])
-    # print(location)
-    # print(description)
-    return location, description
-
-
-def clean(s):
-    """Returns a cleaned version of the string with punctuation and
-    trailing spaces removed."""
-    return ' '.join(tokenize(s))
-
-
-class TreeNode:
-    def __init__(self, state, action, parent):
-        self.state = state
-        self.action = action
-        if parent:
-            self.depth = parent.depth + 1
-        else:
-            self.depth = 0
-        self.parent = parent
-
-    @property
-    def path(self):
+# number of shortest-path trees kept by RoverKnowledge
+TREE_CACHE_SIZE = 16
+# number of recent locations RoverOne remembers to detect loops
+HISTORY_SIZE = 32
+# shortest and longest cycles of locations RoverOne recognizes as a loop
+MIN_LOOP_PERIOD = 2
+MAX_LOOP_PERIOD = 4
+# number of times a cycle repeats before it counts as a loop
+LOOP_REPEATS = 3
+
+from collections import OrderedDict, deque
+import random
+
+from .identity import LocationIdentity, signature
+from .perception import ROOM_CACHE_SIZE, At, Go, Perception
+from .routes import route_table
+from .text import DIRECTIONS, OPPOSITES
+
+
+class PathTree:
+    """A breadth-first search from a root location, expanded only as far
+    as queries need. Keeps the (location, direction) link leading to
+    every discovered location, its depth, and the order in which
+    locations were discovered."""
+    __slots__ = ('root', 'parents', 'depths', 'order', 'expanded')
+
+    def __init__(self, root):
+        self.root = root
+        self.parents = {root: None}
+        self.depths = {root: 0}
+        self.order = [root]
+        # number of locations in order whose exits have been followed
+        self.expanded = 0
+
+    def path(self, destination):
+        """Returns the directions leading from the root to a
+        destination, or None if it has not been discovered."""
+        if destination not in self.parents:
+            return None
         path = []
-        node = self
-        while node.action:
-            path.append(node.action)
-            node = node.parent
+        link = self.parents[destination]
+        while link is not None:
+            location, direction = link
+            path.append(direction)
+            link = self.parents[location]
         return list(reversed(path))
 
 
@@ -89,8 +69,24 @@ class RoverKnowledge:
     predicates = {'exit'}
     functions = {'go'}
 
-    def __init__(self):
+    def __init__(self, aliases=False):
         self.locations = {}
+        # shortest-path trees by root, least recently used first
+        self.trees = OrderedDict()
+        # exits without a known destination, by location
+        self.frontier = {}
+        # all-pairs next hops, once computed by compute_routes
+        self.routes = None
+        self.init_identity(aliases)
+
+    def init_identity(self, aliases):
+        """Sets up the tracking of the current location, and of the
+        labels of locations which share a name if aliases is True."""
+        self.identity = LocationIdentity() if aliases else None
+        self.here = None
+        # (name, signature) of an 'at' observation not yet resolved
+        self.seen = None
+        self.last_move = None
 
     def tell(self, observation):
         """Receive an observation and record it in the knowledge
@@ -101,19 +97,33 @@ class RoverKnowledge:
         ('go', location, direction, destination): a function of
                                                   location and direction
                                                   returning destination
+        ('at', location, description): the agent arrived at a location
+
+        With aliases, locations sharing a name are told apart by their
+        descriptions and by the moves leading to them, and are given
+        labels such as 'maze #2'. 'go' and 'exit' observations following
+        an 'at' name the location seen, while other observations may use
+        labels.
         """
-        # TO-DO: Learn to recognize different locations with the same
-        # name
-        # I think the way to do this is treat locations as the same
-        # until they aren't, and then split them in two, marking all
-        # knowledge about them as "uncertain", but this will require our
-        # as-yet undeveloped uncertainty model
         if observation[0] == 'exit':
             predicate, location, direction = observation
+            if self.identity is not None:
+                location = self.resolve(location)
             self.add_exit(location, direction)
         elif observation[0] == 'go':
             function, location, direction, destination = observation
+            if self.identity is not None:
+                location, destination = self.resolve_move(
+                    location, direction, destination)
             self.add_go(location, direction, destination)
+            self.last_move = (location, direction, destination)
+            self.here = destination
+        elif observation[0] == 'at':
+            predicate, location, description = observation
+            if self.identity is None:
+                self.here = location
+            else:
+                self.seen = (location, signature(description))
         else:
             raise Exception(f'Unknown property {observation[0]}')
 
@@ -128,62 +138,285 @@ class RoverKnowledge:
         raise Exception(f'Unknown knowledge base property {prop}')
 
     def path(self, location, destination):
-        """Looks for a path from one state to another and returns one if
-        it exists."""
-        limit = 1
-        reached = set()
-        unexplored = True
-        while unexplored:
-            unexplored = False
-            frontier = [TreeNode(location, None, None)]
-            reached = set()
-            while frontier:
-                node = frontier.pop()
-                if node.state == destination:
-                    return node.path
-                if node.depth == limit:
-                    unexplored = True
-                    continue
-                for di, de in self.ask_list(node.state, 'go'):
-                    if de not in reached:
-                        frontier.append(
-                            TreeNode(de, di, node))
-                        reached.add(de)
-            limit += 1
-        return None
+        """Looks for a shortest path from one state to another and
+        returns one if it exists."""
+        if self.routes is not None:
+            return self.routes.path(location, destination)
+        tree = self.tree(location)
+        while destination not in tree.parents and self.expand(tree):
+            pass
+        return tree.path(destination)
 
     def explore(self, location):
-        """Looks for a location with unexplored exits and returns the
-        first found location, exit pair."""
-        limit = 1
-        unexplored = True
-        while unexplored:
-            unexplored = False
-            frontier = [TreeNode(location, None, None)]
-            reached = set()
-            while frontier:
-                node = frontier.pop()
-                e = self.unexplored(node.state)
-                if e:
-                    return node.state, e
-                if node.depth == limit:
-                    unexplored = True
-                    continue
-                for di, de in self.ask_list(node.state, 'go'):
-                    if de not in reached:
-                        frontier.append(
-                            TreeNode(de, di, node))
-                        reached.add(de)
-            limit += 1
-        return None, None
+        """Looks for the nearest location with unexplored exits and
+        returns it with one of those exits."""
+        tree = self.tree(location)
+        i = 0
+        while True:
+            while i >= len(tree.order):
+                if not self.expand(tree):
+                    return None, None
+            state = tree.order[i]
+            exits = self.frontier.get(state)
+            if exits:
+                return state, next(iter(exits))
+            i += 1
+
+    def tree(self, location):
+        """Returns the cached shortest-path tree rooted at a location,
+        or a new one."""
+        tree = self.trees.pop(location, None)
+        if tree is None:
+            tree = PathTree(location)
+        self.trees[location] = tree
+        while len(self.trees) > TREE_CACHE_SIZE:
+            self.trees.popitem(last=False)
+        return tree
+
+    def expand(self, tree):
+        """Follows the exits of the next location of a tree. Returns
+        False if every location reachable from its root has already been
+        expanded."""
+        if tree.expanded == len(tree.order):
+            return False
+        location = tree.order[tree.expanded]
+        tree.expanded += 1
+        depth = tree.depths[location] + 1
+        for direction, destination in self.edges(location):
+            if destination not in tree.depths:
+                tree.depths[destination] = depth
+                tree.parents[destination] = (location, direction)
+                tree.order.append(destination)
+        return True
+
+    def compute_routes(self):
+        """Computes the next hop between every pair of known locations,
+        so that later paths are read from a table. The table is kept up
+        to date as go functions are added."""
+        self.routes = route_table(
+            (location, direction, destination)
+            for location in self.nodes()
+            for direction, destination in self.edges(location))
+        return self.routes
+
+    def update_paths(self, location, direction, old, destination):
+        """Updates the cached trees and routes after the destination of
+        go(location, direction) changed from old to destination."""
+        self.update_trees(location, direction, old, destination)
+        if self.routes is not None:
+            if old is None:
+                self.routes.add_edge(location, direction, destination)
+            else:
+                self.routes.set_edges(location, self.edges(location))
+
+    def update_trees(self, location, direction, old, destination):
+        """Drops the cached trees that no longer hold shortest paths
+        after the destination of go(location, direction) changed from old
+        to destination."""
+        for root, tree in list(self.trees.items()):
+            depth = tree.depths.get(location)
+            if depth is None:
+                continue
+            if tree.expanded < len(tree.order) and \
+                    depth > tree.depths[tree.order[tree.expanded]]:
+                # the new edge is followed when location is expanded
+                continue
+            known = tree.depths.get(destination)
+            if known is None or depth + 1 < known or \
+                    tree.parents.get(old) == (location, direction):
+                del self.trees[root]
+
+    def drop_trees(self, location):
+        """Drops the cached trees which reached a location."""
+        for root, tree in list(self.trees.items()):
+            if location in tree.depths:
+                del self.trees[root]
+
+    def resolve(self, name):
+        """Returns the label of the location an exit observation
+        names."""
+        identity = self.identity
+        if self.seen is not None and self.seen[0] == name:
+            # arrived without a move, as after a look
+            sign = self.seen[1]
+            self.seen = None
+            here = self.here
+            if here is None or identity.name(here) != name or \
+                    not identity.compatible(identity.node(here), sign):
+                self.here = identity.locate(name, sign)
+            return self.here
+        if self.here is not None and identity.name(self.here) == name:
+            return self.here
+        if identity.node(name) is not None:
+            return name
+        return identity.locate(name)
+
+    def settle(self):
+        """Resolves an 'at' observation which no move or exit followed,
+        as after a look at a room listing no exits."""
+        if self.identity is not None and self.seen is not None:
+            self.resolve(self.seen[0])
+
+    def resolve_move(self, location, direction, destination):
+        """Returns the labels of the locations of a go observation,
+        splitting and merging locations to fit it. Known moves are never
+        overwritten by moves contradicting them; the location the agent
+        was at is split instead."""
+        identity = self.identity
+        if identity.node(location) is None:
+            location = identity.locate(location)
+        seen, self.seen = self.seen, None
+        expected = self.ask_go(location, direction)
+        if seen is None or seen[0] != destination:
+            # a label, as for a failed move or a saved map
+            if identity.node(destination) is None:
+                destination = identity.locate(destination)
+            if destination == location and \
+                    expected not in (None, location):
+                # a known passage failed, so the agent was at another
+                # location of the same name
+                location = destination = self.relocate(
+                    location, direction,
+                    lambda other, expected: expected == other)
+            return location, destination
+        name, sign = seen
+        if expected is not None and (
+                identity.name(expected) != name or
+                not identity.compatible(identity.node(expected), sign)):
+            # the map disagrees with the move, so the agent was at
+            # another location of the same name
+            location = self.relocate(
+                location, direction,
+                lambda other, expected: expected != other and
+                identity.name(expected) == name and
+                identity.compatible(identity.node(expected), sign))
+            expected = self.ask_go(location, direction)
+        if expected is not None:
+            identity.note(expected, sign)
+            return location, expected
+        destination = self.arrive(location, direction, name, sign)
+        return self.same_location(location, direction, destination), \
+            destination
+
+    def arrive(self, location, direction, name, sign):
+        """Returns the label of the location reached by a move never
+        made before. Passages are assumed to lead both ways, so a
+        location with the name and description seen is ruled out if
+        its way back is known to lead elsewhere, and taken if it leads
+        to where the move started. Otherwise a location is only taken if
+        it is the only one of its name, and a new one is added if the
+        name is known to be shared."""
+        identity = self.identity
+        back = OPPOSITES.get(direction)
+        candidates = identity.candidates(name, sign)
+        possible = []
+        for label in candidates:
+            if label == location:
+                # the way back of a self-loop is a failed move, which
+                # proves nothing
+                continue
+            behind = None if back is None else self.ask_go(label, back)
+            if behind == location:
+                identity.note(label, sign)
+                return label
+            if behind is None or behind != label and \
+                    identity.same(behind, location):
+                possible.append(label)
+        if possible and len(identity.candidates(name)) == 1:
+            identity.note(possible[0], sign)
+            return possible[0]
+        return identity.add(name, sign)
+
+    def same_location(self, location, direction, destination):
+        """Returns the location a new move from location leads from,
+        merging location into an earlier location looking like it whose
+        move in the same direction leads to the same destination. As
+        passages lead both ways, only one location can lead there."""
+        identity = self.identity
+        if destination == location:
+            return location
+        for other in identity.candidates(identity.name(location)):
+            if other not in (location, destination) and \
+                    identity.same(other, location) and \
+                    self.ask_go(other, direction) == destination:
+                self.merge_locations(other, location)
+                return other
+        return location
+
+    def relocate(self, label, direction, fits):
+        """Returns the label of another location with the name of label
+        whose known move in a direction fits what was seen, splitting
+        label if there is none. The last move is pointed at the returned
+        label."""
+        identity = self.identity
+        for other in identity.candidates(identity.name(label)):
+            expected = self.ask_go(other, direction)
+            if other != label and expected is not None and \
+                    fits(other, expected):
+                self.retarget_last_move(label, other)
+                return other
+        return self.split_location(label)
+
+    def retarget_last_move(self, label, other):
+        """Points the last move at other if it led to label."""
+        if self.last_move is not None and self.last_move[2] == label:
+            location, direction, _ = self.last_move
+            if location != label:
+                self.add_go(location, direction, other)
+
+    def split_location(self, label):
+        """Adds a location with the name and exits of a label, points
+        the last move to the label at it instead, and returns its
+        label."""
+        new = self.identity.split(label)
+        for exit_direction in sorted(self.ask_list(label, 'exit')):
+            self.add_exit(new, exit_direction)
+        self.retarget_last_move(label, new)
+        return new
+
+    def merge_locations(self, label, other):
+        """Merges the location of other into the location of label,
+        moving its exits, go functions and incoming moves."""
+        self.identity.merge(label, other)
+        for direction in sorted(self.ask_list(other, 'exit')):
+            self.add_exit(label, direction)
+        for direction, destination in list(self.ask_list(other, 'go')):
+            if self.ask_go(label, direction) is None:
+                self.add_go(label, direction,
+                            label if destination == other else destination)
+        for location, direction, destination in self.go_graph():
+            if destination == other and location != other:
+                self.add_go(location, direction, label)
+        self.remove_location(other)
+        if self.here == other:
+            self.here = label
+
+    def remove_location(self, location):
+        """Forgets a location and every move from it, dropping only the
+        cached paths which reached it."""
+        self.locations.pop(location, None)
+        self.frontier.pop(location, None)
+        self.drop_trees(location)
+        if self.routes is not None:
+            self.routes.set_edges(location, ())
+
+    def stats(self):
+        """Returns a dictionary of counters describing the knowledge
+        base."""
+        return {
+            'locations': len(self),
+            'frontier': len(self.frontier),
+            'trees': len(self.trees),
+            'routes': 0 if self.routes is None else len(self.routes),
+            'aliases': 0 if self.identity is None else len(self.identity),
+        }
+
+    def __len__(self):
+        return len(self.locations)
 
     def unexplored(self, location):
         """Returns the first unexplored exit at this location."""
-        exits = self.ask_list(location, 'exit')
-        for e in exits:
-            if self.ask('go', location, e) is None:
-                return e
-        return None
+        return next(iter(self.frontier.get(location, ())), None)
 
     def ask_list(self, location, prop):
         obj = self.locations.get(location, None)
@@ -195,6 +428,29 @@ class RoverKnowledge:
                 return obj.items()
         return []
 
+    def nodes(self):
+        """Returns the locations with known go functions."""
+        return list(self.locations)
+
+    def edges(self, location):
+        """Returns the (direction, destination) pairs of the known go
+        functions of a location."""
+        return self.ask_list(location, 'go')
+
+    def exit_list(self):
+        """Returns every known exit as a (location, direction) pair."""
+        return [(location, direction)
+                for location in self.locations
+                for direction in self.ask_list(location, 'exit')]
+
+    def go_graph(self):
+        """Returns every known go function as a (location, direction,
+        destination) triple."""
+        return [(location, direction, destination)
+                for location in self.locations
+                for direction, destination
+                in self.ask_list(location, 'go')]
+
     def ask_exit(self, location, direction):
         """Returns True if an exit in a given direction exists from a
         given location."""
@@ -223,6 +479,8 @@ class RoverKnowledge:
         if 'exit' not in self.locations[location]:
             self.locations[location]['exit'] = set()
         self.locations[location]['exit'].add(direction)
+        if self.ask_go(location, direction) is None:
+            self.frontier.setdefault(location, {})[direction] = None
 
     def add_go(self, location, direction, destination):
         """Adds a go function to a location in our knowledge base,
@@ -231,17 +489,29 @@ class RoverKnowledge:
             self.locations[location] = {}
         if 'go' not in self.locations[location]:
             self.locations[location]['go'] = {}
-        if (direction in self.locations[location]['go'] and
-                destination != self.locations[location]['go'][direction]):
+        old = self.locations[location]['go'].get(direction, None)
+        if old is not None and destination != old:
             # print('Warning: conflicting destinations found.')
             pass
         self.locations[location]['go'][direction] = destination
+        exits = self.frontier.get(location)
+        if exits and direction in exits:
+            del exits[direction]
+            if not exits:
+                del self.frontier[location]
+        if destination != old:
+            self.update_paths(location, direction, old, destination)
 
 
 class RoverOne:
     """Simple roving agent."""
 
-    def __init__(self, seed=None):
+    def __init__(self, seed=None, knowledge=None, all_pairs=False,
+                 aliases=False, detect_loops=True,
+                 cache_size=ROOM_CACHE_SIZE):
+        # every random choice is drawn from here, so that a seed
+        # reproduces a playthrough
+        self.random = random.Random(seed)
         self.know_surroundings = False
         self.location = None
         self.loc_description = ''
@@ -249,9 +519,29 @@ class RoverOne:
         self.goals = []
         self.exploration_goals = []
         self.mode = EXPLORATION
-        self.kb = RoverKnowledge()
+        if knowledge is None:
+            knowledge = RoverKnowledge
+        # tell apart locations which share a name
+        self.aliases = aliases
+        self.kb = knowledge(aliases=aliases)
+        # parsed room descriptions kept
+        self.perception = Perception(cache_size)
+        # compute all-pairs routes once the map is fully explored
+        self.all_pairs = all_pairs
         self.last_parse = None
         self.current_goal = None
+        # locations recently moved to, to notice the agent going round
+        # in circles
+        self.detect_loops = detect_loops
+        self.history = deque(maxlen=HISTORY_SIZE)
+        # directions attempted, by location
+        self.tried = {}
+        self.visited = set()
+        # moves committed to when escaping a loop, None for random ones
+        self.escape = []
+        # escalations since a new location was last reached
+        self.level = 0
+        self.escalations = 0
         pass
 
     # API
@@ -266,6 +556,18 @@ class RoverOne:
         # tell knowledge base
         for o in observations:
             self.kb.tell(o)
+        if self.aliases:
+            self.kb.settle()
+        if self.aliases and self.kb.here is not None:
+            # the label of the location, which may differ from its name
+            self.location = self.kb.here
+        if self.location is not None and \
+                (not self.history or self.history[-1] != self.location):
+            # failed moves stay put, and do not make a loop
+            self.history.append(self.location)
+        if self.location not in self.visited:
+            self.visited.add(self.location)
+            self.level = 0
         # ask knowledge base for next move
         action = None
         if not self.know_surroundings:
@@ -280,6 +582,8 @@ class RoverOne:
         else:
             action = self.act_explore()
 
+        if action is not None and action.startswith('go '):
+            self.tried.setdefault(self.location, set()).add(action[3:])
         self.last_command = action
         return action
 
@@ -288,28 +592,93 @@ class RoverOne:
         pass
 
     def debug_info(self):
-        go_graph = []
-        for location in self.kb.locations:
-            if 'go' in self.kb.locations[location]:
-                go_graph.extend(
-                    [(location, direction, dest)
-                     for direction, dest in
-                     self.kb.locations[location]['go'].items()])
         return {
             'location': self.location,
             'last_parse': self.last_parse,
             'goals': self.goals,
             'exploration_goals': self.exploration_goals,
-            'go graph': go_graph,
+            'go graph': self.kb.go_graph(),
             'current goal': self.current_goal,
+            'escalations': self.escalations,
+            'room cache': self.perception.rooms.stats(),
         }
 
     # Implementation
+    def in_loop(self):
+        """Returns True if the locations recently moved to repeat a
+        short cycle LOOP_REPEATS times."""
+        history = self.history
+        for period in range(MIN_LOOP_PERIOD, MAX_LOOP_PERIOD + 1):
+            length = period * LOOP_REPEATS
+            if len(history) < length:
+                break
+            if all(history[-i] == history[-i - period]
+                   for i in range(1, length - period + 1)):
+                return True
+        return False
+
+    def escalate(self):
+        """Returns an action breaking out of a loop. Each loop found
+        before a new location is reached escalates further: first a
+        direction never tried, here or at the nearest location with one,
+        then longer and longer random walks, as the map itself may be
+        wrong."""
+        self.escalations += 1
+        self.level += 1
+        self.exploration_goals.clear()
+        self.history.clear()
+        if self.level <= 2:
+            untried = self.untried(self.location)
+            if untried:
+                self.current_goal = (self.location, untried[0])
+                return f'go {untried[0]}'
+            best = None
+            locations = dict.fromkeys(l for l, _, _ in self.kb.go_graph())
+            for location in locations:
+                if not self.untried(location):
+                    continue
+                path = self.kb.path(self.location, location)
+                if path is not None and \
+                        (best is None or len(path) < len(best)):
+                    best = path
+            if best is not None:
+                self.current_goal = best
+                self.escape = best[1:]
+                return f'go {best[0]}'
+        self.escape = [None] * min(2 ** self.level, HISTORY_SIZE)
+        return self.wander()
+
+    def untried(self, location):
+        """Returns the directions never tried from a location."""
+        tried = self.tried.get(location, ())
+        return [d for d in DIRECTIONS if d not in tried]
+
+    def wander(self):
+        """Returns a move through a random exit of the location."""
+        exits = [d for d in DIRECTIONS
+                 if self.kb.ask('exit', self.location, d)] or DIRECTIONS
+        direction = exits[self.random.randrange(len(exits))]
+        self.current_goal = direction
+        return f'go {direction}'
+
     def act_explore(self):
         """Return an action that helps to uncover new knowledge."""
+        if self.escape:
+            direction = self.escape.pop(0)
+            if direction is None:
+                return self.wander()
+            self.current_goal = direction
+            return f'go {direction}'
+        if self.detect_loops and not self.untried(self.location) and \
+                self.in_loop():
+            # a location with directions left to try is still being
+            # explored, so only a loop through explored ones escalates
+            return self.escalate()
         dest, direction = self.kb.explore(self.location)
         if dest:
             self.exploration_goals.append((dest, direction))
+        elif self.all_pairs and self.kb.routes is None:
+            self.kb.compute_routes()
         if self.exploration_goals:
             dest, direction = self.exploration_goals[-1]
             if dest == self.location:
@@ -329,7 +698,7 @@ class RoverOne:
             return f'go {direction}'
         exits = [d for d in DIRECTIONS
                  if self.kb.ask('go', self.location, d) != self.location]
-        shuffle(exits)
+        self.random.shuffle(exits)
         if exits:
             direction = exits.pop()
             self.current_goal = direction
@@ -340,61 +709,18 @@ class RoverOne:
     def parse(self, game_state):
         """Parses input from the game_state and returns a list of
         observations."""
-        # Input can take a few forms
-        # 1. Parser feedback when a command is not understood
-        #
-        # 2. Game feedback when a command is understood but does not
-        # change the world state (includes feedback from examining and
-        # also feedback from commands that have no outcome)
-        #
-        # 3. Game feedback when a command changes the world state
+        records = self.perception.perceive(game_state['feedback'],
+                                           self.last_command, self.location)
+        self.last_parse = self.perception.last_parse
         observations = []
-        msg = game_state['feedback']
-
-        if self.is_rejection(msg):
-            return observations
-        if self.last_command.startswith('go'):
-            # for the moment, we will treat failed movements as
-            # self-referential loops
-            if self.is_move(msg):
-                observations = self.parse_move(msg)
-            else:
-                observations = self.parse_move(f'{self.location}\n')
-            return observations
-        # Assume input is in response to the 'look' command
-        if self.last_command == 'look' and '\n' in msg:
-            location, feedback = split_location(msg)
-            for word in tokenize(feedback):
-                if word in DIRECTIONS:
-                    observations.append(('exit', location, word))
-            self.location = location
-        return observations
-
-    def parse_move(self, msg):
-        location, feedback = split_location(msg)
-        observations = [('exit', location, word)
-                        for word in tokenize(feedback)
-                        if word in DIRECTIONS]
-        direction = self.last_command.replace('go ', '')
-        observations.append(('go', self.location, direction,
-                             location))
-        self.location = location
+        for record in records:
+            if isinstance(record, At):
+                self.location = record.location
+                if not self.aliases:
+                    continue
+            elif isinstance(record, Go) and record.destination is None:
+                # for the moment, we will treat failed movements as
+                # self-referential loops
+                record = record._replace(destination=record.location)
+            observations.append((record.kind, *record))
         return observations
-
-    def is_rejection(self, msg):
-        for r in REJECTIONS:
-            if msg.startswith(r):
-                if DEBUG:
-                    self.last_parse = 'rejection'
-                return True
-
-    def is_move(self, msg):
-        if '\n' not in msg:
-            return False
-        lines = msg.split('\n')
-        if lines[0].endswith('.'):
-            return False
-        if DEBUG:
-            self.last_parse = 'move'
-        return True
-
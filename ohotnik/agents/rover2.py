@@ -1,16 +1,14 @@
 """RoverTwo, a simple agent that looks for directions in location
 descriptions, and attempts to follow them."""
 
-from random import shuffle
+import random
 
 from . import LogicBase, Predicate, AndClause, Implication, \
     LinearImplication
+from .perception import ROOM_CACHE_SIZE, At, Exit, Perception
+from .text import DIRECTIONS
 
-DIRECTIONS = ['north', 'south', 'east', 'west', 'up', 'down',
-              'northwest', 'northeast', 'southwest', 'southeast']
-REJECTIONS = ["I don't know the word"]
 MODES = [EXPLORATION, EXPLOITATION] = [1, 2]
-DEBUG = True
 
 RULES = [
     LinearImplication(
@@ -44,50 +42,13 @@ IMPLICATIONS = [
 ]
 
 
-def tokenize(s):
-    """Yields lower-cased tokens from a string, split by white space and
-    punctuation."""
-    buffer = []
-    for c in s:
-        if c.isalnum():
-            buffer.append(c.lower())
-        elif buffer:
-            yield ''.join(buffer)
-            buffer = []
-    if buffer:
-        yield ''.join(buffer)
-
-
-def split_location(s):
-    """Returns a cleaned (location, description) pair."""
-    # TO-DO: This is a clumsy-ass way of doing this
-    # import pdb
-    # pdb.set_trace()
-    lines = (line for line in s.split('\n'))
-    line = ''
-    while line == '':
-        try:
-            line = next(lines)
-            # print('>', line)
-        except StopIteration:
-            return '', ''
-    location = clean(line)
-    description = '\n'.join([line for line in lines if line != ''])
-    # print(location)
-    # print(description)
-    return location, description
-
-
-def clean(s):
-    """Returns a cleaned version of the string with punctuation and
-    trailing spaces removed."""
-    return ' '.join(tokenize(s))
-
-
 class RoverTwo:
     """Simple roving agent."""
 
-    def __init__(self, seed=None):
+    def __init__(self, seed=None, cache_size=ROOM_CACHE_SIZE):
+        # every random choice is drawn from here, so that a seed
+        # reproduces a playthrough
+        self.random = random.Random(seed)
         self.know_surroundings = False
         self.location = None
         self.loc_description = ''
@@ -98,6 +59,7 @@ class RoverTwo:
         self.kb = LogicBase()
         for rule in RULES:
             self.kb.add_rule(rule)
+        self.perception = Perception(cache_size)
         self.last_parse = None
         self.current_goal = None
 
@@ -136,16 +98,20 @@ class RoverTwo:
         pass
 
     def debug_info(self):
-        predicates = self.kb.predicates
         return {
             'location': self.location,
             'last_parse': self.last_parse,
             'goals': self.goals,
-            'predicates': predicates,
             'exploration_goals': self.exploration_goals,
             'current goal': self.current_goal,
+            'room cache': self.perception.rooms.stats(),
         }
 
+    def debug_changes(self):
+        """Returns the tables of the debug state changed since the last
+        call, which are left out of debug_info."""
+        return {'predicates': self.kb.changes()}
+
     # Implementation
     def act_explore(self):
         """Return an action that helps to uncover new knowledge."""
@@ -154,7 +120,7 @@ class RoverTwo:
             self.current_goal = action
             return action
         exits = [d for d in DIRECTIONS]
-        shuffle(exits)
+        self.random.shuffle(exits)
         if exits:
             direction = exits.pop()
             self.current_goal = direction
@@ -165,62 +131,22 @@ class RoverTwo:
     def parse(self, game_state):
         """Parses input from the game_state and returns a list of
         observations."""
-        # Input can take a few forms
-        # 1. Parser feedback when a command is not understood
-        #
-        # 2. Game feedback when a command is understood but does not
-        # change the world state (includes feedback from examining and
-        # also feedback from commands that have no outcome)
-        #
-        # 3. Game feedback when a command changes the world state
+        records = self.perception.perceive(game_state['feedback'],
+                                           ' '.join(self.last_command),
+                                           self.location)
+        self.last_parse = self.perception.last_parse
         observations = []
-        msg = game_state['feedback']
-
-        if self.is_rejection(msg):
-            return observations
-        if self.last_command and self.last_command[0] == 'go':
-            if self.is_move(msg):
-                observations = self.parse_move(msg)
-            else:
-                observations = [('exit', (self.location,
-                                 self.last_command[1],),
-                                 False)]
-            return observations
-        # Assume input is in response to the 'look' command
-        if self.last_command == ('look',) and '\n' in msg:
-            location, feedback = split_location(msg)
-            for word in tokenize(feedback):
-                if word in DIRECTIONS:
-                    observations.append(('exit', (location, word)))
-            observations.append(('at', ('player', location)))
-            self.location = location
-        return observations
-
-    def parse_move(self, msg):
-        location, feedback = split_location(msg)
-        observations = [('exit', (location, word))
-                        for word in tokenize(feedback)
-                        if word in DIRECTIONS]
-        observations.append(('at', ('player', location)))
-        if self.location:
-            observations.append(
-                ('at', ('player', self.location), False))
-        self.location = location
-        return observations
-
-    def is_rejection(self, msg):
-        for r in REJECTIONS:
-            if msg.startswith(r):
-                if DEBUG:
-                    self.last_parse = 'rejection'
-                return True
-
-    def is_move(self, msg):
-        if '\n' not in msg:
-            return False
-        lines = msg.split('\n')
-        if lines[0].endswith('.'):
-            return False
-        if DEBUG:
-            self.last_parse = 'move'
-        return True
+        at = []
+        for record in records:
+            if isinstance(record, Exit):
+                observations.append(('exit', (record.location,
+                                              record.direction)))
+            elif isinstance(record, At):
+                at.append(('at', ('player', record.location)))
+                self.location = record.location
+            elif record.destination is None:
+                observations.append(('exit', (record.location,
+                                              record.direction), False))
+            elif record.location:
+                at.append(('at', ('player', record.location), False))
+        return observations + at
@@ -0,0 +1,70 @@
+"""Persistent substitutions of variables."""
+
+from collections.abc import Mapping
+
+MISSING = object()
+
+
+class Substitution(Mapping):
+    """An immutable substitution of variables, stored as a chain of
+    binding dictionaries. Extending a substitution creates one link
+    pointing back to the substitution it extends, so substitutions built
+    from a common prefix share it instead of copying it.
+
+    Substitutions are Mappings, so they can be read wherever a
+    substitution dictionary is expected, and compare equal to
+    dictionaries with the same bindings."""
+    __slots__ = ('parent', 'bindings')
+
+    def __init__(self, parent=None, bindings=None):
+        self.parent = parent
+        self.bindings = {} if bindings is None else bindings
+
+    def extend(self, var, value):
+        """Returns a substitution which also binds var to value."""
+        return Substitution(self, {var: value})
+
+    def extend_all(self, bindings):
+        """Returns a substitution which also holds every binding of a
+        dictionary. The dictionary is shared, not copied, so it must not
+        be changed afterwards."""
+        if not bindings:
+            return self
+        return Substitution(self, bindings)
+
+    def get(self, var, default=None):
+        node = self
+        while node is not None:
+            value = node.bindings.get(var, MISSING)
+            if value is not MISSING:
+                return value
+            node = node.parent
+        return default
+
+    def __getitem__(self, var):
+        value = self.get(var, MISSING)
+        if value is MISSING:
+            raise KeyError(var)
+        return value
+
+    def __contains__(self, var):
+        return self.get(var, MISSING) is not MISSING
+
+    def __iter__(self):
+        seen = set()
+        node = self
+        while node is not None:
+            for var in node.bindings:
+                if var not in seen:
+                    seen.add(var)
+                    yield var
+            node = node.parent
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f'Substitution({dict(self.items())})'
+
+
+EMPTY = Substitution()
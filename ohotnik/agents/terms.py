@@ -0,0 +1,125 @@
+"""Interned terms and an iterative unifier that works on them.
+
+Constants are interned to non-negative integer ids and variables to
+negative ones, so that classifying a term is a single comparison.
+Compound terms are tuples of a functor id followed by argument terms.
+
+TERMS is the one table shared by every sentence, model and knowledge
+base of a process, as sentences are interned when they are built, before
+any knowledge base sees them. It only grows, unless it is reset to a
+mark taken with TERMS.mark(). The driver does so after every game, once
+the agent and its knowledge base are discarded. Sentences built before
+the mark, such as the rules of an agent class, keep their ids."""
+
+
+def isvar(identifier):
+    """Returns True if an identifier is a variable."""
+    return isinstance(identifier, str) and identifier.isupper()
+
+
+class Terms:
+    """A table of interned terms."""
+
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+
+    def intern(self, term):
+        """Returns the id of a term, interning it if necessary."""
+        term_id = self.ids.get(term)
+        if term_id is None:
+            term_id = len(self.names)
+            if isvar(term):
+                term_id = ~term_id
+            self.ids[term] = term_id
+            self.names.append(term)
+        return term_id
+
+    def lookup(self, term):
+        """Returns the id of a term, or None if it was never
+        interned."""
+        return self.ids.get(term)
+
+    def mark(self):
+        """Returns a mark of the terms interned so far."""
+        return len(self.names)
+
+    def reset(self, mark=0):
+        """Forgets the terms interned since a mark. Their ids are given to
+        the next terms interned, so every sentence, model and knowledge
+        base holding them must be discarded first."""
+        for term in self.names[mark:]:
+            del self.ids[term]
+        del self.names[mark:]
+
+    def name(self, term_id):
+        """Returns the term with a given id."""
+        if term_id < 0:
+            return self.names[~term_id]
+        return self.names[term_id]
+
+    def __len__(self):
+        return len(self.names)
+
+
+# the table of the process, see above for its lifetime
+TERMS = Terms()
+
+
+def walk(term, bindings):
+    """Follows the bindings of a variable to the term it stands for."""
+    while type(term) is int and term < 0 and term in bindings:
+        term = bindings[term]
+    return term
+
+
+def occurs(var, term, bindings):
+    """Returns True if a variable occurs anywhere inside a term."""
+    stack = [term]
+    while stack:
+        term = walk(stack.pop(), bindings)
+        if term == var:
+            return True
+        if type(term) is tuple:
+            stack.extend(term[1:])
+    return False
+
+
+def unify_terms(xs, ys, bindings=None, occur_check=False):
+    """Unifies two sequences of interned terms without recursion or
+    slicing. Returns the bindings of variable ids to terms which make
+    them equal, extending bindings if given, or False if none exist. With
+    occur_check, a variable is never bound to a compound term containing
+    it."""
+    # pylint: disable=unidiomatic-typecheck
+    # exact type checks are the point of this function
+    if len(xs) != len(ys):
+        return False
+    if bindings is None:
+        bindings = {}
+    stack = []
+    pairs = zip(xs, ys)
+    while True:
+        for x, y in pairs:
+            while type(x) is int and x < 0 and x in bindings:
+                x = bindings[x]
+            while type(y) is int and y < 0 and y in bindings:
+                y = bindings[y]
+            if x == y:
+                continue
+            if type(x) is int and x < 0:
+                if occur_check and occurs(x, y, bindings):
+                    return False
+                bindings[x] = y
+            elif type(y) is int and y < 0:
+                if occur_check and occurs(y, x, bindings):
+                    return False
+                bindings[y] = x
+            elif type(x) is tuple and type(y) is tuple and \
+                    len(x) == len(y):
+                stack.append(zip(x, y))
+            else:
+                return False
+        if not stack:
+            return bindings
+        pairs = stack.pop()
@@ -0,0 +1,65 @@
+"""Text processing shared by the rover agents.
+
+Game feedback is scanned with compiled regular expressions rather than
+character by character. A room description is split into its cleaned
+location name and the directions it mentions in a single pass, with
+directions matched by one alternation, longest first, instead of
+comparing every word against a list."""
+
+import re
+
+DIRECTIONS = ['north', 'south', 'east', 'west', 'up', 'down',
+              'northwest', 'northeast', 'southwest', 'southeast']
+# the direction leading back from a move in each direction
+OPPOSITES = {'north': 'south', 'south': 'north', 'east': 'west',
+             'west': 'east', 'up': 'down', 'down': 'up',
+             'northwest': 'southeast', 'southeast': 'northwest',
+             'northeast': 'southwest', 'southwest': 'northeast'}
+
+# runs of letters and digits, as str.isalnum would accept them
+TOKEN = re.compile(r'[^\W_]+')
+# a direction standing as a whole token of lower-cased text
+DIRECTION = re.compile(
+    r'(?<![^\W_])(%s)(?![^\W_])'
+    % '|'.join(sorted(DIRECTIONS, key=len, reverse=True)))
+# runs of line breaks between the lines of a description
+BLANK_LINES = re.compile(r'\n{2,}')
+
+
+def tokenize(s):
+    """Returns the lower-cased tokens of a string, split by white space
+    and punctuation."""
+    return TOKEN.findall(s.lower())
+
+
+def clean(s):
+    """Returns a cleaned version of the string with punctuation and
+    trailing spaces removed."""
+    return ' '.join(TOKEN.findall(s.lower()))
+
+
+def directions(s):
+    """Returns the directions mentioned in a string, in order, once per
+    mention."""
+    return DIRECTION.findall(s.lower())
+
+
+def split_location(s):
+    """Returns a cleaned (location, description) pair. The location is
+    the first non-empty line, and the description the following
+    non-empty lines."""
+    start = len(s) - len(s.lstrip('\n'))
+    if start == len(s):
+        return '', ''
+    end = s.find('\n', start)
+    if end < 0:
+        return clean(s[start:]), ''
+    description = BLANK_LINES.sub('\n', s[end + 1:]).strip('\n')
+    return clean(s[start:end]), description
+
+
+def parse_location(s):
+    """Returns the cleaned location, the description and the directions
+    mentioned in the description of a room."""
+    location, description = split_location(s)
+    return location, description, directions(description)
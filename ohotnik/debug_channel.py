@@ -0,0 +1,219 @@
+"""A non-blocking channel for sending agent debug states to a
+visualization client such as scripts/rover_status.py.
+
+States are queued in a bounded buffer, dropping the oldest when it is
+full, and sent from a background thread over one persistent connection.
+Each message only holds what changed since the last state sent, so the
+client rebuilds the full state with apply_delta. A message is a
+dictionary of:
+
+    set       {key: value} for new or changed values
+    remove    [key] for values no longer in the state
+    items     {key: (added, removed)} for lists of items such as the go
+              graph, which are treated as sets
+    entries   {key: (changed, removed)} for tables of tables such as the
+              predicates, with changed a {table: {entry: value}}
+              dictionary, and removed a {table: [entry]} dictionary or
+              None for a removed table
+
+A new connection starts from an empty state, so its first message holds
+the whole state.
+
+Tables such as the predicates can also be sent as the entries changed
+since the last state. The background thread merges them into its own
+copy of each table, so the caller never builds or copies a whole table
+for every state."""
+
+import copy
+import threading
+import time
+from collections import deque
+from multiprocessing.connection import Client
+
+ADDRESS = ('localhost', 6000)
+AUTHKEY = b'textbased-agent'
+# states waiting to be sent
+QUEUE_SIZE = 64
+# seconds between attempts to reach a client
+RETRY_INTERVAL = 1.0
+# keys of lists of hashable items
+ITEM_KEYS = ('go graph',)
+# keys of dictionaries of dictionaries
+TABLE_KEYS = ('predicates',)
+
+
+def table_delta(old, new):
+    """Returns the (changed, removed) entries turning a table of tables
+    into another, or None if they are equal."""
+    changed, removed = {}, {}
+    for name in old:
+        if name not in new:
+            removed[name] = None
+    for name, table in new.items():
+        before = old.get(name, {})
+        entries = {entry: value for entry, value in table.items()
+                   if entry not in before or before[entry] != value}
+        if entries:
+            changed[name] = entries
+        gone = [entry for entry in before if entry not in table]
+        if gone:
+            removed[name] = gone
+    if not changed and not removed:
+        return None
+    return changed, removed
+
+
+def state_delta(old, new):
+    """Returns the message turning the state old into new."""
+    delta = {'set': {}, 'remove': [key for key in old if key not in new],
+             'items': {}, 'entries': {}}
+    for key, value in new.items():
+        if key not in old:
+            delta['set'][key] = value
+        elif key in ITEM_KEYS:
+            before, after = set(old[key]), set(value)
+            if before != after:
+                delta['items'][key] = (list(after - before),
+                                       list(before - after))
+        elif key in TABLE_KEYS:
+            entries = table_delta(old[key], value)
+            if entries is not None:
+                delta['entries'][key] = entries
+        elif old[key] != value:
+            delta['set'][key] = value
+    return delta
+
+
+def apply_delta(state, delta):
+    """Applies a message to a state in place and returns the state."""
+    for key in delta['remove']:
+        state.pop(key, None)
+    for key, value in delta['set'].items():
+        state[key] = value
+    for key, (added, removed) in delta['items'].items():
+        removed = set(removed)
+        state[key] = [item for item in state[key]
+                      if item not in removed] + added
+    for key, (changed, removed) in delta['entries'].items():
+        tables = state[key]
+        for name, entries in removed.items():
+            if entries is None:
+                tables.pop(name, None)
+                continue
+            for entry in entries:
+                tables[name].pop(entry, None)
+        for name, entries in changed.items():
+            tables.setdefault(name, {}).update(entries)
+    return state
+
+
+def merge_changes(tables, changes):
+    """Merges {key: {table: {entry: value}}} changes into tables of the
+    same form in place, and returns the tables."""
+    for key, changed in changes.items():
+        into = tables.setdefault(key, {})
+        for name, entries in changed.items():
+            into.setdefault(name, {}).update(entries)
+    return tables
+
+
+class DebugChannel:
+    """Sends debug states to a visualization client from a background
+    thread, without ever blocking the caller."""
+
+    def __init__(self, address=ADDRESS, authkey=AUTHKEY,
+                 size=QUEUE_SIZE):
+        self.address = address
+        self.authkey = authkey
+        self.queue = deque(maxlen=size)
+        # tables sent as changes, as merged so far
+        self.tables = {}
+        self.ready = threading.Condition()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def send(self, state, changes=None):
+        """Queues a state to be sent, dropping the oldest queued state if
+        the queue is full. Values are copied, as agents may hand out
+        lists they go on changing. Changes are {key: {table: {entry:
+        value}}} dictionaries of the tables changed since the last state,
+        which are left out of the state, and are never copied, so the
+        caller must not change them later."""
+        state = {key: copy.copy(value) for key, value in state.items()}
+        with self.ready:
+            if len(self.queue) == self.queue.maxlen:
+                # the changes of a dropped state still happened, so they
+                # go with the state after it
+                _, dropped = self.queue.popleft()
+                if dropped and self.queue:
+                    after, later = self.queue[0]
+                    self.queue[0] = (after,
+                                     merge_changes(dropped, later or {}))
+                elif dropped:
+                    changes = merge_changes(dropped, changes or {})
+                self.dropped += 1
+            self.queue.append((state, changes))
+            self.ready.notify()
+
+    def connect(self):
+        """Returns a connection to the client, or None if there is no
+        client listening."""
+        try:
+            return Client(self.address, authkey=self.authkey)
+        except OSError:
+            return None
+
+    def run(self):
+        """Sends queued states until the channel is closed."""
+        conn = None
+        last = None
+        attempt = None
+        while True:
+            with self.ready:
+                while not self.queue and not self.closed:
+                    self.ready.wait()
+                if not self.queue:
+                    break
+                state, changes = self.queue.popleft()
+            if changes:
+                merge_changes(self.tables, changes)
+            if conn is None:
+                now = time.monotonic()
+                if attempt is not None and now - attempt < RETRY_INTERVAL:
+                    self.dropped += 1
+                    continue
+                attempt = now
+                conn = self.connect()
+                if conn is None:
+                    self.dropped += 1
+                    continue
+                last = None
+            try:
+                if last is None:
+                    # a new client needs the whole tables
+                    delta = state_delta({}, dict(state, **self.tables))
+                else:
+                    delta = state_delta(last, state)
+                    for key, tables in (changes or {}).items():
+                        delta['entries'][key] = (tables, {})
+                conn.send(delta)
+            except OSError:
+                conn.close()
+                conn = None
+                self.dropped += 1
+                continue
+            last = state
+            self.sent += 1
+        if conn is not None:
+            conn.close()
+
+    def close(self, timeout=1.0):
+        """Sends what is queued, waiting at most timeout seconds, and
+        stops the background thread."""
+        with self.ready:
+            self.closed = True
+            self.ready.notify()
+        self.thread.join(timeout)
@@ -0,0 +1,87 @@
+"""Per-move telemetry for long runs.
+
+A Telemetry object wraps the methods of an agent, its knowledge base and
+its environment with timers, and writes one JSON object per move to a
+buffered file:
+
+    {"move": 12, "command": "go north", "act": ..., "parse": ...,
+     "tell": ..., "path": ..., "explore": ..., "step": ..., "kb": {...}}
+
+Times are in seconds. The parse, tell, path and explore times are part
+of the act time, and "kb" holds the counters returned by the knowledge
+base's stats method, if it has one."""
+
+import json
+import time
+
+# timed phases, with the object and method they are read from
+PHASES = (
+    ('act', 'agent', 'act'),
+    ('parse', 'agent', 'parse'),
+    ('tell', 'kb', 'tell'),
+    ('path', 'kb', 'path'),
+    ('explore', 'kb', 'explore'),
+    ('step', 'env', 'step'),
+)
+# bytes buffered before the log is written out
+BUFFER_SIZE = 1 << 16
+
+
+class Telemetry:
+    """Streams per-move timings and knowledge base sizes to a JSONL
+    file."""
+
+    def __init__(self, path, buffer_size=BUFFER_SIZE):
+        self.file = open(path, 'w', buffering=buffer_size)
+        self.timings = {phase: 0.0 for phase, _, _ in PHASES}
+        self.moves = 0
+        self.kb = None
+
+    def instrument(self, agent, env):
+        """Times the methods of an agent, its knowledge base and an
+        environment which telemetry records. Methods an object lacks are
+        skipped."""
+        objects = {'agent': agent, 'kb': getattr(agent, 'kb', None),
+                   'env': env}
+        self.kb = objects['kb']
+        for phase, name, method in PHASES:
+            target = objects[name]
+            function = getattr(target, method, None)
+            if function is not None:
+                setattr(target, method, self.timed(function, phase))
+
+    def timed(self, function, phase):
+        """Returns a function adding the time spent in another to a
+        phase."""
+        timings = self.timings
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            begin = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings[phase] += clock() - begin
+        return timed
+
+    def record(self, **fields):
+        """Writes the timings of a move with some fields, and starts
+        timing the next move."""
+        self.moves += 1
+        entry = {'move': self.moves, **fields, **self.timings}
+        stats = getattr(self.kb, 'stats', None)
+        if stats is not None:
+            entry['kb'] = stats()
+        self.file.write(json.dumps(entry) + '\n')
+        for phase in self.timings:
+            self.timings[phase] = 0.0
+
+    def close(self):
+        """Flushes and closes the log."""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -3,9 +3,13 @@
 """Compare the performance of several agents on a series of benchmark
 games."""
 
+import argparse
+import hashlib
+import json
 import os
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 from textworld.agents import NaiveAgent
 import driver
@@ -26,20 +30,37 @@ DEFAULT_GAMES = [game for game in os.listdir(DEFAULT_GAMES_DIR)
                  if os.path.splitext(game)[1] in ['.z5', '.z8']]
 DEFAULT_MOVE_LIMIT = 100
 DEFAULT_PLAY_COUNT = 10
+DEFAULT_SEED = 1234
+AGENT_TITLES = {'NaiveAgent': 'Random Agent', 'RoverOne': 'Rover One'}
+
+
+def agent_class(name):
+    """Returns the agent class of a name, as recorded in a log."""
+    agents = {agent.__name__: agent for agent in DEFAULT_AGENTS}
+    return agents[name.split(' ')[0]]
+
+
+def agent_title(name):
+    """Returns the table heading of an agent name."""
+    agent, sep, rest = name.partition(' ')
+    return AGENT_TITLES.get(agent, agent) + sep + rest
+
 
 def write_table(results, output):
+    agents = list(dict.fromkeys(row[1] for row in results))
     with open(output, 'w') as fh:
-        fh.write(r'\begin{tabular}{l|rrr|rrr}')
+        fh.write(r'\begin{tabular}{l' + '|rrr' * len(agents) + '}')
         fh.write('\n')
         fh.write(r'\toprule')
         fh.write('\n')
         fh.write(r'\multirow{2}{*}{Game} & ')
-        fh.write(r'\multicolumn{3}{c}{Random Agent} & ')
-        fh.write(r'\multicolumn{3}{c}{Rover One}\\')
+        fh.write(' & '.join(r'\multicolumn{3}{c}{' + agent_title(a) + '}'
+                            for a in agents))
+        fh.write(r'\\')
         fh.write('\n')
-        fh.write(r'\cmidrule{2-7}')
+        fh.write(f'\\cmidrule{{2-{3 * len(agents) + 1}}}')
         fh.write('\n')
-        fh.write(r'& Score & Moves & Locations ' * 2)
+        fh.write(r'& Score & Moves & Locations ' * len(agents))
         fh.write(r'\\')
         fh.write('\n')
         fh.write(r'\midrule')
@@ -60,53 +81,185 @@ def write_table(results, output):
         fh.write('\n')
 
 
+def task_seed(seed, *parts):
+    """Returns the seed of one task, derived from a base seed and the
+    parts naming the task, so that a task is seeded the same however
+    tasks are scheduled."""
+    digest = hashlib.sha256(repr((seed, parts)).encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'little')
+
+
+def playthrough(game_path, agent, move_limit=DEFAULT_MOVE_LIMIT, seed=0,
+                map_cache=None, freeze_map=False):
+    """Plays a game with an agent until it is won or move_limit moves
+    have been made, starting again whenever the game ends early. With
+    freeze_map, every start loads the cached map and none saves it.
+    Returns the score, moves and locations, and the seconds taken."""
+    begin = time.perf_counter()
+    moves, score, locations, won = 0, 0, 0, False
+    restarts = 0
+    while moves < move_limit and not won:
+        result = driver.main(game_path, agent,
+                             move_limit=move_limit - moves,
+                             mode=driver.Mode.HEADLESS,
+                             seed=seed + restarts,
+                             map_cache=map_cache,
+                             freeze_map=freeze_map)
+        moves += result[0]
+        score = max(score, result[1])
+        locations = result[2]
+        won = result[3]
+        restarts += 1
+    return score, moves, locations, time.perf_counter() - begin
+
+
+def run(tasks, jobs=1):
+    """Runs playthrough argument tuples and returns their results in
+    order, spread over a pool of processes if jobs is more than 1."""
+    if jobs <= 1 or len(tasks) <= 1:
+        return [playthrough(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(playthrough, *zip(*tasks)))
+
+
+def mean_result(outcomes):
+    """Returns the mean score, moves and locations of playthroughs."""
+    count = len(outcomes)
+    return tuple(int(sum(outcome[k] for outcome in outcomes) / count)
+                 for k in range(3))
+
+
 def main(agents=DEFAULT_AGENTS, games=DEFAULT_GAMES,
          games_dir=DEFAULT_GAMES_DIR, move_limit=DEFAULT_MOVE_LIMIT,
-         play_count=DEFAULT_PLAY_COUNT, output=None):
+         play_count=DEFAULT_PLAY_COUNT, output=None, map_cache=None,
+         jobs=1, seed=DEFAULT_SEED, log=None, replay=None):
     """Runs a specified set of agents through a specified set of games
-    and reports their overall performance."""
-    results = []
-    for i, game in enumerate(games):
-        print(f'{i:2d} / {len(games)}', end='\r')
+    and reports their overall performance. With a map_cache directory,
+    RoverOne agents are also reported warm, each playthrough starting
+    from the map learned by an uncounted one, which it does not change.
+    Playthroughs are spread over jobs processes, and each is seeded from
+    seed and its game, agent class and number, so that warm and cold
+    rows play the same seeds. With a log file, every playthrough and its
+    seed is recorded there, and with replay the playthrough at that index
+    of the log is played again instead."""
+    if replay is not None:
+        replay_playthrough(log, replay)
+        return
+    begin = time.perf_counter()
+    # (game, agent name, game path, agent, map cache) per table row
+    rows = []
+    for game in games:
         if not game.startswith('/'):
             game_path = os.path.join(games_dir, game)
         else:
             game_path = game
         for agent in agents:
-            sum_score = 0
-            sum_moves = 0
-            sum_locations = 0
-            for i in range(play_count):
-                moves, score, won = 0, 0, False
-                while moves < move_limit and not won:
-                    playthrough = driver.main(game_path, agent,
-                                              move_limit=move_limit - moves,
-                                              quiet=True,
-                                              pause=0,
-                                              seed=int(time.time()))
-                    moves += playthrough[0]
-                    score = max(score, playthrough[1])
-                    locations = playthrough[2]
-                    won = playthrough[3]
-                sum_score += score
-                sum_moves += moves
-                sum_locations += locations
-            score = sum_score / play_count
-            moves = sum_moves / play_count
-            locations = sum_locations / play_count
-            results.append([game, agent.__name__,
-                            int(score), int(moves),
-                            int(locations)])
-    for result in results:
-        print(result)
+            rows.append((game, agent.__name__, game_path, agent, None))
+            if map_cache is not None and issubclass(agent, RoverOne):
+                # a directory per agent, so that warm rows of one game
+                # never share a map
+                rows.append((game, f'{agent.__name__} (warm)', game_path,
+                             agent, os.path.join(map_cache,
+                                                 agent.__name__)))
+    # an uncounted playthrough fills the cache of every warm row, which
+    # counted playthroughs then only read, however they are scheduled
+    fills = [(game_path, agent, move_limit,
+              task_seed(seed, game, agent.__name__, 'fill'), cache)
+             for game, name, game_path, agent, cache in rows if cache]
+    outcomes = run(fills, jobs)
+    # warm and cold rows of an agent play the same seeds, so that they
+    # differ only in the map they start from
+    tasks = [(game_path, agent, move_limit,
+              task_seed(seed, game, agent.__name__, i), cache, True)
+             for game, name, game_path, agent, cache in rows
+             for i in range(play_count)]
+    counted = run(tasks, jobs)
+    outcomes += counted
+    results = []
+    for k, (game, name, *_) in enumerate(rows):
+        runs = counted[k * play_count:(k + 1) * play_count]
+        results.append([game, name, *mean_result(runs)])
+        print(results[-1], 'seeds:',
+              [task[3] for task in tasks[k * play_count:
+                                         (k + 1) * play_count]])
+    elapsed = time.perf_counter() - begin
+    # not measured: the serial time is estimated as the sum of the times
+    # of the playthroughs, which run slower side by side than alone
+    serial = sum(outcome[3] for outcome in outcomes)
+    print(f'{len(outcomes)} playthroughs with {jobs} jobs in '
+          f'{elapsed:.1f} s, an estimated {serial:.1f} s serial, '
+          f'estimated speedup {serial / elapsed if elapsed else 0:.2f}x')
 
+    if log:
+        names = [(game, name, i) for game, name, *_ in rows
+                 for i in range(play_count)]
+        write_log(log, seed, names, tasks, counted)
     if output:
         write_table(results, output)
     # todo: track total starts, track success rates, track exploration
 
 
+def write_log(log, seed, names, tasks, outcomes):
+    """Writes one JSON line per playthrough, holding what is needed to
+    replay it and its results."""
+    with open(log, 'w') as fh:
+        for (game, name, i), task, outcome in zip(names, tasks, outcomes):
+            game_path, _, move_limit, playthrough_seed, cache, _ = task
+            score, moves, locations, seconds = outcome
+            fh.write(json.dumps({
+                'game': game, 'game_path': game_path, 'agent': name,
+                'playthrough': i, 'base_seed': seed,
+                'seed': playthrough_seed,
+                'move_limit': move_limit, 'map_cache': cache,
+                'hash_seed': os.environ.get('PYTHONHASHSEED'),
+                'score': score, 'moves': moves, 'locations': locations,
+                'seconds': seconds}) + '\n')
+
+
+def replay_playthrough(log, index):
+    """Plays the playthrough at an index of a log again and reports
+    whether it ended the same way."""
+    with open(log) as fh:
+        record = json.loads(fh.readlines()[index])
+    if record['hash_seed'] != os.environ.get('PYTHONHASHSEED'):
+        print(f'Warning: recorded with PYTHONHASHSEED='
+              f'{record["hash_seed"]}, set it to replay exactly.')
+    if record['map_cache'] is not None:
+        print('Warning: warm playthroughs depend on the map cache.')
+    score, moves, locations, seconds = playthrough(
+        record['game_path'], agent_class(record['agent']),
+        record['move_limit'], record['seed'], record['map_cache'], True)
+    recorded = (record['score'], record['moves'], record['locations'])
+    print(f'{record["game"]} {record["agent"]} #{record["playthrough"]} '
+          f'seed {record["seed"]}: score {score}, moves {moves}, '
+          f'locations {locations} in {seconds:.1f} s')
+    if (score, moves, locations) == recorded:
+        print('Matches the recorded playthrough.')
+    else:
+        print(f'Differs from the recorded score, moves and locations '
+              f'{recorded}.')
+
+
+def parse_args():
+    """Parse command line arguments and return them as kwargs."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('output', nargs='?', default=None)
+    parser.add_argument('--map-cache', default=None)
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='number of playthroughs run in parallel')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help='base seed of every playthrough')
+    parser.add_argument('--log', default=None,
+                        help='file recording every playthrough and its '
+                        'seed, one JSON object per line')
+    parser.add_argument('--replay', type=int, default=None,
+                        help='replays the playthrough at this index of '
+                        'the log')
+    args = parser.parse_args()
+    if args.replay is not None and args.log is None:
+        parser.error('--replay needs the --log to replay from')
+    return vars(args)
+
+
 if __name__ == '__main__':
-    output = None
-    if len(sys.argv) > 1:
-        output = sys.argv[1]
-    main(output=output)
+    main(**parse_args())
@@ -3,11 +3,43 @@
 """Plays a single game using a single agent."""
 
 import argparse
+import cProfile
+import enum
 import os
-from multiprocessing.connection import Client
+import pstats
+import time
 
 from textworld import start, EnvInfos
-from ohotnik.agents import RoverTwo
+from ohotnik.agents import RoverTwo, RoverKnowledge
+from ohotnik.agents.map_cache import MapCache
+from ohotnik.agents.terms import TERMS
+from ohotnik.debug_channel import DebugChannel
+from ohotnik.telemetry import Telemetry
+
+
+class Mode(enum.Enum):
+    """How a game is presented while it is played."""
+    # waits for enter before every move and prints the game
+    INTERACTIVE = 'interactive'
+    # interactive, also sending debug states to rover_status
+    VERBOSE = 'verbose'
+    # plays without any output, for benchmarks
+    HEADLESS = 'headless'
+    # headless, then reports where the time went
+    PROFILE = 'profile'
+
+
+# game state fields requested by mode; agents only read the feedback,
+# which is always sent, and locations are counted by their description,
+# as not every game reports a location name
+INFOS = {
+    Mode.INTERACTIVE: EnvInfos(location=True, description=True),
+    Mode.VERBOSE: EnvInfos(location=True, description=True),
+    Mode.HEADLESS: EnvInfos(description=True),
+    Mode.PROFILE: EnvInfos(description=True),
+}
+# functions listed by the profile mode
+PROFILE_LINES = 20
 
 
 def get_root():
@@ -27,50 +59,135 @@ def parse_args():
     parser.add_argument('agent', nargs='?',
                         default=RoverTwo)
     parser.add_argument('--verbose', '-v', action='store_true')
+    parser.add_argument('--mode', default=None,
+                        choices=[mode.value for mode in Mode],
+                        help='how the game is presented, interactive '
+                        'unless --verbose is given')
+    parser.add_argument('--map-cache', default=None)
+    parser.add_argument('--freeze-map', action='store_true',
+                        help='load the cached map without saving it')
+    parser.add_argument('--seed', type=int, default=1234,
+                        help='seed of the agent and the game')
+    parser.add_argument('--move-limit', type=int, default=100)
+    parser.add_argument('--telemetry', default=None,
+                        help='file recording the timings of every move, '
+                        'one JSON object per line')
     return vars(parser.parse_args())
 
 
-def send_debug(debug):
-    """Send state information to a visualization client if one is
-    available."""
-    address = ('localhost', 6000)
-    try:
-        conn = Client(address, authkey=b'textbased-agent')
-    except ConnectionRefusedError:
-        return
-    conn.send(debug)
-    conn.close()
-
-
-def main(game, agent, move_limit=100, quiet=False, seed=1234,
-         verbose=False):
-    """Runs a single agent through a single game."""
-    infos = EnvInfos(location=True, description=True)
-    env = start(game, infos=infos)
-    game_state = env.reset()
-    agent = agent(seed=seed)
+def play(agent, env, game_state, move_limit, before=(), after=()):
+    """Plays until the game is done or move_limit moves have been made.
+    Every command is passed to the before hooks before it is played, and
+    with its reward to the after hooks once it has been. Returns the
+    number of moves, the last game state and the set of location
+    descriptions seen."""
     reward, done = 0, False
     moves = 0
     locations = set()
-    while not done:
+    while not done and moves < move_limit:
         locations.add(game_state.description)
         moves += 1
         command = agent.act(game_state, reward, done)
-        if not quiet:
-            # print(game_state)
-            if verbose:
-                send_debug(agent.debug_info())
-            input()
-            print('>', command)
+        for hook in before:
+            hook(command)
         game_state, reward, done = env.step(command)
-        if not quiet:
-            print(env.render())
-        if moves >= move_limit:
-            done = True
+        for hook in after:
+            hook(command, reward)
+    return moves, game_state, locations
+
+
+def prompt(command):
+    """Waits for enter and prints a command."""
+    input()
+    print('>', command)
+
+
+def mode_hooks(mode, agent, env, channel=None):
+    """Returns the before and after hooks presenting a game in a mode.
+    In verbose mode, the debug state of the agent is sent to channel
+    before every move, with only the changes of the tables of agents
+    reporting them."""
+    before, after = [], []
+    if mode is Mode.VERBOSE and channel is not None:
+        changes = getattr(agent, 'debug_changes', None)
+        before.append(lambda command: channel.send(
+            agent.debug_info(), changes() if changes else None))
+    if mode in (Mode.INTERACTIVE, Mode.VERBOSE):
+        before.append(prompt)
+        after.append(lambda command, reward: print(env.render()))
+    return before, after
+
+
+def main(game, agent, move_limit=100, quiet=False, seed=1234,
+         verbose=False, map_cache=None, telemetry=None, mode=None,
+         freeze_map=False):
+    """Runs a single agent through a single game. The mode is a Mode or
+    its value, and defaults to headless if quiet, verbose if verbose and
+    interactive otherwise. If map_cache names a directory, agents with a
+    RoverKnowledge start from the map saved there for this game, and save
+    what they learned when done unless freeze_map is True. The agent and
+    the game are both seeded, so that a seed replays a playthrough. If
+    telemetry names a file, the time spent parsing, telling, planning and
+    stepping and the size of the knowledge base are written there for
+    every move. Terms interned during the game are forgotten once it is
+    over, so that playing many games in one process does not grow the
+    term table."""
+    if mode is None:
+        if quiet:
+            mode = Mode.HEADLESS
+        elif verbose:
+            mode = Mode.VERBOSE
+        else:
+            mode = Mode.INTERACTIVE
+    mode = Mode(mode)
+    env = start(game, infos=INFOS[mode])
+    env.seed(seed)
+    game_state = env.reset()
+    mark = TERMS.mark()
+    agent = agent(seed=seed)
+    kb = getattr(agent, 'kb', None)
+    cache = None
+    if map_cache is not None and isinstance(kb, RoverKnowledge):
+        cache = MapCache(map_cache, frozen=freeze_map)
+        cache.load(game, kb)
+    channel = None
+    if mode is Mode.VERBOSE:
+        # debug states for a visualization client, if one is listening
+        channel = DebugChannel()
+    before, after = mode_hooks(mode, agent, env, channel)
+    log = None
+    if telemetry is not None:
+        log = Telemetry(telemetry)
+        log.instrument(agent, env)
+        after.insert(0, lambda command, reward:
+                     log.record(command=command, reward=reward))
+    profile = cProfile.Profile() if mode is Mode.PROFILE else None
+    begin = time.perf_counter()
+    if profile is not None:
+        profile.enable()
+    moves, game_state, locations = play(agent, env, game_state,
+                                        move_limit, before, after)
+    if profile is not None:
+        profile.disable()
+    elapsed = time.perf_counter() - begin
+    if mode is not Mode.HEADLESS:
+        print(f'{moves} moves in {elapsed:.2f} s, '
+              f'{moves / elapsed if elapsed else 0:.1f} moves/s')
+    if profile is not None:
+        stats = pstats.Stats(profile)
+        stats.sort_stats('cumulative').print_stats(PROFILE_LINES)
+    if log is not None:
+        log.close()
+    if channel is not None:
+        channel.close()
+    if cache is not None:
+        cache.save(game, kb)
+    TERMS.reset(mark)
     if 'score' in game_state:
         score = game_state['score']
     else:
         score = 0
+    locations.discard(None)
     return moves, score, len(locations), game_state.get('won', False)
 
 
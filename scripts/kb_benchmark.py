@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+
+"""Micro-benchmarks for the logical knowledge base."""
+
+import argparse
+import os
+import sys
+import timeit
+import tracemalloc
+from functools import partial
+
+OHOTNIK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from ohotnik.agents import LogicBase, Predicate, AndClause
+except ModuleNotFoundError:
+    sys.path.insert(0, OHOTNIK_ROOT)
+    from ohotnik.agents import LogicBase, Predicate, AndClause
+from ohotnik.agents.knowledge_base import ENGINES, unify, Model, \
+    FactStore
+from ohotnik.agents.columnar import ColumnarModel
+from ohotnik.agents.terms import unify_terms
+from ohotnik.agents.rover2 import IMPLICATIONS
+
+DEFAULT_SIZES = [10, 100, 500, 1000]
+DEFAULT_NUMBER = 1000
+DEFAULT_MOVES = 10000
+
+
+def maze_facts(size):
+    """Yields the exit and connects literals of a square grid maze with
+    size rooms."""
+    width = max(1, int(size ** 0.5))
+    for i in range(size):
+        room = f'room {i}'
+        neighbors = {'north': i - width, 'south': i + width,
+                     'east': i + 1 if (i + 1) % width else -1,
+                     'west': i - 1 if i % width else -1}
+        for direction, j in neighbors.items():
+            if 0 <= j < size:
+                yield Predicate('exit', (room, direction))
+                yield Predicate('connects',
+                                (room, direction, f'room {j}'))
+
+
+def maze_kb(size):
+    """Returns a LogicBase holding the literals of a maze."""
+    kb = LogicBase()
+    for literal in maze_facts(size):
+        kb.store(literal)
+    return kb
+
+
+def bench_fetch(sizes, number, moves):
+    """Reports the cost of fetching bound and unbound predicates as the
+    knowledge base grows."""
+    # pylint: disable=unused-argument
+    print(f'{"rooms":>6} {"facts":>7} {"bound (us)":>11} '
+          f'{"unbound (us)":>13}')
+    for size in sizes:
+        kb = maze_kb(size)
+        room = f'room {size // 2}'
+        bound = Predicate('connects', (room, 'D', 'X'))
+        unbound = Predicate('connects', ('L', 'D', 'X'))
+        t_bound = timeit.timeit(lambda: kb.fetch(bound),
+                                number=number) / number
+        t_unbound = timeit.timeit(lambda: kb.fetch(unbound),
+                                  number=max(1, number // 100))
+        t_unbound /= max(1, number // 100)
+        print(f'{size:6d} {len(kb.facts):7d} '
+              f'{t_bound * 1e6:11.2f} {t_unbound * 1e6:13.2f}')
+
+
+def maze_trace(size):
+    """Returns the observations of a walk through a maze, one list of
+    literals per move."""
+    rooms = {}
+    for literal in maze_facts(size):
+        rooms.setdefault(literal.args[0], []).append(literal)
+    trace = []
+    previous = None
+    for room, literals in rooms.items():
+        observations = list(literals)
+        observations.append(Predicate('at', ('player', room)))
+        if previous is not None:
+            observations.append(Predicate('at', ('player', previous),
+                                          False))
+        trace.append(observations)
+        previous = room
+    return trace
+
+
+def bench_chain(sizes, number, moves):
+    """Compares the forward chaining engines on a walk through a
+    maze."""
+    # pylint: disable=unused-argument
+    print(f'{"rooms":>6} {"engine":>7} {"total (ms)":>11} '
+          f'{"per move (us)":>14} {"joins":>9}')
+    for size in sizes:
+        trace = maze_trace(size)
+        for engine in ENGINES:
+            kb = LogicBase(engine=engine)
+            for implication in IMPLICATIONS[:2]:
+                kb.add_implication(implication)
+            joins = 0
+            start = timeit.default_timer()
+            for observations in trace:
+                kb.advance(('go', 'north'))
+                kb.tell(observations)
+                joins += sum(r.joins for r in kb.chain_stats)
+            elapsed = timeit.default_timer() - start
+            print(f'{size:6d} {engine:>7} {elapsed * 1e3:11.1f} '
+                  f'{elapsed / len(trace) * 1e6:14.1f} {joins:9d}')
+
+
+def bench_history(sizes, number, moves):
+    """Reports the memory held by the knowledge base over a long walk
+    back and forth through a maze."""
+    # pylint: disable=unused-argument
+    print(f'{"rooms":>6} {"moves":>7} {"facts":>7} {"memory (KiB)":>13}')
+    for size in sizes:
+        trace = maze_trace(size)
+        trace += trace[-2:0:-1]
+        kb = LogicBase()
+        tracemalloc.start()
+        for move in range(1, moves + 1):
+            kb.advance(('go', 'north'))
+            for literal in trace[move % len(trace)]:
+                kb.store(literal)
+            if move % (moves // 4 or 1) == 0:
+                current, _ = tracemalloc.get_traced_memory()
+                print(f'{size:6d} {move:7d} {len(kb.facts):7d} '
+                      f'{current / 1024:13.1f}')
+        tracemalloc.stop()
+
+
+# pairs of sentences unified by the logic base tests
+UNIFY_CASES = {
+    'matching literal': (Predicate('at', ('player', 'dining room')),
+                         Predicate('at', ('player', 'dining room'))),
+    'distinct literal': (Predicate('at', ('player', 'dining room')),
+                         Predicate('at', ('player', 'living room'))),
+    'variable': (Predicate('at', ('player', 'LOCATION')),
+                 Predicate('at', ('player', 'living room'))),
+    'repeated variable': (Predicate('open', ('C', 'C')),
+                          Predicate('open', ('box', 'box'))),
+    'three variables': (Predicate('connects', ('L', 'D', 'X')),
+                        Predicate('connects',
+                                  ('living room', 'south',
+                                   'dining room'))),
+}
+
+
+def bench_unify(sizes, number, moves):
+    """Compares the recursive unifier with the iterative unifier on
+    interned terms."""
+    # pylint: disable=unused-argument
+    number *= 100
+    print(f'{"case":>18} {"unify (ns)":>11} {"unify_terms (ns)":>17} '
+          f'{"speedup":>8}')
+    for case, (x, y) in UNIFY_CASES.items():
+        t_unify = timeit.timeit(lambda: unify(x, y), number=number)
+        t_terms = timeit.timeit(lambda: unify_terms(x.terms, y.terms),
+                                number=number)
+        print(f'{case:>18} {t_unify / number * 1e9:11.0f} '
+              f'{t_terms / number * 1e9:17.0f} '
+              f'{t_unify / t_terms:7.1f}x')
+
+
+def traced_bytes(build):
+    """Returns the result of build and the bytes it left allocated."""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = build()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, after - before
+
+
+def bench_memory(sizes, number, moves):
+    """Reports the bytes per fact held by each representation of a set
+    of literals. A FactStore also holds the literals of the current step
+    in a model of its own, so it is measured with each model."""
+    # pylint: disable=unused-argument
+    stores = [('Model', Model), ('ColumnarModel', ColumnarModel),
+              ('FactStore', FactStore),
+              ('FactStore/col', partial(FactStore, model=ColumnarModel))]
+    print(f'{"rooms":>6} {"facts":>7} ' +
+          ' '.join(f'{name:>14}' for name, _ in stores))
+    for size in sizes:
+        # literals are built first, so that their terms are interned
+        # outside of the measurements, but every store gets fresh
+        # argument tuples as it would in a game
+        literals = [(p.name, p.args, p.value) for p in maze_facts(size)]
+        row = []
+        for _, store in stores:
+            def build(store=store):
+                model = store()
+                for name, args, value in literals:
+                    model.store(name, tuple(list(args)), value)
+                return model
+            _, nbytes = traced_bytes(build)
+            row.append(nbytes / len(literals))
+        print(f'{size:6d} {len(literals):7d} ' +
+              ' '.join(f'{b:14.1f}' for b in row))
+
+
+def copying_join(kb, clauses):
+    """Joins clauses in order by copying substitution dictionaries, as
+    AndClause.eval did before substitutions were shared."""
+    substitutions = [{}]
+    for clause in clauses:
+        new_subs = []
+        for sub in substitutions:
+            result = clause.eval(kb, None, sub)
+            if result:
+                for r in result:
+                    r.update(sub)
+                    new_subs.append(r)
+        substitutions = new_subs
+    return substitutions
+
+
+def bench_join(sizes, number, moves):
+    """Compares copied and shared substitutions on a three-way join of
+    the connects table of a maze."""
+    # pylint: disable=unused-argument
+    premise = AndClause([Predicate('connects', ('A', 'D1', 'B')),
+                         Predicate('connects', ('B', 'D2', 'C')),
+                         Predicate('connects', ('C', 'D3', 'E'))])
+    print(f'{"rooms":>6} {"rows":>7} {"method":>7} {"time (ms)":>10} '
+          f'{"peak (KiB)":>11}')
+    for size in sizes:
+        kb = maze_kb(size)
+        kb.planner.plans.clear()
+        methods = [('copy', lambda: copying_join(kb, premise.clauses)),
+                   ('shared', lambda: premise.eval(kb))]
+        for method, join in methods:
+            start = timeit.default_timer()
+            rows = join()
+            elapsed = timeit.default_timer() - start
+            del rows
+            tracemalloc.start()
+            rows = join()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f'{size:6d} {len(rows):7d} {method:>7} '
+                  f'{elapsed * 1e3:10.1f} {peak / 1024:11.1f}')
+
+
+def bench_stream(sizes, number, moves):
+    """Compares the time to the first result and the peak memory of
+    fetching lists with streaming substitutions."""
+    # pylint: disable=unused-argument
+    queries = [
+        ('predicate', Predicate('connects', ('L', 'D', 'X'))),
+        ('join', AndClause([Predicate('connects', ('A', 'D1', 'B')),
+                            Predicate('connects', ('B', 'D2', 'C')),
+                            Predicate('connects', ('C', 'D3', 'E'))])),
+    ]
+    print(f'{"rooms":>6} {"query":>9} {"method":>7} {"first (us)":>11} '
+          f'{"peak (KiB)":>11}')
+    for size in sizes:
+        kb = maze_kb(size)
+        for query, sentence in queries:
+            methods = [('list', lambda s=sentence: kb.fetch(s)[0]),
+                       ('stream', lambda s=sentence: kb.first(s))]
+            for method, first in methods:
+                first()
+                start = timeit.default_timer()
+                first()
+                elapsed = timeit.default_timer() - start
+                tracemalloc.start()
+                first()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f'{size:6d} {query:>9} {method:>7} '
+                      f'{elapsed * 1e6:11.1f} {peak / 1024:11.1f}')
+
+
+BENCHMARKS = {
+    'unify': bench_unify,
+    'fetch': bench_fetch,
+    'chain': bench_chain,
+    'history': bench_history,
+    'memory': bench_memory,
+    'join': bench_join,
+    'stream': bench_stream,
+}
+
+
+def parse_args():
+    """Parse command line arguments and return them as kwargs."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('benchmark', nargs='?', default='all',
+                        choices=['all'] + list(BENCHMARKS))
+    parser.add_argument('--sizes', '-s', type=int, nargs='+',
+                        default=DEFAULT_SIZES)
+    parser.add_argument('--number', '-n', type=int,
+                        default=DEFAULT_NUMBER)
+    parser.add_argument('--moves', '-m', type=int,
+                        default=DEFAULT_MOVES)
+    return vars(parser.parse_args())
+
+
+def main(benchmark='all', sizes=DEFAULT_SIZES, number=DEFAULT_NUMBER,
+         moves=DEFAULT_MOVES):
+    """Runs the requested benchmarks."""
+    if benchmark == 'all':
+        benchmarks = list(BENCHMARKS)
+    else:
+        benchmarks = [benchmark]
+    for name in benchmarks:
+        print(f'== {name} ==')
+        BENCHMARKS[name](sizes, number, moves)
+
+
+if __name__ == '__main__':
+    main(**parse_args())
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+
+"""Micro-benchmarks for the map knowledge of RoverOne."""
+
+import argparse
+import itertools
+import os
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+OHOTNIK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from ohotnik.agents import RoverKnowledge, RoverOne
+except ModuleNotFoundError:
+    sys.path.insert(0, OHOTNIK_ROOT)
+    from ohotnik.agents import RoverKnowledge, RoverOne
+from ohotnik.agents.adjacency import AdjacencyKnowledge
+from ohotnik.agents.routes import np, RouteTable, ArrayRouteTable
+from ohotnik.agents.text import OPPOSITES
+from ohotnik.agents.map_cache import save_map, load_map
+
+BACKENDS = {
+    'dict': RoverKnowledge,
+    'adjacency': AdjacencyKnowledge,
+}
+DEFAULT_SIZES = [10, 100, 500, 5000]
+DEFAULT_NUMBER = 1000
+DEFAULT_SEED = 1234
+# all-pairs tables are quadratic in the number of rooms
+MAX_ROUTES_SIZE = 1000
+# moves per room before a coverage run gives up
+COVERAGE_LIMIT = 20
+
+
+def maze_map(size, seed=DEFAULT_SEED):
+    """Returns the passages of a random square grid maze with size rooms,
+    as a dictionary of {direction: room} by room. Every room is
+    reachable from every other one by exactly one path."""
+    rng = random.Random(seed)
+    width = max(1, int(size ** 0.5))
+    rooms = {f'room {i}': {} for i in range(size)}
+    visited = {0}
+    stack = [0]
+    while stack:
+        i = stack[-1]
+        neighbors = {'north': i - width, 'south': i + width,
+                     'east': i + 1 if (i + 1) % width else -1,
+                     'west': i - 1 if i % width else -1}
+        options = [(d, j) for d, j in neighbors.items()
+                   if 0 <= j < size and j not in visited]
+        if not options:
+            stack.pop()
+            continue
+        direction, j = rng.choice(options)
+        rooms[f'room {i}'][direction] = f'room {j}'
+        rooms[f'room {j}'][OPPOSITES[direction]] = f'room {i}'
+        visited.add(j)
+        stack.append(j)
+    # rooms cut off by a short last row are joined to the room above
+    for j in range(size):
+        if j not in visited:
+            rooms[f'room {j - width}']['south'] = f'room {j}'
+            rooms[f'room {j}']['north'] = f'room {j - width}'
+    return rooms
+
+
+def observations(rooms):
+    """Yields the exit and go observations of a fully explored maze."""
+    for room, passages in rooms.items():
+        for direction, destination in passages.items():
+            yield ('exit', room, direction)
+            yield ('go', room, direction, destination)
+
+
+def known_map(backend, rooms):
+    """Returns a knowledge base of a given backend holding a whole
+    maze."""
+    kb = backend()
+    for observation in observations(rooms):
+        kb.tell(observation)
+    return kb
+
+
+def bench_lookup(sizes, number):
+    """Reports the cost of asking for exits and destinations."""
+    print(f'{"rooms":>6} {"backend":>10} {"exit (ns)":>10} '
+          f'{"go (ns)":>9}')
+    for size in sizes:
+        rooms = maze_map(size)
+        queries = [(room, direction) for room, passages in rooms.items()
+                   for direction in passages][:number]
+        for name, backend in BACKENDS.items():
+            kb = known_map(backend, rooms)
+
+            def ask(prop, kb=kb):
+                for room, direction in queries:
+                    kb.ask(prop, room, direction)
+            t_exit = timeit.timeit(lambda: ask('exit'), number=10)
+            t_go = timeit.timeit(lambda: ask('go'), number=10)
+            count = 10 * len(queries)
+            print(f'{size:6d} {name:>10} {t_exit / count * 1e9:10.0f} '
+                  f'{t_go / count * 1e9:9.0f}')
+
+
+def bench_path(sizes, number):
+    """Reports the cost of a first path query between opposite corners
+    of a maze, and of repeating it once its tree is cached."""
+    print(f'{"rooms":>6} {"backend":>10} {"length":>7} {"cold (us)":>10} '
+          f'{"cached (us)":>12}')
+    for size in sizes:
+        rooms = maze_map(size)
+        start, goal = 'room 0', f'room {size - 1}'
+        for name, backend in BACKENDS.items():
+            kb = known_map(backend, rooms)
+            begin = timeit.default_timer()
+            path = kb.path(start, goal)
+            cold = timeit.default_timer() - begin
+            cached = timeit.timeit(lambda: kb.path(start, goal),
+                                   number=number) / number
+            print(f'{size:6d} {name:>10} {len(path):7d} '
+                  f'{cold * 1e6:10.1f} {cached * 1e6:12.1f}')
+
+
+def explore_map(backend, rooms):
+    """Explores a maze the way RoverOne does, moving to the nearest
+    unexplored exit each move. Returns the knowledge base and the time
+    taken by each move."""
+    kb = backend()
+    location = 'room 0'
+    for direction in rooms[location]:
+        kb.tell(('exit', location, direction))
+    timings = []
+    while True:
+        begin = timeit.default_timer()
+        dest, direction = kb.explore(location)
+        if dest is None:
+            break
+        if dest != location:
+            direction = kb.path(location, dest)[0]
+        destination = rooms[location][direction]
+        kb.tell(('go', location, direction, destination))
+        for exit_direction in rooms[destination]:
+            kb.tell(('exit', destination, exit_direction))
+        location = destination
+        timings.append(timeit.default_timer() - begin)
+    return kb, timings
+
+
+def bench_explore(sizes, number):
+    """Reports the time per move of exploring a whole maze."""
+    # pylint: disable=unused-argument
+    print(f'{"rooms":>6} {"backend":>10} {"moves":>7} {"mean (us)":>10} '
+          f'{"max (us)":>9} {"last 10% (us)":>14}')
+    for size in sizes:
+        rooms = maze_map(size)
+        for name, backend in BACKENDS.items():
+            _, timings = explore_map(backend, rooms)
+            tail = timings[-max(1, len(timings) // 10):]
+            print(f'{size:6d} {name:>10} {len(timings):7d} '
+                  f'{sum(timings) / len(timings) * 1e6:10.1f} '
+                  f'{max(timings) * 1e6:9.1f} '
+                  f'{sum(tail) / len(tail) * 1e6:14.1f}')
+
+
+def bench_routes(sizes, number):
+    """Compares all-pairs route tables with cached path trees on the
+    goal-directed queries of a fully mapped maze."""
+    tables = {'dict': RouteTable}
+    if np is not None:
+        tables['numpy'] = ArrayRouteTable
+    print(f'{"rooms":>6} {"method":>7} {"build (ms)":>11} '
+          f'{"next hop (us)":>14} {"add edge (us)":>14}')
+    for size in sizes:
+        if size > MAX_ROUTES_SIZE:
+            print(f'{size:6d} skipped, more than {MAX_ROUTES_SIZE} rooms')
+            continue
+        rooms = maze_map(size)
+        edges = [(room, direction, destination)
+                 for room, passages in rooms.items()
+                 for direction, destination in passages.items()]
+        rng = random.Random(DEFAULT_SEED)
+        pairs = [(rng.choice(list(rooms)), rng.choice(list(rooms)))
+                 for _ in range(number)]
+        kb = known_map(RoverKnowledge, rooms)
+        begin = timeit.default_timer()
+        for start, goal in pairs:
+            kb.path(start, goal)
+        elapsed = timeit.default_timer() - begin
+        print(f'{size:6d} {"trees":>7} {"":>11} '
+              f'{elapsed / number * 1e6:14.1f} {"":>14}')
+        for name, table in tables.items():
+            begin = timeit.default_timer()
+            routes = table(edges)
+            build = timeit.default_timer() - begin
+            begin = timeit.default_timer()
+            for start, goal in pairs:
+                routes.next_hop(start, goal)
+            lookup = timeit.default_timer() - begin
+            # shortcuts between random rooms, as a new passage would be
+            shortcuts = pairs[:10]
+            begin = timeit.default_timer()
+            for start, goal in shortcuts:
+                routes.add_edge(start, 'shortcut', goal)
+            added = timeit.default_timer() - begin
+            print(f'{size:6d} {name:>7} {build * 1e3:11.1f} '
+                  f'{lookup / number * 1e6:14.2f} '
+                  f'{added / len(shortcuts) * 1e6:14.1f}')
+
+
+def bench_cache(sizes, number):
+    """Compares exploring a maze from scratch with loading the map
+    saved by an earlier exploration."""
+    # pylint: disable=unused-argument
+    print(f'{"rooms":>6} {"backend":>10} {"cold (ms)":>10} '
+          f'{"save (ms)":>10} {"warm (ms)":>10} {"file (B/room)":>14}')
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            rooms = maze_map(size)
+            path = os.path.join(directory, f'maze{size}.map')
+            for name, backend in BACKENDS.items():
+                begin = timeit.default_timer()
+                kb, _ = explore_map(backend, rooms)
+                cold = timeit.default_timer() - begin
+                begin = timeit.default_timer()
+                save_map(kb, path)
+                save = timeit.default_timer() - begin
+                begin = timeit.default_timer()
+                load_map(path, backend())
+                warm = timeit.default_timer() - begin
+                print(f'{size:6d} {name:>10} {cold * 1e3:10.1f} '
+                      f'{save * 1e3:10.1f} {warm * 1e3:10.1f} '
+                      f'{os.path.getsize(path) / size:14.1f}')
+
+
+def bench_memory(sizes, number):
+    """Reports the bytes per room held by each backend for a fully
+    explored maze."""
+    # pylint: disable=unused-argument
+    print(f'{"rooms":>6} ' +
+          ' '.join(f'{name + " (B)":>15}' for name in BACKENDS))
+    for size in sizes:
+        rooms = maze_map(size)
+        # names are copied, so that each backend pays for its own keys
+        # as it would in a game
+        copied = [tuple(''.join(list(arg)) for arg in observation)
+                  for observation in observations(rooms)]
+        row = []
+        for backend in BACKENDS.values():
+            tracemalloc.start()
+            kb = backend()
+            for observation in copied:
+                kb.tell(tuple(''.join(list(arg)) for arg in observation))
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del kb
+            row.append(current / size)
+        print(f'{size:6d} ' + ' '.join(f'{b:15.1f}' for b in row))
+
+
+def maze_names(rooms, aliased):
+    """Returns the names the rooms of a maze are shown with. When
+    aliased, two rooms in three are all called 'Maze'."""
+    if not aliased:
+        return {room: room.title() for room in rooms}
+    return {room: 'Maze' if i % 3 else room.title()
+            for i, room in enumerate(rooms)}
+
+
+def stuck_passage(rooms):
+    """Returns the (room, direction) of the passage of a maze leading to
+    the part of it holding closest to half of its rooms, away from the
+    first room."""
+    first = next(iter(rooms))
+    parents = {first: None}
+    order = [first]
+    for room in order:
+        for direction, destination in rooms[room].items():
+            if destination not in parents:
+                parents[destination] = (room, direction)
+                order.append(destination)
+    sizes = dict.fromkeys(order, 1)
+    for room in reversed(order[1:]):
+        sizes[parents[room][0]] += sizes[room]
+    half = min(order[1:], key=lambda r: abs(2 * sizes[r] - len(rooms)))
+    return parents[half]
+
+
+def coverage_moves(agent, rooms, names, limit, exits=True, stuck=None):
+    """Plays a maze with an agent until every room has been visited.
+    Rooms list their exits if exits is True, and are all described alike
+    otherwise, so that passages are only found by trying them. The door
+    of the stuck (room, direction) passage fails to open the first time
+    it is tried. Returns the number of moves taken, or None if the agent
+    gave up or ran out of moves, and the number of rooms visited."""
+    room = next(iter(rooms))
+    visited = {room}
+    feedback = ''
+    for move in range(1, limit + 1):
+        action = agent.act({'feedback': feedback}, 0, False)
+        direction = action.replace('go ', '') if action else None
+        if stuck == (room, direction):
+            # the agent takes the passage for a dead end, and only a
+            # walk trying it again gets through
+            stuck = None
+            feedback = "You can't go that way."
+        elif action == 'look' or direction in rooms[room]:
+            room = rooms[room].get(direction, room)
+            visited.add(room)
+            if len(visited) == len(rooms):
+                return move, len(visited)
+            if exits:
+                feedback = (f'{names[room]}\nPassages lead '
+                            f'{" and ".join(rooms[room])}.')
+            else:
+                feedback = f'{names[room]}\nA plain room.'
+        elif action is None:
+            break
+        else:
+            feedback = "You can't go that way."
+    return None, len(visited)
+
+
+def bench_coverage(sizes, number):
+    """Reports the moves RoverOne needs to visit every room of a maze,
+    with and without loop detection, when rooms have unique names and
+    when most share one, when descriptions list the exits and when they
+    do not, and when the door to half of the maze is stuck at first."""
+    # pylint: disable=unused-argument
+    print(f'{"rooms":>6} {"names":>8} {"exits":>6} {"door":>6} '
+          f'{"loops":>6} {"moves":>7} {"visited":>8} {"escalations":>12}')
+    for size in sizes:
+        rooms = maze_map(size)
+        passage = stuck_passage(rooms)
+        for aliased, exits, stuck, detect_loops in itertools.product(
+                (False, True), (True, False), (None, passage),
+                (False, True)):
+            names = maze_names(rooms, aliased)
+            agent = RoverOne(seed=DEFAULT_SEED, aliases=aliased,
+                             detect_loops=detect_loops)
+            moves, visited = coverage_moves(
+                agent, rooms, names, COVERAGE_LIMIT * size, exits, stuck)
+            print(f'{size:6d} '
+                  f'{"aliased" if aliased else "unique":>8} '
+                  f'{"listed" if exits else "none":>6} '
+                  f'{"stuck" if stuck else "open":>6} '
+                  f'{"on" if detect_loops else "off":>6} '
+                  f'{moves if moves else "-":>7} {visited:8d} '
+                  f'{agent.escalations:12d}')
+
+
+BENCHMARKS = {
+    'lookup': bench_lookup,
+    'path': bench_path,
+    'explore': bench_explore,
+    'routes': bench_routes,
+    'cache': bench_cache,
+    'memory': bench_memory,
+    'coverage': bench_coverage,
+}
+
+
+def parse_args():
+    """Parse command line arguments and return them as kwargs."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('benchmark', nargs='?', default='all',
+                        choices=['all'] + list(BENCHMARKS))
+    parser.add_argument('--sizes', '-s', type=int, nargs='+',
+                        default=DEFAULT_SIZES)
+    parser.add_argument('--number', '-n', type=int,
+                        default=DEFAULT_NUMBER)
+    return vars(parser.parse_args())
+
+
+def main(benchmark='all', sizes=DEFAULT_SIZES, number=DEFAULT_NUMBER):
+    """Runs the requested benchmarks."""
+    if benchmark == 'all':
+        benchmarks = list(BENCHMARKS)
+    else:
+        benchmarks = [benchmark]
+    for name in benchmarks:
+        print(f'== {name} ==')
+        BENCHMARKS[name](sizes, number)
+
+
+if __name__ == '__main__':
+    main(**parse_args())
@@ -1,7 +1,17 @@
 """Receives debug messages from the AI driver and display them."""
 
+import os
+import sys
 from multiprocessing.connection import Listener
 
+OHOTNIK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from ohotnik.debug_channel import ADDRESS, AUTHKEY, apply_delta
+except ModuleNotFoundError:
+    sys.path.insert(0, OHOTNIK_ROOT)
+    from ohotnik.debug_channel import ADDRESS, AUTHKEY, apply_delta
+
 
 def print_predicates(predicates):
     """Pretty prints predicates."""
@@ -12,16 +22,22 @@ def print_predicates(predicates):
             print(f'    {literal}: {literals[literal]}')
 
 
-address = ('localhost', 6000)
-listener = Listener(address, authkey=b'textbased-agent')
+listener = Listener(ADDRESS, authkey=AUTHKEY)
 close = False
 while not close:
     conn = listener.accept()
-    msg = conn.recv()
-    if msg == -1:
-        close = True
-    else:
-        for key, val in msg.items():
+    # messages only hold changes, starting from an empty state
+    state = {}
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            break
+        if msg == -1:
+            close = True
+            break
+        apply_delta(state, msg)
+        for key, val in state.items():
             if key == 'predicates':
                 print_predicates(val)
             else:
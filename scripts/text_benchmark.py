@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+"""Throughput benchmark for parsing game feedback."""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+OHOTNIK_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    from ohotnik.agents import text
+except ModuleNotFoundError:
+    sys.path.insert(0, OHOTNIK_ROOT)
+    from ohotnik.agents import text
+from ohotnik.agents.perception import ROOM_CACHE_SIZE, RoomCache, \
+    perceive_room
+
+DEFAULT_SIZE = 1000
+DEFAULT_REPEAT = 5
+DEFAULT_SEED = 1234
+# times each room is seen in a replayed playthrough
+DEFAULT_REVISITS = 10
+ADJECTIVES = ['dusty', 'cramped', 'vast', 'dim', 'cold', 'humid']
+ROOMS = ['kitchen', 'cellar', 'attic', 'chamber', 'hallway', 'studio']
+EXITS = ['There is an unguarded exit to the {}.',
+         'You need an unblocked exit? You should try going {}.',
+         'There is an exit to the {}. Don\'t worry, it is unblocked.',
+         'A passage leads {} from here.']
+
+
+def generated_corpus(size, seed=DEFAULT_SEED):
+    """Returns feedback strings in the style of TextWorld room
+    descriptions, with one to four exits each."""
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(size):
+        room = f'{rng.choice(ADJECTIVES).title()} {rng.choice(ROOMS).title()}'
+        lines = [f'-= {room} {i} =-',
+                 f'You arrive in a {room.lower()}. An usual kind of '
+                 f'place.',
+                 '']
+        for direction in rng.sample(text.DIRECTIONS, rng.randint(1, 4)):
+            lines.append(rng.choice(EXITS).format(direction))
+        corpus.append('\n'.join(lines) + '\n\n')
+    return corpus
+
+
+def read_corpus(path):
+    """Returns the feedback strings of a file holding one JSON string per
+    line."""
+    with open(path) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def char_tokenize(s):
+    """The character-by-character tokenizer the rover agents used
+    before."""
+    buffer = []
+    for c in s:
+        if c.isalnum():
+            buffer.append(c.lower())
+        elif buffer:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def char_parse(s):
+    """Parses a room the way the rover agents did before."""
+    lines = (line for line in s.split('\n'))
+    line = ''
+    while line == '':
+        try:
+            line = next(lines)
+        except StopIteration:
+            return '', '', []
+    location = ' '.join(char_tokenize(line))
+    description = '\n'.join([line for line in lines if line != ''])
+    exits = [word for word in char_tokenize(description)
+             if word in text.DIRECTIONS]
+    return location, description, exits
+
+
+PARSERS = {
+    'characters': char_parse,
+    'regex': text.parse_location,
+}
+
+
+def parse_args():
+    """Parse command line arguments and return them as kwargs."""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpus', '-c', default=None,
+                        help='file of recorded feedback, one JSON string '
+                        'per line')
+    parser.add_argument('--size', '-s', type=int, default=DEFAULT_SIZE,
+                        help='number of generated feedback strings')
+    parser.add_argument('--repeat', '-r', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--revisits', type=int, default=DEFAULT_REVISITS,
+                        help='times each room is seen in the cached run')
+    parser.add_argument('--cache-size', type=int, nargs='+',
+                        default=[0, 64, ROOM_CACHE_SIZE])
+    return vars(parser.parse_args())
+
+
+def bench_cache(strings, revisits, cache_sizes, repeat):
+    """Reports the cost per room of parsing a playthrough which sees
+    every room of a corpus revisits times, in random order, through room
+    caches of several sizes."""
+    rng = random.Random(DEFAULT_SEED)
+    visits = [s for s in strings for _ in range(revisits)]
+    rng.shuffle(visits)
+    print(f'{"cache":>8} {"hit rate":>9} {"us/room":>8}')
+    best = min(timeit.repeat(lambda: [perceive_room(s) for s in visits],
+                             number=1, repeat=repeat))
+    print(f'{"none":>8} {"":>9} {best / len(visits) * 1e6:8.2f}')
+    for cache_size in cache_sizes:
+        rooms = RoomCache(cache_size)
+        best = min(timeit.repeat(lambda: [rooms.get(s) for s in visits],
+                                 setup=rooms.clear, number=1,
+                                 repeat=repeat))
+        print(f'{cache_size:8d} {rooms.hit_rate():9.2f} '
+              f'{best / len(visits) * 1e6:8.2f}')
+
+
+def main(corpus=None, size=DEFAULT_SIZE, repeat=DEFAULT_REPEAT,
+         revisits=DEFAULT_REVISITS, cache_size=(0, 64, ROOM_CACHE_SIZE)):
+    """Reports the throughput of each parser over a corpus, and the
+    cost of parsing a playthrough with room caches."""
+    if corpus is None:
+        strings = generated_corpus(size)
+    else:
+        strings = read_corpus(corpus)
+    total = sum(len(s) for s in strings)
+    expected = [char_parse(s) for s in strings]
+    print(f'{len(strings)} strings, {total} characters')
+    print(f'{"parser":>12} {"strings/s":>12} {"MB/s":>8}')
+    for name, parse in PARSERS.items():
+        assert [parse(s) for s in strings] == expected, name
+        best = min(timeit.repeat(lambda: [parse(s) for s in strings],
+                                 number=1, repeat=repeat))
+        print(f'{name:>12} {len(strings) / best:12.0f} '
+              f'{total / best / 1e6:8.2f}')
+    bench_cache(strings, revisits, cache_size, repeat)
+
+
+if __name__ == '__main__':
+    main(**parse_args())
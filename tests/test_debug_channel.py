@@ -0,0 +1,91 @@
+"""Tests the debug channel between the driver and rover_status."""
+
+import os
+import sys
+import unittest
+from multiprocessing.connection import Listener
+
+TEST_DIR = os.path.dirname(__file__)
+MAIN_DIR = os.path.join(TEST_DIR, os.pardir)
+
+sys.path.insert(0, MAIN_DIR)
+
+from ohotnik.debug_channel import DebugChannel, state_delta, apply_delta
+
+STATES = [
+    {'location': 'hall', 'go graph': [],
+     'predicates': {'exit': {('hall', 'north'): True}}},
+    {'location': 'kitchen', 'go graph': [('hall', 'north', 'kitchen')],
+     'predicates': {'exit': {('hall', 'north'): True,
+                             ('kitchen', 'south'): True},
+                    'at': {('player', 'kitchen'): True}}},
+    {'location': 'kitchen', 'go graph': [('hall', 'north', 'kitchen')],
+     'predicates': {'exit': {('kitchen', 'south'): False}},
+     'goals': ['hall']},
+    {'location': 'hall', 'go graph': [('kitchen', 'south', 'hall')],
+     'predicates': {}},
+]
+
+
+class TestDebugChannel(unittest.TestCase):
+    """Tests that full states are rebuilt from their deltas."""
+
+    def test_delta(self):
+        state = {}
+        last = {}
+        for new in STATES:
+            apply_delta(state, state_delta(last, new))
+            self.assertEqual(state, new)
+            last = new
+        delta = state_delta(STATES[1], STATES[2])
+        self.assertNotIn('location', delta['set'])
+        self.assertNotIn('go graph', delta['items'])
+
+    def test_send(self):
+        """Tests that states sent over a channel reach a listener."""
+        with Listener(('localhost', 0), authkey=b'test') as listener:
+            channel = DebugChannel(listener.address, b'test')
+            for new in STATES:
+                channel.send(new)
+            conn = listener.accept()
+            state = {}
+            for _ in STATES:
+                apply_delta(state, conn.recv())
+            channel.close()
+            conn.close()
+        self.assertEqual(state, STATES[-1])
+        self.assertEqual((channel.sent, channel.dropped), (len(STATES), 0))
+
+    def test_no_client(self):
+        """Tests that sending without a client neither blocks nor
+        fails."""
+        with Listener(('localhost', 0), authkey=b'test') as listener:
+            address = listener.address
+        channel = DebugChannel(address, b'test', size=2)
+        for new in STATES:
+            channel.send(new)
+        channel.close()
+        self.assertEqual(channel.sent, 0)
+        self.assertEqual(channel.dropped, len(STATES))
+
+    def test_changes(self):
+        """Tests that tables sent as changes are rebuilt whole, even when
+        the states holding some of them are dropped."""
+        with Listener(('localhost', 0), authkey=b'test') as listener:
+            channel = DebugChannel(listener.address, b'test', size=2)
+            for new in STATES:
+                state = {key: value for key, value in new.items()
+                         if key != 'predicates'}
+                channel.send(state, {'predicates': new['predicates']})
+            conn = listener.accept()
+            state = {}
+            while conn.poll(0.5):
+                apply_delta(state, conn.recv())
+            channel.close()
+            conn.close()
+        self.assertEqual(state['location'], 'hall')
+        self.assertEqual(state['predicates'],
+                         {'exit': {('hall', 'north'): True,
+                                   ('kitchen', 'south'): False},
+                          'at': {('player', 'kitchen'): True}})
+        self.assertEqual(channel.sent + channel.dropped, len(STATES))
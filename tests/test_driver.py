@@ -0,0 +1,106 @@
+"""Tests the hooks and counters of the driver's execution modes."""
+
+import io
+import os
+import sys
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+TEST_DIR = os.path.dirname(__file__)
+MAIN_DIR = os.path.join(TEST_DIR, os.pardir)
+
+sys.path.insert(0, MAIN_DIR)
+sys.path.insert(0, os.path.join(MAIN_DIR, 'scripts'))
+
+try:
+    import driver
+except ModuleNotFoundError:
+    driver = None
+
+
+class GameState(dict):
+    """A game state whose fields are also attributes, as in TextWorld."""
+    __getattr__ = dict.get
+
+
+class Corridor:
+    """A game of two rooms joined north to south."""
+
+    def __init__(self):
+        self.room = 'Hall'
+
+    def state(self):
+        return GameState(feedback=self.room, description=self.room)
+
+    def step(self, command):
+        if command == 'go north':
+            self.room = 'Kitchen'
+        elif command == 'go south':
+            self.room = 'Hall'
+        return self.state(), 0, False
+
+    def render(self):
+        return self.room
+
+
+class Walker:
+    """An agent going north and south in turn."""
+
+    def __init__(self):
+        self.moves = 0
+
+    def act(self, game_state, reward, done):
+        self.moves += 1
+        return 'go north' if self.moves % 2 else 'go south'
+
+    def debug_info(self):
+        return {'moves': self.moves}
+
+
+class Channel:
+    """Records the debug states sent to it."""
+
+    def __init__(self):
+        self.states = []
+
+    def send(self, state, changes=None):
+        self.states.append(state)
+
+
+@unittest.skipIf(driver is None, 'TextWorld is not installed')
+class TestPlay(unittest.TestCase):
+    """Tests that every mode plays with the hooks it presents a game
+    with."""
+
+    def test_modes(self):
+        sends = {driver.Mode.VERBOSE: 5}
+        prompts = {driver.Mode.INTERACTIVE: 5, driver.Mode.VERBOSE: 5}
+        for mode in driver.Mode:
+            with self.subTest(mode=mode):
+                agent, env, channel = Walker(), Corridor(), Channel()
+                before, after = driver.mode_hooks(mode, agent, env,
+                                                  channel)
+                commands = []
+                before.append(commands.append)
+                output = io.StringIO()
+                with mock.patch('builtins.input') as enter, \
+                        redirect_stdout(output):
+                    moves, game_state, locations = driver.play(
+                        agent, env, env.state(), 5, before, after)
+                self.assertEqual(moves, 5)
+                self.assertEqual(commands, ['go north', 'go south'] * 2 +
+                                 ['go north'])
+                self.assertEqual(locations, {'Hall', 'Kitchen'})
+                self.assertEqual(game_state.description, 'Kitchen')
+                self.assertEqual(len(channel.states), sends.get(mode, 0))
+                self.assertEqual(enter.call_count, prompts.get(mode, 0))
+                # the command and the room after it, for every move
+                self.assertEqual(len(output.getvalue().splitlines()),
+                                 2 * prompts.get(mode, 0))
+
+    def test_infos(self):
+        """Tests that every mode asks for the descriptions locations are
+        counted by."""
+        for mode in driver.Mode:
+            self.assertTrue(driver.INFOS[mode].description)
@@ -1,8 +1,10 @@
 """Tests the first-order logic implementation of the knowledge base."""
 
+import io
 import os
 import sys
 import unittest
+from contextlib import redirect_stdout
 
 TEST_DIR = os.path.dirname(__file__)
 MAIN_DIR = os.path.join(TEST_DIR, os.pardir)
@@ -10,8 +12,11 @@ MAIN_DIR = os.path.join(TEST_DIR, os.pardir)
 sys.path.insert(0, MAIN_DIR)
 
 from ohotnik.agents import LogicBase, AndClause, Predicate, \
-    Implication, LinearImplication
-from ohotnik.agents.knowledge_base import unify
+    Implication, LinearImplication, FunctionNode
+from ohotnik.agents.knowledge_base import unify, Model, FactStore
+from ohotnik.agents.terms import TERMS, Terms, unify_terms
+from ohotnik.agents.columnar import ColumnarModel
+from ohotnik.agents.substitution import EMPTY
 
 
 class TestUnify(unittest.TestCase):
@@ -42,6 +47,252 @@ class TestUnify(unittest.TestCase):
         ))
 
 
+class TestUnifyTerms(unittest.TestCase):
+    """Tests the iterative unifier on interned terms."""
+    def test_unify_matching_literal(self):
+        """Confirms that unifying two matching literals returns empty
+        bindings."""
+        p1 = Predicate('at', ('player', 'dining room'))
+        p2 = Predicate('at', ('player', 'dining room'))
+        self.assertEqual(unify_terms(p1.terms, p2.terms), {})
+
+    def test_unify_distinct_literal(self):
+        """Confirms that unifying two distinct literals returns
+        False."""
+        p1 = Predicate('at', ('player', 'dining room'))
+        p2 = Predicate('at', ('player', 'living room'))
+        self.assertFalse(unify_terms(p1.terms, p2.terms))
+
+    def test_unify_variables(self):
+        """Confirms that variables are bound consistently."""
+        pattern = Predicate('connects', ('L', 'D', 'L'))
+        self.assertEqual(
+            unify_terms(pattern.terms,
+                        Predicate('connects',
+                                  ('hall', 'up', 'hall')).terms),
+            {TERMS.intern('L'): TERMS.intern('hall'),
+             TERMS.intern('D'): TERMS.intern('up')})
+        self.assertFalse(
+            unify_terms(pattern.terms,
+                        Predicate('connects',
+                                  ('hall', 'up', 'attic')).terms))
+
+    def test_occur_check(self):
+        """Confirms that the occur check rejects a variable bound to a
+        term containing it."""
+        x = TERMS.intern('X')
+        compound = (TERMS.intern('location'), x)
+        self.assertTrue(unify_terms((x,), (compound,)))
+        self.assertFalse(unify_terms((x,), (compound,), occur_check=True))
+
+    def test_reset(self):
+        """Confirms that resetting a term table forgets only the terms
+        interned since the mark."""
+        terms = Terms()
+        hall = terms.intern('hall')
+        mark = terms.mark()
+        terms.intern('attic')
+        terms.intern('X')
+        terms.reset(mark)
+        self.assertEqual(len(terms), 1)
+        self.assertEqual(terms.lookup('hall'), hall)
+        self.assertIsNone(terms.lookup('attic'))
+        self.assertIsNone(terms.lookup('X'))
+        self.assertEqual(terms.intern('cellar'), mark)
+
+
+class TestSubstitution(unittest.TestCase):
+    """Tests persistent substitutions."""
+    def test_extend(self):
+        """Confirms that extending a substitution leaves it unchanged
+        and shares its bindings."""
+        sub = EMPTY.extend('L', 'kitchen')
+        left = sub.extend('D', 'north')
+        right = sub.extend_all({'D': 'south', 'X': 'garden'})
+        self.assertEqual(sub, {'L': 'kitchen'})
+        self.assertEqual(left, {'L': 'kitchen', 'D': 'north'})
+        self.assertEqual(right, {'L': 'kitchen', 'D': 'south',
+                                 'X': 'garden'})
+        self.assertIs(right.parent, sub)
+
+    def test_substitute(self):
+        """Confirms that a substitution can be used to substitute a
+        predicate."""
+        sub = EMPTY.extend_all({'L': 'kitchen', 'D': 'north'})
+        predicate = Predicate('connects', ('L', 'D', 'X'))
+        self.assertEqual(predicate.substitute(None, sub=sub).args,
+                         ('kitchen', 'north', 'X'))
+        self.assertNotIn('X', sub)
+        self.assertEqual(len(sub), 2)
+
+
+class TestModel(unittest.TestCase):
+    """Tests the argument indexes of a single model."""
+    def setUp(self):
+        self.model = Model()
+        self.model.store('connects', ('kitchen', 'north', 'hall'), True)
+        self.model.store('connects', ('kitchen', 'south', 'garden'), True)
+        self.model.store('connects', ('hall', 'south', 'kitchen'), True)
+
+    def test_candidates_bound(self):
+        """Confirms that a bound argument narrows the candidate
+        literals."""
+        self.assertEqual(
+            list(self.model.candidates('connects',
+                                       ('X', 'south', 'kitchen'))),
+            [('hall', 'south', 'kitchen')])
+        self.assertEqual(
+            list(self.model.candidates('connects', ('attic', 'D', 'X'))),
+            [])
+
+    def test_candidates_substitution(self):
+        """Confirms that variables bound by a substitution are used to
+        narrow the candidate literals."""
+        self.assertEqual(
+            list(self.model.candidates('connects', ('L', 'D', 'X'),
+                                       {'L': 'hall'})),
+            [('hall', 'south', 'kitchen')])
+
+    def test_fetch_bound(self):
+        """Confirms that fetching with a bound argument returns only the
+        matching substitutions."""
+        subs, _ = self.model.fetch(
+            Predicate('connects', ('kitchen', 'D', 'X')))
+        self.assertEqual(subs, [{'D': 'north', 'X': 'hall'},
+                                {'D': 'south', 'X': 'garden'}])
+
+    def test_merge_index(self):
+        """Confirms that merged literals are indexed."""
+        other = Model()
+        other.store('connects', ('garden', 'north', 'kitchen'), True)
+        self.model.merge(other)
+        self.assertEqual(
+            list(self.model.candidates('connects', ('X', 'D', 'kitchen'))),
+            [('hall', 'south', 'kitchen'), ('garden', 'north', 'kitchen')])
+
+    def test_fetch_variable_literal(self):
+        """Confirms that literals with variable arguments, as stored by
+        occams_razor, match any constant."""
+        self.model.store('connects', ('LOCATION', 'west', 'garden'), True)
+        subs, _ = self.model.fetch(
+            Predicate('connects', ('hall', 'west', 'X')))
+        self.assertEqual(subs, [{'LOCATION': 'hall', 'X': 'garden'}])
+
+
+class TestColumnarModel(TestModel):
+    """Runs the model tests against the columnar model."""
+    def setUp(self):
+        self.model = ColumnarModel()
+        self.model.store('connects', ('kitchen', 'north', 'hall'), True)
+        self.model.store('connects', ('kitchen', 'south', 'garden'), True)
+        self.model.store('connects', ('hall', 'south', 'kitchen'), True)
+
+    def test_candidates_bound(self):
+        """Confirms that a bound argument narrows the candidate
+        rows."""
+        pattern = Predicate('connects', ('X', 'south', 'kitchen')).terms
+        self.assertEqual(
+            [table.args(row)
+             for table, row in self.model.rows('connects', pattern)],
+            [('hall', 'south', 'kitchen')])
+
+    def test_candidates_substitution(self):
+        """Confirms that variables bound by a substitution narrow the
+        substitutions fetched."""
+        subs, _ = self.model.fetch(Predicate('connects', ('L', 'D', 'X')),
+                                   initial_substitution={'L': 'hall'})
+        self.assertEqual(subs, [{'L': 'hall', 'D': 'south',
+                                 'X': 'kitchen'}])
+
+    def test_merge_index(self):
+        """Confirms that merged literals can be fetched."""
+        other = Model()
+        other.store('connects', ('garden', 'north', 'kitchen'), True)
+        self.model.merge(other)
+        subs, _ = self.model.fetch(
+            Predicate('connects', ('L', 'D', 'kitchen')))
+        self.assertEqual(subs, [{'L': 'hall', 'D': 'south'},
+                                {'L': 'garden', 'D': 'north'}])
+
+    def test_values(self):
+        """Confirms that values are stored and overwritten in the
+        bitmap."""
+        for i in range(20):
+            self.model.store('open', (f'door {i}',), i % 3 == 0)
+        self.model.store('open', ('door 4',), True)
+        self.assertTrue(self.model.ask('open', ('door 3',)))
+        self.assertFalse(self.model.ask('open', ('door 5',)))
+        self.assertTrue(self.model.ask('open', ('door 4',)))
+        self.assertIsNone(self.model.ask('open', ('door 40',)))
+        self.assertEqual(len(self.model), 23)
+
+
+class TestFactStore(unittest.TestCase):
+    """Tests the versioned fact store."""
+    def setUp(self):
+        self.facts = FactStore(horizon=3)
+
+    def test_ask_time(self):
+        """Confirms that literals can be asked about at earlier
+        steps."""
+        self.facts.store('at', ('player', 'kitchen'), True)
+        self.facts.advance(('go', 'north'))
+        self.facts.store('at', ('player', 'kitchen'), False)
+        self.assertFalse(self.facts.ask('at', ('player', 'kitchen')))
+        self.assertTrue(self.facts.ask('at', ('player', 'kitchen'), -1))
+        self.assertIsNone(self.facts.ask('at', ('player', 'kitchen'), -2))
+
+    def test_store_past(self):
+        """Confirms that a literal stored in the past is overridden by
+        later values."""
+        self.facts.store('open', ('door',), True)
+        self.facts.advance(('wait',))
+        self.facts.store('open', ('door',), False, time=-1)
+        self.assertFalse(self.facts.ask('open', ('door',), -1))
+        self.assertFalse(self.facts.ask('open', ('door',)))
+
+    def test_compaction(self):
+        """Confirms that history beyond the horizon is compacted."""
+        for step in range(100):
+            self.facts.store('open', ('door',), step % 2 == 0)
+            self.facts.advance(('wait',))
+        history = self.facts.history('open', ('door',))
+        self.assertLessEqual(len(history), self.facts.horizon + 1)
+        self.assertFalse(self.facts.ask('open', ('door',), -1))
+        self.assertTrue(self.facts.ask('open', ('door',), -2))
+
+    def test_unchanged(self):
+        """Confirms that storing the value a literal already has adds no
+        history."""
+        for _ in range(5):
+            self.facts.store('open', ('door',), True)
+            self.facts.advance(('wait',))
+        self.assertEqual(self.facts.history('open', ('door',)),
+                         [(0, True)])
+        self.assertTrue(self.facts.ask('open', ('door',), -2))
+
+    def test_latest(self):
+        """Confirms that only literals stored during the current step
+        are latest."""
+        self.facts.store('at', ('player', 'kitchen'), True)
+        self.facts.advance(('go', 'north'))
+        self.facts.store('at', ('player', 'hall'), True)
+        self.assertEqual([p.args for p in self.facts.latest],
+                         [('player', 'hall')])
+
+    def test_fetch_variable_literal(self):
+        """Confirms that literals with variable arguments match any
+        constant, and bind variables to their variables."""
+        self.facts.store('connects', ('kitchen', 'north', 'hall'), True)
+        self.facts.store('connects', ('LOCATION', 'west', 'garden'), True)
+        self.assertEqual(
+            self.facts.fetch(Predicate('connects', ('hall', 'west', 'X'))),
+            [{'LOCATION': 'hall', 'X': 'garden'}])
+        self.assertEqual(
+            self.facts.fetch(Predicate('connects', ('L', 'west', 'X'))),
+            [{'L': 'LOCATION', 'X': 'garden'}])
+
+
 class TestLogicBase(unittest.TestCase):
     """Test the basic functioning of the logic base."""
     def setUp(self):
@@ -95,6 +346,9 @@ class TestLogicBase(unittest.TestCase):
         """Confirm that an AND clause with a variable evaluates
         correctly."""
 
+        now_predicate = Predicate('at', ['player', 'LOCATION'],
+                                  time=-1)
+        self.kb.look_back(now_predicate)
         # tell a fact to kb
         self.kb.tell([
             Predicate('at', ['player', 'living room']),
@@ -109,8 +363,6 @@ class TestLogicBase(unittest.TestCase):
 
         # confirm that the location from last term is not the location
         # for this term
-        now_predicate = Predicate('at', ['player', 'LOCATION'],
-                                  time=-1)
         then_predicate = Predicate(
             'at', ['player', 'LOCATION'], False)
         self.assertTrue(now_predicate.eval(self.kb))
@@ -139,6 +391,119 @@ class TestLogicBase(unittest.TestCase):
                          [{'L': 'garage', 'C': 'box'},
                           {'L': 'bedroom', 'C': 'chest'}])
 
+    def test_iter_fetch(self):
+        """Confirm that substitutions are streamed lazily, and that
+        first and exists stop at the first one."""
+        self.kb.tell([Predicate('at', ['box', 'garage']),
+                      Predicate('at', ['chest', 'bedroom'])])
+        pred = Predicate('at', ['C', 'L'])
+        stream = self.kb.iter_fetch(pred)
+        self.assertNotIsInstance(stream, list)
+        self.assertEqual(list(stream), self.kb.fetch(pred))
+        self.assertIn(self.kb.first(pred), self.kb.fetch(pred))
+        self.assertTrue(self.kb.exists(pred))
+        self.assertIsNone(self.kb.first(Predicate('at', ['C', 'attic'])))
+        self.assertFalse(self.kb.exists(Predicate('open', ['C'])))
+
+    def test_iter_fetch_and(self):
+        """Confirm that streaming a conjunction yields the same
+        substitutions as evaluating it."""
+        self.kb.tell([
+            Predicate('container', ['box']),
+            Predicate('container', ['chest']),
+            Predicate('open', ['box']),
+            Predicate('open', ['chest']),
+            Predicate('at', ['box', 'garage']),
+            Predicate('at', ['chest', 'bedroom'])
+        ])
+        premise = AndClause([
+            Predicate('container', ['C']),
+            Predicate('open', ['C']),
+            Predicate('at', ['C', 'L'])
+        ])
+        self.assertCountEqual(list(self.kb.iter_fetch(premise)),
+                              premise.eval(self.kb))
+        self.assertEqual(self.kb.first(premise, {'C': 'chest'}),
+                         {'C': 'chest', 'L': 'bedroom'})
+        self.assertIsNone(self.kb.first(premise, {'C': 'cupboard'}))
+
+    def test_explore(self):
+        """Confirm that explore substitutes the action of the first rule
+        whose premise holds."""
+        self.kb.tell([Predicate('at', ['player', 'hall']),
+                      Predicate('exit', ['hall', 'north'])])
+        self.kb.advance(('look',))
+        self.assertIsNone(self.kb.explore())
+        self.kb.add_rule(LinearImplication(
+            ('go', 'DIRECTION'),
+            AndClause([Predicate('at', ['player', 'L']),
+                       Predicate('exit', ['L', 'DIRECTION'])]),
+            Predicate('at', ['player', 'L'], False)))
+        self.assertEqual(self.kb.explore(), ('go', 'north'))
+
+    def test_plan_selective_first(self):
+        """Confirms that the planner joins the most selective clause
+        first and follows it with clauses sharing its variables."""
+        self.kb.tell([Predicate('connects', [f'room {i}', 'north',
+                                             f'room {i + 1}'])
+                      for i in range(20)])
+        self.kb.tell([Predicate('at', ['player', 'room 3'])])
+        premise = AndClause([
+            Predicate('connects', ['L', 'DIRECTION', 'X']),
+            Predicate('at', ['player', 'L'])])
+        self.assertEqual(self.kb.plan(premise.clauses), [1, 0])
+        self.assertEqual(premise.eval(self.kb),
+                         [{'L': 'room 3', 'DIRECTION': 'north',
+                           'X': 'room 4'}])
+
+    def test_explain(self):
+        """Confirms that explain reports the actual rows after each
+        clause."""
+        self.kb.tell([
+            Predicate('container', ['box']),
+            Predicate('container', ['chest']),
+            Predicate('open', ['box']),
+        ])
+        premise = AndClause([Predicate('container', ['C']),
+                             Predicate('open', ['C'])])
+        output = io.StringIO()
+        with redirect_stdout(output):
+            result = self.kb.explain(premise)
+        self.assertEqual(result, [{'C': 'box'}])
+        rows = output.getvalue().splitlines()[1:]
+        self.assertEqual([row.split()[-1] for row in rows], ['1', '1'])
+
+    def test_function_cache(self):
+        """Confirms that function values are cached until a literal of
+        the backing predicate is stored."""
+        self.kb.tell([Predicate('connects', ['hall', 'north', 'attic'])])
+        self.assertEqual(self.kb.ask_function('destination',
+                                              ('hall', 'north')), 'attic')
+        self.assertEqual(self.kb.ask_function('destination',
+                                              ('hall', 'north')), 'attic')
+        stats = self.kb.stats()
+        self.assertEqual(stats['function_misses'], 1)
+        self.assertEqual(stats['function_hits'], 1)
+        self.kb.tell([Predicate('connects', ['hall', 'south', 'cellar'])])
+        self.assertEqual(self.kb.ask_function('destination',
+                                              ('hall', 'north')), 'attic')
+        self.assertEqual(self.kb.stats()['function_hits'], 2)
+        self.kb.tell([Predicate('connects', ['hall', 'north', 'attic'],
+                                False)])
+        self.assertIsNone(self.kb.ask_function('destination',
+                                               ('hall', 'north')))
+        self.assertEqual(self.kb.stats()['function_misses'], 2)
+
+    def test_function_cache_advance(self):
+        """Confirms that advancing the knowledge base clears function
+        values at relative times."""
+        self.kb.tell([Predicate('at', ['player', 'hall'])])
+        self.assertIsNone(self.kb.ask_function('location', ('player',),
+                                               time=-1))
+        self.kb.advance(('go', 'north'))
+        self.assertEqual(self.kb.ask_function('location', ('player',),
+                                              time=-1), 'hall')
+
     def test_forward_chain(self):
         self.kb.add_implication(
             Implication(
@@ -155,8 +520,79 @@ class TestLogicBase(unittest.TestCase):
         self.assertTrue(
             Predicate('exit', ['living room', 'south']))
 
+    def test_forward_chain_delta(self):
+        """Confirms that literals told later are joined against literals
+        already in the knowledge base."""
+        self.kb.add_implication(
+            Implication(
+                AndClause([Predicate('edge', ['X', 'Y']),
+                           Predicate('edge', ['Y', 'Z'])]),
+                Predicate('path2', ['X', 'Z'])))
+        self.kb.tell([Predicate('edge', ['a', 'b'])])
+        self.assertIsNone(self.kb.fetch(Predicate('path2', ['X', 'Z'])))
+        self.kb.tell([Predicate('edge', ['b', 'c'])])
+        self.assertEqual(self.kb.fetch(Predicate('path2', ['X', 'Z'])),
+                         [{'X': 'a', 'Z': 'c'}])
+
+    def test_changes(self):
+        """Confirms that changes returns every literal at first, and then
+        only those stored since the last call."""
+        self.kb.tell([Predicate('at', ['player', 'hall'])])
+        self.assertEqual(self.kb.changes(),
+                         {'at': {('player', 'hall'): True}})
+        self.assertEqual(self.kb.changes(), {})
+        self.kb.tell([Predicate('at', ['player', 'hall'], False),
+                      Predicate('at', ['player', 'attic'])])
+        self.assertEqual(self.kb.changes(),
+                         {'at': {('player', 'hall'): False,
+                                 ('player', 'attic'): True}})
+
+    def test_forward_chain_function(self):
+        """Confirms that a premise reading a function is joined again
+        when a literal of the backing predicate is told."""
+        self.kb.add_implication(
+            Implication(
+                AndClause([Predicate('lamp', ['L']),
+                           Predicate('same', ['L', FunctionNode(
+                               'location', ['player'])])]),
+                Predicate('lit', ['L'])))
+        self.kb.tell([Predicate('lamp', ['kitchen']),
+                      Predicate('same', ['kitchen', 'kitchen'])])
+        self.assertFalse(Predicate('lit', ['kitchen']).eval(self.kb))
+        self.kb.tell([Predicate('at', ['player', 'kitchen'])])
+        self.assertTrue(Predicate('lit', ['kitchen']).eval(self.kb))
+
+    def test_forward_chain_deep(self):
+        """Confirms that long chains of inference reach their fixpoint
+        one round at a time."""
+        self.kb.add_implication(
+            Implication(
+                AndClause([Predicate('reach', ['X']),
+                           Predicate('next', ['X', 'Y'])]),
+                Predicate('reach', ['Y'])))
+        count = 1500
+        self.kb.tell([Predicate('next', [f'n{i}', f'n{i + 1}'])
+                      for i in range(count)])
+        self.kb.tell([Predicate('reach', ['n0'])])
+        self.assertTrue(Predicate('reach', [f'n{count}']).eval(self.kb))
+        self.assertEqual(sum(r.new_facts for r in self.kb.chain_stats),
+                         count)
+        self.assertEqual(self.kb.chain_stats[-1].new_facts, 0)
+
     def test_linear_implication(self):
         """Confirms that linear implication evaluates correctly."""
+        rule = LinearImplication(
+            ('go', 'DIRECTION',),
+            AndClause([
+                Predicate('at', ['player', 'LOCATION']),
+                Predicate('exit', ['LOCATION', 'DIRECTION'],
+                          carry=True),
+                Predicate('connects', ['LOCATION',
+                                       'DIRECTION',
+                                       'DESTINATION'],
+                          carry=True)]),
+            Predicate('at', ['player', 'DESTINATION']))
+        self.kb.look_back(rule)
         self.kb.tell([
             Predicate('at', ['player', 'living room']),
             Predicate('exit', ['living room', 'south']),
@@ -169,17 +605,6 @@ class TestLogicBase(unittest.TestCase):
             Predicate('at', ['player', 'dining room']),
             Predicate('at', ['player', 'living room'], False),
         ])
-        rule = LinearImplication(
-            ('go', 'DIRECTION',),
-            AndClause([
-                Predicate('at', ['player', 'LOCATION']),
-                Predicate('exit', ['LOCATION', 'DIRECTION'],
-                          carry=True),
-                Predicate('connects', ['LOCATION',
-                                       'DIRECTION',
-                                       'DESTINATION'],
-                          carry=True)]),
-            Predicate('at', ['player', 'DESTINATION']))
         self.assertTrue(rule.premise.eval(self.kb))
         self.kb.add_rule(rule)
         # import pdb
@@ -187,3 +612,120 @@ class TestLogicBase(unittest.TestCase):
         self.kb.forward_chain()
         self.assertFalse(Predicate('action',
                                    ['action_obj']).eval(self.kb))
+
+    def test_plan_cache_size(self):
+        """Confirms that single predicate premises do not add a plan for
+        every tell."""
+        self.kb.add_implication(
+            Implication(Predicate('at', ('player', 'LOCATION')),
+                        Predicate('visited', ('LOCATION',))))
+        for i in range(50):
+            self.kb.advance(('go', 'north'))
+            self.kb.tell([Predicate('at', ('player', f'room {i}'))])
+        self.assertLessEqual(len(self.kb.planner.plans), 1)
+
+    def test_variable_literal(self):
+        """Confirms that implications match literals with variable
+        arguments."""
+        self.kb.add_implication(
+            Implication(
+                AndClause((
+                    Predicate('connects', ('LOCATION', 'DIRECTION', 'X')),
+                    Predicate('connects', ('LOCATION', 'DIRECTION', 'Y')),
+                )),
+                Predicate('=', ('X', 'Y'))))
+        self.kb.tell([Predicate('connects', ('LOCATION', 'west', 'kitchen')),
+                      Predicate('connects', ('hall', 'west', 'pantry'))])
+        self.assertCountEqual(
+            self.kb.fetch(Predicate('=', ('X', 'Y'))),
+            [{'X': 'kitchen', 'Y': 'kitchen'},
+             {'X': 'kitchen', 'Y': 'pantry'},
+             {'X': 'pantry', 'Y': 'kitchen'},
+             {'X': 'pantry', 'Y': 'pantry'}])
+
+    def test_horizon(self):
+        """Confirms that the horizon reaches as far back as the
+        implications look, unless it is given."""
+        implication = Implication(
+            Predicate('at', ['player', 'LOCATION'], time=-2),
+            Predicate('visited', ['LOCATION']))
+        for horizon, expected in ((None, 3), (1, 1), (4, 4)):
+            kb = LogicBase(horizon=horizon)
+            self.assertEqual(kb.facts.horizon, horizon or 1)
+            kb.add_implication(implication)
+            self.assertEqual(kb.facts.horizon, expected)
+
+
+class TestColumnarLogicBase(TestLogicBase):
+    """Runs the logic base tests with columnar models."""
+    def setUp(self):
+        super().setUp()
+        self.kb = LogicBase(model=ColumnarModel)
+        self.kb.add_function('location', 'at', 1)
+        self.kb.add_function('destination', 'connects', 2)
+
+
+class TestReteEngine(TestLogicBase):
+    """Runs the logic base tests with implications compiled into a
+    matching network."""
+    def setUp(self):
+        super().setUp()
+        self.kb = LogicBase(engine='rete')
+        self.kb.add_function('location', 'at', 1)
+        self.kb.add_function('destination', 'connects', 2)
+
+    def test_compiled(self):
+        """Confirms that simple premises are compiled into the
+        network."""
+        self.kb.add_implication(
+            Implication(
+                AndClause([Predicate('edge', ['X', 'Y']),
+                           Predicate('edge', ['Y', 'Z'])]),
+                Predicate('path2', ['X', 'Z'])))
+        self.assertEqual(self.kb.evaluated, [])
+
+    def test_unground(self):
+        """Confirms that premises using a predicate with variable
+        arguments are evaluated rather than compiled."""
+        implication = Implication(
+            AndClause([Predicate('edge', ['X', 'Y']),
+                       Predicate('edge', ['Y', 'Z'])]),
+            Predicate('path2', ['X', 'Z']))
+        self.kb.add_implication(implication)
+        self.kb.store(Predicate('edge', ['a', 'b']))
+        self.assertEqual(self.kb.evaluated, [])
+        self.kb.store(Predicate('edge', ['b', 'NODE']))
+        self.assertEqual(self.kb.evaluated, [implication])
+        self.kb.forward_chain()
+        self.assertEqual(self.kb.fetch(Predicate('path2', ['a', 'Z'])),
+                         [{'Z': 'NODE'}])
+
+    def test_retraction(self):
+        """Confirms that a match is withdrawn when a literal it uses
+        becomes false before the match fires."""
+        self.kb.add_implication(
+            Implication(
+                AndClause([Predicate('edge', ['X', 'Y']),
+                           Predicate('open', ['Y'])]),
+                Predicate('reachable', ['Y'])))
+        self.kb.store(Predicate('edge', ['a', 'b']))
+        self.kb.store(Predicate('open', ['b']))
+        self.assertEqual(len(self.kb.network.agenda), 1)
+        self.kb.store(Predicate('open', ['b'], False))
+        self.assertEqual(len(self.kb.network.agenda), 0)
+        self.kb.forward_chain()
+        self.assertIsNone(self.kb.fetch(Predicate('reachable', ['Y'])))
+
+    def test_past_view(self):
+        """Confirms that premises about the past are matched once the
+        knowledge base advances."""
+        self.kb.add_implication(
+            Implication(
+                Predicate('at', ['player', 'LOCATION'], time=-1),
+                Predicate('visited', ['LOCATION'])))
+        self.kb.tell([Predicate('at', ['player', 'kitchen'])])
+        self.assertIsNone(self.kb.fetch(Predicate('visited', ['L'])))
+        self.kb.advance(('go', 'north'))
+        self.kb.tell([Predicate('at', ['player', 'hall'])])
+        self.assertEqual(self.kb.fetch(Predicate('visited', ['L'])),
+                         [{'L': 'kitchen'}])
@@ -2,14 +2,24 @@
 
 import os
 import sys
+import tempfile
 import unittest
+from concurrent.futures import ProcessPoolExecutor
 
 TEST_DIR = os.path.dirname(__file__)
 MAIN_DIR = os.path.join(TEST_DIR, os.pardir)
 
 sys.path.insert(0, MAIN_DIR)
 
-from ohotnik.agents import RoverOne, RoverKnowledge
+from ohotnik.agents import RoverOne, RoverTwo, RoverKnowledge
+from ohotnik.agents.adjacency import AdjacencyKnowledge
+from ohotnik.agents.routes import np, RouteTable, ArrayRouteTable
+from ohotnik.agents.map_cache import MapCache, save_map, load_map
+from ohotnik.agents.identity import UnionFind, LocationIdentity
+from ohotnik.agents.text import DIRECTIONS, tokenize, split_location, \
+    parse_location
+from ohotnik.agents.perception import At, Go, Exit, Perception, \
+    RoomCache
 
 
 class TestRoverKnowledge(unittest.TestCase):
@@ -39,7 +49,409 @@ class TestRoverKnowledge(unittest.TestCase):
         kb.tell(('go', 'pantry', 'down', 'basement'))
         self.assertEqual(kb.path('simple room', 'basement'),
                          ['north', 'west', 'down'])
-        # self.assertIsNone(kb.path('simple room', 'attic'))
+        self.assertIsNone(kb.path('simple room', 'attic'))
+
+    def test_path_update(self):
+        """Tests that cached paths follow new and changed edges."""
+        kb = self.kb
+        kb.tell(('go', 'hall', 'north', 'kitchen'))
+        kb.tell(('go', 'kitchen', 'west', 'pantry'))
+        kb.tell(('go', 'pantry', 'down', 'cellar'))
+        self.assertEqual(kb.path('hall', 'cellar'),
+                         ['north', 'west', 'down'])
+        kb.tell(('go', 'hall', 'down', 'cellar'))
+        self.assertEqual(kb.path('hall', 'cellar'), ['down'])
+        kb.tell(('go', 'hall', 'down', 'hall'))
+        self.assertEqual(kb.path('hall', 'cellar'),
+                         ['north', 'west', 'down'])
+        kb.tell(('go', 'cellar', 'up', 'attic'))
+        self.assertEqual(kb.path('hall', 'attic'),
+                         ['north', 'west', 'down', 'up'])
+        self.assertEqual(kb.path('hall', 'hall'), [])
+
+    def test_explore(self):
+        """Tests that explore finds the nearest unexplored exit."""
+        kb = self.kb
+        kb.tell(('exit', 'hall', 'north'))
+        self.assertEqual(kb.explore('hall'), ('hall', 'north'))
+        kb.tell(('go', 'hall', 'north', 'kitchen'))
+        kb.tell(('exit', 'kitchen', 'south'))
+        kb.tell(('exit', 'kitchen', 'west'))
+        kb.tell(('go', 'kitchen', 'south', 'hall'))
+        self.assertEqual(kb.explore('hall'), ('kitchen', 'west'))
+        self.assertIsNone(kb.unexplored('hall'))
+        self.assertEqual(kb.unexplored('kitchen'), 'west')
+        kb.tell(('go', 'kitchen', 'west', 'pantry'))
+        self.assertEqual(kb.explore('hall'), (None, None))
+
+    def test_routes(self):
+        """Tests that paths read from all-pairs routes follow new and
+        changed edges."""
+        kb = self.kb
+        kb.tell(('go', 'hall', 'north', 'kitchen'))
+        kb.tell(('go', 'kitchen', 'west', 'pantry'))
+        kb.tell(('go', 'pantry', 'down', 'cellar'))
+        routes = kb.compute_routes()
+        self.assertEqual(len(routes), 4)
+        self.assertEqual(kb.path('hall', 'cellar'),
+                         ['north', 'west', 'down'])
+        self.assertIsNone(kb.path('cellar', 'hall'))
+        kb.tell(('go', 'cellar', 'up', 'hall'))
+        self.assertEqual(kb.path('cellar', 'pantry'),
+                         ['up', 'north', 'west'])
+        kb.tell(('go', 'hall', 'down', 'cellar'))
+        self.assertEqual(kb.path('hall', 'cellar'), ['down'])
+        kb.tell(('go', 'hall', 'down', 'hall'))
+        self.assertEqual(kb.path('hall', 'cellar'),
+                         ['north', 'west', 'down'])
+
+    def test_split(self):
+        """Tests that a move contradicting the map splits a location
+        sharing its name."""
+        kb = type(self.kb)(aliases=True)
+        maze = 'You are in a maze of twisty little passages.'
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('exit', 'maze', 'north'))
+        kb.tell(('go', 'maze', 'north', 'maze'))
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('go', 'maze', 'east', 'dead end'))
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('go', 'dead end', 'west', 'maze'))
+        self.assertEqual(kb.here, 'maze')
+        kb.tell(('at', 'troll room', 'A troll blocks the way.'))
+        kb.tell(('go', 'maze', 'north', 'troll room'))
+        self.assertEqual(kb.ask('go', 'dead end', 'west'), 'maze #2')
+        self.assertEqual(kb.ask('go', 'maze #2', 'north'), 'troll room')
+        self.assertEqual(kb.ask('go', 'maze', 'north'), 'maze')
+        self.assertTrue(kb.ask('exit', 'maze #2', 'north'))
+        self.assertEqual(kb.path('maze', 'troll room'),
+                         ['east', 'west', 'north'])
+
+    def test_merge(self):
+        """Tests that two locations looking the same are merged once
+        moves from both in one direction lead to the same location."""
+        kb = type(self.kb)(aliases=True)
+        maze = 'A maze.'
+        kb.tell(('at', 'hall', 'A hall.'))
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('go', 'hall', 'north', 'maze'))
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('go', 'maze', 'east', 'maze'))
+        self.assertEqual(kb.here, 'maze #2')
+        kb.tell(('at', 'vault', 'A vault.'))
+        kb.tell(('go', 'maze #2', 'north', 'vault'))
+        kb.tell(('go', 'vault', 'south', 'maze #2'))
+        kb.tell(('go', 'maze #2', 'west', 'maze'))
+        kb.tell(('go', 'maze', 'south', 'hall'))
+        # the way back of both mazes is known, so neither is taken
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('go', 'hall', 'east', 'maze'))
+        self.assertEqual(kb.here, 'maze #3')
+        kb.tell(('at', 'vault', 'A vault.'))
+        kb.tell(('go', 'maze #3', 'north', 'vault'))
+        self.assertEqual(kb.here, 'vault')
+        self.assertEqual(kb.ask('go', 'hall', 'east'), 'maze #2')
+        self.assertEqual(kb.path('hall', 'vault'), ['east', 'north'])
+
+    def test_conflict(self):
+        """Tests that a move contradicting a known description splits
+        the location it was made from instead of changing the map."""
+        kb = type(self.kb)(aliases=True)
+        kb.tell(('at', 'hall', 'A hall.'))
+        kb.tell(('at', 'corridor', 'A cold corridor.'))
+        kb.tell(('go', 'hall', 'north', 'corridor'))
+        kb.tell(('at', 'hall', 'A hall.'))
+        kb.tell(('go', 'corridor', 'south', 'hall'))
+        kb.tell(('at', 'corridor', 'A dark corridor.'))
+        kb.tell(('go', 'hall', 'north', 'corridor'))
+        self.assertEqual(kb.here, 'corridor #2')
+        self.assertEqual(kb.ask('go', 'hall', 'north'), 'corridor')
+        self.assertEqual(kb.ask('go', 'hall #2', 'north'), 'corridor #2')
+        self.assertEqual(kb.path('corridor', 'corridor #2'),
+                         ['south', 'north'])
+
+
+class TestLocationIdentity(unittest.TestCase):
+    """Tests the labelling of locations which share a name."""
+
+    def test_union_find(self):
+        sets = UnionFind()
+        ids = [sets.add() for _ in range(4)]
+        sets.union(ids[0], ids[1])
+        sets.union(ids[2], ids[1])
+        self.assertEqual(sets.find(ids[0]), sets.find(ids[2]))
+        self.assertNotEqual(sets.find(ids[0]), sets.find(ids[3]))
+        self.assertEqual(len(sets), 4)
+
+    def test_labels(self):
+        identity = LocationIdentity()
+        self.assertEqual(identity.locate('maze', b'a'), 'maze')
+        self.assertEqual(identity.locate('maze', b'a'), 'maze')
+        self.assertEqual(identity.locate('maze', b'b'), 'maze #2')
+        self.assertEqual(identity.locate('maze'), 'maze')
+        self.assertEqual(identity.candidates('maze', b'b'), ['maze #2'])
+        self.assertFalse(identity.same('maze', 'maze #2'))
+        self.assertEqual(identity.locate('hall'), 'hall')
+        identity.note('hall', b'h')
+        self.assertEqual(identity.candidates('hall', b'x'), [])
+        self.assertEqual(identity.split('maze'), 'maze #3')
+        identity.merge('maze', 'maze #3')
+        self.assertEqual(identity.label(identity.node('maze #3')), 'maze')
+        self.assertEqual(identity.name('maze #2'), 'maze')
+
+
+class TestText(unittest.TestCase):
+    """Tests the parsing of game feedback."""
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("-= Simple Room =-\nIt's north_east."),
+                         ['simple', 'room', 'it', 's', 'north', 'east'])
+
+    def test_split_location(self):
+        self.assertEqual(split_location('\n\nHall\n\nA hall.\n\nDark.\n'),
+                         ('hall', 'A hall.\nDark.'))
+        self.assertEqual(split_location('Hall'), ('hall', ''))
+        self.assertEqual(split_location('\n\n'), ('', ''))
+
+    def test_parse_location(self):
+        """Tests that directions are only found as whole words."""
+        location, _, exits = parse_location(
+            'Hall\nExits lead North, northwest and up; no upward '
+            'southeasterly ones. Then north again.')
+        self.assertEqual(location, 'hall')
+        self.assertEqual(exits, ['north', 'northwest', 'up', 'north'])
+
+
+class TestPerception(unittest.TestCase):
+    """Tests the observation records shared by the rover agents."""
+
+    def test_perceive(self):
+        perception = Perception()
+        room = 'Kitchen\nA door leads west.'
+        self.assertEqual(perception.perceive(room, 'go north', 'hall'),
+                         [At('kitchen', 'A door leads west.'),
+                          Go('hall', 'north', 'kitchen'),
+                          Exit('kitchen', 'west')])
+        self.assertEqual(perception.last_parse, 'move')
+        self.assertEqual(perception.perceive("You can't go that way.",
+                                             'go east', 'kitchen'),
+                         [Go('kitchen', 'east', None)])
+        self.assertEqual(perception.perceive("I don't know the word "
+                                             "xyzzy.", 'xyzzy', 'kitchen'),
+                         [])
+        self.assertEqual(perception.last_parse, 'rejection')
+        perception.perceive(room, 'look', 'kitchen')
+        self.assertEqual(perception.rooms.hits, 1)
+
+    def test_room_cache(self):
+        """Tests that the least recently used rooms are evicted."""
+        rooms = RoomCache(2)
+        hall = rooms.get('Hall\nGo north.')
+        rooms.get('Kitchen\nGo south.')
+        self.assertIs(rooms.get('Hall\nGo north.'), hall)
+        rooms.get('Cellar\nGo up.')
+        self.assertEqual(len(rooms), 2)
+        rooms.get('Kitchen\nGo south.')
+        self.assertEqual(rooms.stats(), {'hits': 1, 'misses': 4,
+                                         'hit rate': 0.2, 'rooms': 2})
+        uncached = RoomCache(0)
+        uncached.get('Hall\nGo north.')
+        uncached.get('Hall\nGo north.')
+        self.assertEqual((uncached.hits, len(uncached)), (0, 0))
+
+    def test_rover_two(self):
+        """Tests that RoverTwo translates records for its logic
+        base."""
+        agent = RoverTwo()
+        agent.location = 'hall'
+        agent.last_command = ('go', 'north')
+        self.assertEqual(agent.parse({'feedback': 'Kitchen\nGo west.'}),
+                         [('exit', ('kitchen', 'west')),
+                          ('at', ('player', 'kitchen')),
+                          ('at', ('player', 'hall'), False)])
+        self.assertEqual(agent.location, 'kitchen')
+        agent.last_command = ('go', 'up')
+        self.assertEqual(agent.parse({'feedback': 'You cannot.'}),
+                         [('exit', ('kitchen', 'up'), False)])
+
+
+class TestRouteTable(unittest.TestCase):
+    """Tests the all-pairs next-hop tables."""
+    table = RouteTable
+
+    def setUp(self):
+        self.routes = self.table([('hall', 'north', 'kitchen'),
+                                  ('kitchen', 'south', 'hall'),
+                                  ('kitchen', 'west', 'pantry')])
+
+    def test_next_hop(self):
+        """Tests that the first move towards a destination is looked
+        up."""
+        routes = self.routes
+        self.assertEqual(routes.next_hop('hall', 'pantry'), 'north')
+        self.assertEqual(routes.next_hop('pantry', 'hall'), None)
+        self.assertEqual(routes.path('hall', 'pantry'), ['north', 'west'])
+        self.assertEqual(routes.path('pantry', 'pantry'), [])
+
+    def test_add_edge(self):
+        """Tests that adding edges shortens paths and adds
+        locations."""
+        routes = self.routes
+        routes.add_edge('pantry', 'east', 'hall')
+        self.assertEqual(routes.path('pantry', 'kitchen'),
+                         ['east', 'north'])
+        routes.add_edge('pantry', 'up', 'attic')
+        self.assertEqual(routes.path('hall', 'attic'),
+                         ['north', 'west', 'up'])
+        routes.add_edge('hall', 'up', 'attic')
+        self.assertEqual(routes.path('hall', 'attic'), ['up'])
+        self.assertEqual(routes.path('pantry', 'attic'), ['up'])
+
+    def test_set_edges(self):
+        """Tests that replacing the edges of a location reroutes the
+        paths through it."""
+        routes = self.routes
+        routes.set_edges('kitchen', [('east', 'pantry')])
+        self.assertEqual(routes.path('hall', 'pantry'), ['north', 'east'])
+        self.assertEqual(routes.path('kitchen', 'hall'), None)
+        routes.set_edges('kitchen', ())
+        self.assertEqual(routes.path('hall', 'pantry'), None)
+        self.assertEqual(routes.path('hall', 'kitchen'), ['north'])
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class TestArrayRouteTable(TestRouteTable):
+    """Runs the route table tests against the NumPy tables."""
+    table = ArrayRouteTable
+
+
+class TestAdjacencyKnowledge(TestRoverKnowledge):
+    """Runs the knowledge base tests against the adjacency backend."""
+    def setUp(self):
+        self.kb = AdjacencyKnowledge()
+
+    def test_locations(self):
+        """Tests that the map can be read back as nested
+        dictionaries."""
+        kb = self.kb
+        kb.tell(('exit', 'hall', 'north'))
+        kb.tell(('go', 'hall', 'north', 'kitchen'))
+        self.assertEqual(kb.locations,
+                         {'hall': {'exit': {'north'},
+                                   'go': {'north': 'kitchen'}},
+                          'kitchen': {}})
+        self.assertEqual(kb.go_graph(), [('hall', 'north', 'kitchen')])
+
+
+class TestMapCache(unittest.TestCase):
+    """Tests saving and loading learned maps."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.kb = RoverKnowledge()
+        self.kb.tell(('exit', 'hall', 'north'))
+        self.kb.tell(('exit', 'hall', 'east'))
+        self.kb.tell(('go', 'hall', 'north', 'kitchen'))
+        self.kb.tell(('go', 'kitchen', 'south', 'hall'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """Tests that a saved map is loaded into either backend."""
+        path = os.path.join(self.directory.name, 'hall.map')
+        save_map(self.kb, path)
+        for knowledge in (RoverKnowledge, AdjacencyKnowledge):
+            kb = knowledge()
+            self.assertTrue(load_map(path, kb))
+            self.assertCountEqual(kb.exit_list(), self.kb.exit_list())
+            self.assertCountEqual(kb.go_graph(), self.kb.go_graph())
+            self.assertEqual(kb.explore('kitchen'), ('hall', 'east'))
+
+    def test_aliases(self):
+        """Tests that a map of locations sharing a name keeps their
+        labels, descriptions and merges."""
+        kb = RoverKnowledge(aliases=True)
+        maze = 'A maze.'
+        kb.tell(('at', 'hall', 'A hall.'))
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('go', 'hall', 'north', 'maze'))
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('go', 'maze', 'east', 'maze'))
+        kb.tell(('at', 'vault', 'A vault.'))
+        kb.tell(('go', 'maze #2', 'north', 'vault'))
+        kb.tell(('go', 'vault', 'south', 'maze #2'))
+        kb.tell(('go', 'maze #2', 'west', 'maze'))
+        kb.tell(('go', 'maze', 'south', 'hall'))
+        kb.tell(('at', 'maze', maze))
+        kb.tell(('go', 'hall', 'east', 'maze'))
+        kb.tell(('at', 'vault', 'A vault.'))
+        kb.tell(('go', 'maze #3', 'north', 'vault'))
+        path = os.path.join(self.directory.name, 'maze.map')
+        save_map(kb, path)
+        self.assertFalse(load_map(path, RoverKnowledge()))
+        for knowledge in (RoverKnowledge, AdjacencyKnowledge):
+            loaded = knowledge(aliases=True)
+            self.assertTrue(load_map(path, loaded))
+            self.assertFalse(load_map(path, loaded))
+            self.assertEqual(loaded.identity.nodes(), kb.identity.nodes())
+            self.assertCountEqual(loaded.exit_list(), kb.exit_list())
+            self.assertCountEqual(loaded.go_graph(), kb.go_graph())
+            self.assertEqual(loaded.identity.node('maze #3'),
+                             loaded.identity.node('maze #2'))
+            loaded.tell(('at', 'hall', 'A hall.'))
+            loaded.tell(('at', 'maze', maze))
+            loaded.tell(('go', 'hall', 'east', 'maze'))
+            self.assertEqual(loaded.here, 'maze #2')
+            loaded.tell(('at', 'maze', 'Another maze.'))
+            loaded.tell(('go', 'maze #2', 'up', 'maze'))
+            self.assertEqual(loaded.here, 'maze #4')
+
+    def test_concurrent_save(self):
+        """Tests that processes saving one map at once do not clash."""
+        path = os.path.join(self.directory.name, 'hall.map')
+        with ProcessPoolExecutor(max_workers=8) as executor:
+            list(executor.map(save_map, [self.kb] * 200, [path] * 200))
+        self.assertTrue(load_map(path, RoverKnowledge()))
+        self.assertEqual(os.listdir(self.directory.name), ['hall.map'])
+
+    def test_not_a_map(self):
+        """Tests that other files are not loaded."""
+        path = os.path.join(self.directory.name, 'other.map')
+        with open(path, 'wb') as fh:
+            fh.write(b'not a map file at all')
+        self.assertFalse(load_map(path, RoverKnowledge()))
+
+    def test_cache(self):
+        """Tests that maps are cached by the contents of a game."""
+        game = os.path.join(self.directory.name, 'game.z8')
+        with open(game, 'wb') as fh:
+            fh.write(b'game')
+        cache = MapCache(os.path.join(self.directory.name, 'maps'))
+        kb = RoverKnowledge()
+        self.assertFalse(cache.load(game, kb))
+        cache.save(game, self.kb)
+        self.assertTrue(cache.load(game, kb))
+        self.assertEqual(kb.path('hall', 'kitchen'), ['north'])
+        with open(game, 'wb') as fh:
+            fh.write(b'another game')
+        self.assertFalse(cache.load(game, RoverKnowledge()))
+
+    def test_frozen(self):
+        """Tests that a frozen cache loads maps without changing
+        them."""
+        game = os.path.join(self.directory.name, 'game.z8')
+        with open(game, 'wb') as fh:
+            fh.write(b'game')
+        directory = os.path.join(self.directory.name, 'maps')
+        MapCache(directory).save(game, self.kb)
+        frozen = MapCache(directory, frozen=True)
+        kb = RoverKnowledge()
+        self.assertTrue(frozen.load(game, kb))
+        kb.tell(('go', 'kitchen', 'east', 'cellar'))
+        frozen.save(game, kb)
+        kb = RoverKnowledge()
+        frozen.load(game, kb)
+        self.assertIsNone(kb.ask('go', 'kitchen', 'east'))
 
 
 class TestRoverOne(unittest.TestCase):
@@ -61,3 +473,96 @@ class TestRoverOne(unittest.TestCase):
         self.assertEqual(observations,
                          [('exit', 'simple room', 'north'),
                           ('exit', 'simple room', 'south')])
+
+    def test_parse_aliases(self):
+        """Tests that agents telling apart locations report where they
+        arrive before their moves."""
+        agent = RoverOne(aliases=True)
+        agent.location = 'hall'
+        agent.last_command = 'go north'
+        observations = agent.parse({'feedback': 'Maze\nPassages lead '
+                                                'east and west.'})
+        self.assertEqual(observations,
+                         [('at', 'maze', 'Passages lead east and west.'),
+                          ('go', 'hall', 'north', 'maze'),
+                          ('exit', 'maze', 'east'),
+                          ('exit', 'maze', 'west')])
+        agent.last_command = 'go south'
+        self.assertEqual(agent.parse({'feedback': 'You cannot go south.'}),
+                         [('go', 'maze', 'south', 'maze')])
+
+    def test_loops(self):
+        """Tests that going back and forth between two locations is
+        noticed and escalated."""
+        agent = self.agent
+        kb = agent.kb
+        kb.tell(('go', 'hall', 'north', 'kitchen'))
+        kb.tell(('go', 'kitchen', 'south', 'hall'))
+        self.assertFalse(agent.in_loop())
+        for location in ['hall', 'kitchen'] * 3:
+            agent.history.append(location)
+        self.assertTrue(agent.in_loop())
+        agent.location = 'kitchen'
+        agent.tried['kitchen'] = {'south'}
+        self.assertEqual(agent.escalate(), 'go north')
+        self.assertEqual(agent.escalations, 1)
+        self.assertFalse(agent.history)
+
+    def test_failed_moves(self):
+        """Tests that failed moves trying the exits of a location are
+        not taken for a loop."""
+        agent = RoverOne(detect_loops=True)
+        agent.act({'feedback': ''}, 0, False)
+        feedback = 'Hall\nA plain room.'
+        for _ in range(len(DIRECTIONS)):
+            agent.act({'feedback': feedback}, 0, False)
+            feedback = "You can't go that way."
+        self.assertEqual(list(agent.history), ['hall'])
+        self.assertFalse(agent.in_loop())
+        self.assertEqual(agent.escalations, 0)
+
+    def test_stuck_door(self):
+        """Tests that an agent taking a stuck door for a dead end goes
+        back and forth until it notices, and gets through by escalating."""
+        rooms = {'Hall': {'north': 'Kitchen'},
+                 'Kitchen': {'south': 'Hall', 'east': 'Cellar'},
+                 'Cellar': {'west': 'Kitchen'}}
+        for detect_loops in (False, True):
+            agent = RoverOne(seed=42, detect_loops=detect_loops)
+            room, stuck, feedback = 'Hall', True, ''
+            loops = []
+            for _ in range(200):
+                history = list(agent.history)
+                escalations = agent.escalations
+                action = agent.act({'feedback': feedback}, 0, False)
+                if agent.escalations > escalations:
+                    loops.append(history[-5:] + [agent.location])
+                direction = action[3:] if action.startswith('go ') else None
+                if (room, direction, stuck) == ('Kitchen', 'east', True):
+                    stuck = False
+                    feedback = "You can't go that way."
+                elif direction in rooms[room]:
+                    room = rooms[room][direction]
+                    if room == 'Cellar':
+                        break
+                    feedback = f'{room}\nA plain room.'
+                else:
+                    feedback = "You can't go that way."
+            if detect_loops:
+                self.assertEqual(room, 'Cellar')
+                self.assertTrue(loops)
+                self.assertEqual(loops[0], ['kitchen', 'hall'] * 3)
+            else:
+                self.assertNotEqual(room, 'Cellar')
+                self.assertEqual(agent.escalations, 0)
+
+    def test_seed(self):
+        """Tests that agents with the same seed make the same random
+        choices."""
+        walks = []
+        for _ in range(2):
+            agent = RoverOne(seed=42)
+            agent.location = 'hall'
+            walks.append([agent.wander() for _ in range(20)])
+        self.assertEqual(walks[0], walks[1])
+        self.assertGreater(len(set(walks[0])), 1)
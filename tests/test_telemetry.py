@@ -0,0 +1,57 @@
+"""Tests the per-move telemetry of the driver."""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+TEST_DIR = os.path.dirname(__file__)
+MAIN_DIR = os.path.join(TEST_DIR, os.pardir)
+
+sys.path.insert(0, MAIN_DIR)
+
+from ohotnik.agents import RoverOne
+from ohotnik.telemetry import Telemetry
+
+
+class Corridor:
+    """A game of two rooms joined north to south."""
+
+    def __init__(self):
+        self.room = 'Hall'
+
+    def step(self, command):
+        if command == 'go north' and self.room == 'Hall':
+            self.room = 'Kitchen'
+        elif command == 'go south' and self.room == 'Kitchen':
+            self.room = 'Hall'
+        elif command != 'look':
+            return {'feedback': "You can't go that way."}, 0, False
+        exit = 'north' if self.room == 'Hall' else 'south'
+        return {'feedback': f'{self.room}\nA door leads {exit}.'}, 0, False
+
+
+class TestTelemetry(unittest.TestCase):
+    """Tests that every move is timed and logged."""
+
+    def test_record(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'moves.jsonl')
+            agent, env = RoverOne(seed=1), Corridor()
+            with Telemetry(path) as telemetry:
+                telemetry.instrument(agent, env)
+                game_state = {'feedback': ''}
+                for _ in range(5):
+                    command = agent.act(game_state, 0, False)
+                    game_state, _, _ = env.step(command)
+                    telemetry.record(command=command)
+            with open(path) as fh:
+                entries = [json.loads(line) for line in fh]
+        self.assertEqual([e['move'] for e in entries], [1, 2, 3, 4, 5])
+        self.assertEqual(entries[0]['command'], 'look')
+        for entry in entries:
+            self.assertGreaterEqual(entry['act'], entry['parse'])
+            self.assertGreater(entry['step'], 0)
+        self.assertGreater(sum(e['tell'] for e in entries), 0)
+        self.assertEqual(entries[-1]['kb']['locations'], 2)